@@ -1,35 +1,87 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import base64
+import functools
+import hmac
+import json
+import os
 import uuid
+import threading
+import time
 import traceback
-import requests
-import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from config import Config
-from services.openai_service import OpenAIService
-from services.elevenlabs_service import ElevenLabsService
+from services.audio_duration import audio_duration
+from services.audio_formats import get_format, low_bitrate, negotiate_format
+from services.event_stream import SentenceChunker, sse_event
+from services.filler_audio import fillers
+from services.interruptions import estimate_speech_seconds, record_interrupt, spoken_prefix, truncate_history
+from services.metrics_service import metrics
+from services.profiler import SlowRequestCapture, profiler
+from services.service_registry import ServiceRegistry
+from services.slo_controller import slo
+from services.speech_rate import speech_rates
+from services.turn_manager import TurnManager, TurnCancelled
 
 app = Flask(__name__)
 CORS(app)
 app.config.from_object(Config)
 
-# Initialize services
-print("🔧 Initializing services...")
-openai_service = OpenAIService()
-elevenlabs_service = ElevenLabsService()
-print("✅ Services initialized")
+def start_usage_meter():
+    from services.usage_meter import UsageMeter
+    meter = UsageMeter()
+    meter.start()
+    return meter
+
+def start_turn_recorder():
+    from services.turn_recorder import TurnRecorder
+    recorder = TurnRecorder()
+    recorder.start()
+    return recorder
+
+# Services are constructed on first use (or by the background warm-up in
+# __main__) so importing the app doesn't pay for the SDK imports
+registry = ServiceRegistry()
+registry.register("openai", "services.openai_service:OpenAIService")
+registry.register("elevenlabs", "services.elevenlabs_service:ElevenLabsService")
+registry.register("livekit", "services.livekit_service:LiveKitService")
+registry.register("usage", start_usage_meter)
+registry.register("recorder", start_turn_recorder)
 
 # Store conversation history
 conversations = {}
 active_rooms = {}  # Track active LiveKit rooms
+turn_manager = TurnManager(idle_ttl=Config.TURN_SESSION_TTL_SECONDS)  # Per-session turn sequencing
+# Synthesizes streamed replies sentence by sentence while the LLM is still generating
+tts_pool = ThreadPoolExecutor(max_workers=Config.TTS_STREAM_WORKERS, thread_name_prefix="tts-stream")
+slow_requests = SlowRequestCapture(
+    threshold_ms=Config.SLOW_REQUEST_MS,
+    capacity=Config.SLOW_REQUEST_CAPTURES,
+    interval=Config.SLOW_REQUEST_SAMPLE_MS / 1000
+)
+
+def admin_only(view):
+    """Require an X-Admin-Token header matching ADMIN_TOKEN (admin routes are off when it's unset)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token', '')
+        if not Config.ADMIN_TOKEN or not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy", 
         "timestamp": datetime.now().isoformat(),
+        "services_loaded": {
+            "openai": registry.is_loaded("openai"),
+            "elevenlabs": registry.is_loaded("elevenlabs")
+        },
         "services": {
             "openai": bool(Config.OPENAI_API_KEY),
             "elevenlabs": bool(Config.ELEVENLABS_API_KEY),
@@ -41,6 +93,7 @@ def health_check():
 @app.route('/process-voice', methods=['POST'])
 def process_voice():
     """Process voice input and return AI response"""
+    started = time.perf_counter()
     try:
         print("🎤 Starting voice processing...")
         
@@ -49,6 +102,7 @@ def process_voice():
         
         audio_file = request.files['audio']
         session_id = request.form.get('session_id', 'default')
+        tenant = request.headers.get('X-Tenant-ID') or request.form.get('tenant_id', 'default')
         
         # Check file size
         audio_file.seek(0, 2)
@@ -58,46 +112,480 @@ def process_voice():
         if file_size == 0:
             return jsonify({"error": "Empty audio file"}), 400
         
-        # Transcribe audio
-        print("🔊 Starting transcription...")
-        transcript = openai_service.transcribe_audio_sync(audio_file)
+        # Pick the TTS output format from the client's hint / Accept header
+        audio_format = negotiate_format(
+            hint=request.form.get('audio_format'),
+            accept_header=request.headers.get('Accept'),
+            save_data=request.headers.get('Save-Data', '').lower() == 'on',
+            effective_type=request.form.get('effective_type') or request.headers.get('ECT')
+        )
+        
+        # Budgets are checked against cached store totals; over-budget requests run degraded
+        budget = registry.get("usage").check(session_id, tenant)
+        if not budget.allowed:
+            print(f"💰 Usage budget exhausted for {tenant}/{session_id}: {budget.reasons}")
+            return jsonify({"error": "Usage budget exceeded", "budget": budget.to_dict()}), 429
+        # Stages running slow: shorter replies, a faster model, cached audio only
+        slo.apply(budget)
         
-        if not transcript:
-            return jsonify({"error": "Failed to transcribe audio"}), 500
+        # Sequence the turn: identical uploads share one computation,
+        # a different upload supersedes whatever is still in flight
+        upload = audio_file.read()
+        content_hash = turn_manager.content_hash(upload + audio_format.name.encode())
+        audio_file.seek(0)
+        turn, is_leader = turn_manager.begin(session_id, content_hash)
         
-        print(f"✅ Transcription: '{transcript}'")
+        if not is_leader:
+            result, status_code = turn_manager.wait(turn)
+            if result is None:
+                return jsonify({"error": "Coalesced turn timed out"}), 504
+            return jsonify(result), status_code
         
-        # Generate AI response
-        print("🤖 Generating AI response...")
-        history = conversations.get(session_id, [])
-        ai_response = openai_service.generate_response_sync(transcript, history)
+        # From here the turn must always be finished, or duplicates would wait on it
+        trace = None
+        try:
+            streamed = 'text/event-stream' in request.headers.get('Accept', '')
+            trace = slow_requests.begin(
+                "/process-voice",
+                started=started,
+                session_id=session_id,
+                tenant=tenant,
+                filename=audio_file.filename,
+                audio_bytes=file_size,
+                audio_format=audio_format.name,
+                model=budget.model or Config.OPENAI_MODEL,
+                streamed=streamed,
+                degraded=budget.degraded,
+                replay_of=request.headers.get('X-Replay-Of')
+            )
+            trace.mark("turn_started")
+            
+            # Event-stream clients get the transcript, tokens and audio as they're ready
+            if streamed:
+                response = Response(
+                    stream_with_context(_stream_voice_turn(turn, trace, audio_file, audio_format, budget, tenant, upload)),
+                    mimetype='text/event-stream',
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "X-Accel-Buffering": "no"  # Don't let a reverse proxy hold events back
+                    }
+                )
+                # A client that goes away before the body starts never runs the
+                # stream, so finish the turn here or duplicates would wait on it
+                response.call_on_close(lambda: _abandon_voice_turn(turn, trace, tenant, upload))
+                return response
+        except Exception:
+            turn.cancel_event.set()
+            turn_manager.finish(turn, {"error": "Internal server error"}, 500)
+            if trace is not None:
+                slow_requests.finish(trace, 500)
+            raise
+        
+    except Exception as e:
+        print(f"❌ ERROR in process_voice: {e}")
+        print(f"❌ TRACEBACK: {traceback.format_exc()}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+    
+    result, status_code = {"error": "Internal server error"}, 500
+    usage = {}
+    try:
+        result, status_code = _run_voice_turn(turn, trace, audio_file, audio_format, budget, usage)
+    except TurnCancelled:
+        result, status_code = _superseded_result(turn), 409
+    except Exception as e:
+        print(f"❌ ERROR in process_voice: {e}")
+        print(f"❌ TRACEBACK: {traceback.format_exc()}")
+        result, status_code = {"error": f"Internal server error: {str(e)}"}, 500
+    finally:
+        _finish_voice_turn(turn, trace, result, status_code, tenant, usage, upload)
+    
+    return jsonify(result), status_code
+
+def _finish_voice_turn(turn, trace, result, status_code, tenant, usage, upload):
+    turn_manager.finish(turn, result, status_code)
+    # Upstream usage is billed even when the turn was cancelled part-way
+    registry.get("usage").record(turn.session_id, tenant, **usage)
+    slow_requests.finish(trace, status_code)
+    if Config.TURN_RECORDER_ENABLED:
+        _record_turn(turn, trace, result, status_code, usage, upload)
+
+def _abandon_voice_turn(turn, trace, tenant, upload):
+    """Finish a streamed turn whose body was never read (no-op once the stream finished it)"""
+    if turn.done_event.is_set():
+        return
+    turn.cancel_event.set()
+    _finish_voice_turn(turn, trace, {"error": "Client disconnected", "cancelled": True}, 499, tenant, {}, upload)
+
+def _record_turn(turn, trace, result, status_code, usage, upload):
+    """Hand the turn to the recorder; hashing and disk writes happen on its thread"""
+    info = trace.info
+    registry.get("recorder").record({
+        "session_id": turn.session_id,
+        "tenant": info["tenant"],
+        "seq": turn.seq,
+        "status": status_code,
+        "replay_of": info["replay_of"],
+        "transcript": result.get("transcript"),
+        "response": result.get("response"),
+        "models": {"stt": "whisper-1", "llm": info["model"], "tts": Config.ELEVENLABS_VOICE_ID},
+        "filename": info["filename"],
+        "audio_format": info["audio_format"],
+        "streamed": info["streamed"],
+        "degraded": info["degraded"],
+        "timeline_ms": {stage: round(at * 1000, 1) for stage, at in trace.timeline},
+        "speech_seconds": result.get("speech_seconds"),
+        "usage": usage
+    }, input_audio=upload, output_audio=result.get("audio_chunks") or [])
+
+def _superseded_result(turn):
+    print(f"⏹️ Turn {turn.seq} superseded for session {turn.session_id}")
+    return {"error": "Superseded by a newer request", "cancelled": True, "session_id": turn.session_id}
+
+def _run_voice_turn(turn, trace, audio_file, audio_format, budget, usage):
+    """Run STT -> LLM -> TTS for a turn and return (result, status_code) in one piece"""
+    events = _voice_turn_events(turn, trace, audio_file, audio_format, budget, usage)
+    while True:
+        try:
+            next(events)
+        except StopIteration as finished:
+            return finished.value
+
+def _stream_voice_turn(turn, trace, audio_file, audio_format, budget, tenant, upload):
+    """Server-sent events for a turn: transcript, token..., audio..., then done or error"""
+    result, status_code = {"error": "Internal server error"}, 500
+    usage = {}
+    events = _voice_turn_events(turn, trace, audio_file, audio_format, budget, usage, sentence_audio=True)
+    try:
+        while True:
+            try:
+                event, data = next(events)
+            except StopIteration as finished:
+                result, status_code = finished.value
+                break
+            yield sse_event(event, data)
+    except TurnCancelled:
+        result, status_code = _superseded_result(turn), 409
+    except GeneratorExit:
+        # Client went away: stop the rest of the pipeline
+        turn.cancel_event.set()
+        result, status_code = {"error": "Client disconnected", "cancelled": True}, 499
+        raise
+    except Exception as e:
+        print(f"❌ ERROR in process_voice stream: {e}")
+        print(f"❌ TRACEBACK: {traceback.format_exc()}")
+        result, status_code = {"error": f"Internal server error: {str(e)}"}, 500
+    finally:
+        events.close()
+        _finish_voice_turn(turn, trace, result, status_code, tenant, usage, upload)
+    
+    if status_code == 200:
+        yield sse_event("done", {
+            "session_id": turn.session_id,
+            "audio_format": result["audio_format"],
+            "audio_chunks": len(result["audio_chunks"]),
+            "speech_seconds": result["speech_seconds"],
+            "budget": result["budget"]
+        })
+    else:
+        yield sse_event("error", dict(result, status=status_code))
+
+def _voice_turn_events(turn, trace, audio_file, audio_format, budget, usage, sentence_audio=False):
+    """STT -> LLM -> TTS for a turn as progressive events, stopping early if it gets superseded
+    
+    Yields (event, data) pairs: transcript, token (each LLM delta) and audio
+    (each synthesized piece, in order). With sentence_audio each sentence is
+    synthesized while the LLM is still streaming; otherwise the whole reply
+    is synthesized once at the end. Stages are marked on trace (a
+    services.profiler.RequestTrace). Returns (result, status_code).
+    """
+    session_id = turn.session_id
+    
+    # Transcribe audio
+    print("🔊 Starting transcription...")
+    stt_started = time.perf_counter()
+    transcript = registry.get("openai").transcribe_audio_sync(
+        audio_file,
+        cancel_event=turn.cancel_event,
+        usage=usage
+    )
+    turn.check_cancelled()
+    
+    if not transcript:
+        return {"error": "Failed to transcribe audio"}, 500
+    
+    slo.observe("stt", time.perf_counter() - stt_started)
+    print(f"✅ Transcription: '{transcript}'")
+    metrics.observe("voice.time_to_transcript", trace.mark("transcript"))
+    yield "transcript", {"text": transcript}
+    
+    # Generate AI response, handing finished sentences to TTS as they arrive
+    print("🤖 Generating AI response...")
+    history = list(conversations.get(session_id, []))
+    chunker = SentenceChunker() if sentence_audio and budget.tts_enabled else None
+    pending = deque()  # (piece, tts usage, future) in reply order
+    audio_chunks = []
+    audio_seconds = []  # Parsed length of each chunk (None if it couldn't be parsed)
+    
+    def timed_tts(piece, piece_usage):
+        """(audio stream, format) for one piece"""
+        tts = registry.get("elevenlabs")
+        fmt = audio_format
+        started = time.perf_counter()
+        audio_stream = tts.text_to_speech_sync(
+            piece,
+            cancel_event=turn.cancel_event,
+            audio_format=fmt.name,
+            usage=piece_usage,
+            cache_only=budget.tts_cache_only
+        )
+        if audio_stream is None and budget.tts_cache_only and not turn.cancel_event.is_set():
+            # SLO cached_audio: a miss is synthesized at the lowest bitrate the client plays rather than dropped
+            fmt = low_bitrate(audio_format)
+            metrics.increment("slo.tts_low_bitrate_fallbacks")
+            audio_stream = tts.text_to_speech_sync(
+                piece,
+                cancel_event=turn.cancel_event,
+                audio_format=fmt.name,
+                usage=piece_usage
+            )
+        # Only fresh synthesis says anything about TTS latency (cache hits are free)
+        if audio_stream is not None and piece_usage.get("tts_characters"):
+            slo.observe("tts", time.perf_counter() - started)
+        return audio_stream, fmt
+    
+    def synthesize(piece):
+        piece_usage = {}
+        pending.append((piece, piece_usage, tts_pool.submit(timed_tts, piece, piece_usage)))
+    
+    def ready_audio(wait=False):
+        """Audio events for finished pieces, in order (blocking on each if wait)"""
+        while pending and (wait or pending[0][2].done()):
+            piece, piece_usage, future = pending.popleft()
+            audio_stream, piece_format = future.result()
+            for kind, amount in piece_usage.items():
+                usage[kind] = usage.get(kind, 0) + amount
+            turn.check_cancelled()
+            if audio_stream is None:
+                continue
+            if not audio_chunks:
+                metrics.observe("voice.time_to_first_audio", trace.mark("first_audio"))
+            audio_bytes = audio_stream.getvalue()
+            audio_chunks.append(base64.b64encode(audio_bytes).decode('utf-8'))
+            audio_seconds.append(audio_duration(audio_bytes, piece_format))
+            yield "audio", {
+                "index": len(audio_chunks) - 1,
+                "text": piece,
+                "mime_type": piece_format.mime_type,
+                "audio": audio_chunks[-1],
+                "seconds": audio_seconds[-1]
+            }
+    
+    parts = []
+    llm_started = time.perf_counter()
+    try:
+        for text in registry.get("openai").stream_response_sync(
+            transcript,
+            history,
+            cancel_event=turn.cancel_event,
+            model=budget.model,
+            max_tokens=budget.max_tokens,
+            usage=usage
+        ):
+            if not parts:
+                metrics.observe("voice.time_to_first_token", trace.mark("first_token"))
+                slo.observe("llm", time.perf_counter() - llm_started)
+            parts.append(text)
+            yield "token", text
+            if chunker is not None:
+                for piece in chunker.push(text):
+                    synthesize(piece)
+                yield from ready_audio()
+        turn.check_cancelled()
+        trace.mark("llm_done")
+        ai_response = "".join(parts)
         print(f"✅ AI Response: '{ai_response}'")
         
-        # Update conversation history
-        history.append({"role": "user", "content": transcript})
-        history.append({"role": "assistant", "content": ai_response})
-        conversations[session_id] = history[-10:]
+        # Update conversation history (in turn order, never from a superseded turn)
+        def apply_history():
+            updated = conversations.get(session_id, []) + [
+                {"role": "user", "content": transcript},
+                {"role": "assistant", "content": ai_response}
+            ]
+            conversations[session_id] = updated[-10:]
         
-        # Generate audio fallback
-        print("🔊 Generating audio fallback...")
-        audio_stream = elevenlabs_service.text_to_speech_sync(ai_response)
-        audio_base64 = None
+        if not turn_manager.commit(turn, apply_history):
+            raise TurnCancelled(f"Turn {turn.seq} superseded before history update")
+        trace.mark("history_committed")
         
-        if audio_stream:
-            audio_bytes = audio_stream.getvalue()
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        # Generate audio fallback (skipped once the TTS budget is spent)
+        if budget.tts_enabled:
+            print("🔊 Generating audio fallback...")
+            rest = chunker.flush() if chunker is not None else ai_response
+            if rest:
+                synthesize(rest)
+            yield from ready_audio(wait=True)
+            trace.mark("tts_done")
+    finally:
+        # Superseded or abandoned: let queued sentences skip their TTS call
+        if pending:
+            turn.cancel_event.set()
+    
+    # How long the reply lasts: measured from the audio, or the voice's speech rate without it
+    if audio_seconds and None not in audio_seconds:
+        speech_seconds = sum(audio_seconds)
+    else:
+        speech_seconds = estimate_speech_seconds(ai_response)
+    
+    return {
+        "transcript": transcript,
+        "response": ai_response,
+        "audio": audio_chunks[0] if len(audio_chunks) == 1 else None,
+        "audio_chunks": audio_chunks,
+        "audio_seconds": audio_seconds,
+        "speech_seconds": round(speech_seconds, 3),
+        "audio_format": audio_format.to_dict(),
+        "budget": budget.to_dict() if budget.degraded else None,
+        "session_id": session_id
+    }, 200
+
+@app.route('/filler-clips', methods=['GET'])
+def filler_clips():
+    """Pre-synthesized acknowledgement clips the client plays while a reply is slow"""
+    fmt = get_format(request.args.get('format'))
+    clips = [
+        {"text": text, "audio": base64.b64encode(audio_bytes).decode('utf-8')}
+        for text, audio_bytes in fillers.clips(fmt.name)
+    ]
+    return jsonify({
+        "enabled": Config.FILLER_ENABLED,
+        "threshold_ms": Config.FILLER_CLIENT_THRESHOLD_MS,
+        "audio_format": fmt.to_dict(),
+        "clips": clips
+    })
+
+@app.route('/speech-rate', methods=['GET'])
+def speech_rate():
+    """The fitted speaking rate for a voice, for clients sizing text they have no audio for"""
+    return jsonify(speech_rates.rate(request.args.get('voice_id')))
+
+@app.route('/interrupt', methods=['POST'])
+def interrupt():
+    """Barge-in: stop the session's in-flight turn and trim history to what was heard"""
+    try:
+        started = time.perf_counter()
+        data = request.get_json() or {}
+        session_id = data.get('session_id', 'default')
+        played_seconds = float(data.get('played_seconds') or 0)
+        audio_seconds = float(data.get('audio_seconds') or 0)
+        
+        # Stops STT/LLM/TTS for a turn the client hasn't received yet
+        cancelled_turn = turn_manager.cancel_inflight(session_id)
+        
+        history = conversations.get(session_id, [])
+        wasted_seconds = 0.0
+        truncated = False
+        if cancelled_turn is not None:
+            # If its history was already committed the user heard at most the
+            # sentences a streaming client had started playing
+            if cancelled_turn.committed and history:
+                total_seconds = max(audio_seconds, estimate_speech_seconds(history[-1]["content"]))
+                wasted_seconds = max(total_seconds - played_seconds, 0.0)
+                spoken = spoken_prefix(history[-1]["content"], played_seconds, total_seconds)
+                truncated = truncate_history(history, spoken)
+        elif history and history[-1]["role"] == "assistant" and audio_seconds > 0:
+            wasted_seconds = max(audio_seconds - played_seconds, 0.0)
+            spoken = spoken_prefix(history[-1]["content"], played_seconds, audio_seconds)
+            truncated = truncate_history(history, spoken)
+        
+        # The client reports press-to-silence for its own playback; the server cancel is timed below
+        local_stop_ms = data.get('local_stop_ms')
+        record_interrupt(
+            "flask",
+            wasted_seconds_saved=wasted_seconds,
+            interrupt_to_silence_seconds=float(local_stop_ms) / 1000 if local_stop_ms is not None else None
+        )
+        metrics.observe("barge_in.server_cancel", time.perf_counter() - started)
+        
+        print(f"✋ Interrupt for {session_id}: cancelled={cancelled_turn is not None}, "
+              f"truncated={truncated}, saved={wasted_seconds:.1f}s")
         
         return jsonify({
-            "transcript": transcript,
-            "response": ai_response,
-            "audio": audio_base64,
-            "session_id": session_id
+            "success": True,
+            "cancelled_turn": cancelled_turn is not None,
+            "history_truncated": truncated,
+            "audio_seconds_saved": round(wasted_seconds, 2)
         })
         
     except Exception as e:
-        print(f"❌ ERROR in process_voice: {e}")
-        print(f"❌ TRACEBACK: {traceback.format_exc()}")
-        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+        print(f"❌ Error handling interrupt: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/usage', methods=['GET'])
+def get_usage():
+    """Usage so far and the current budget decision for a session"""
+    session_id = request.args.get('session_id', 'default')
+    tenant = request.headers.get('X-Tenant-ID') or request.args.get('tenant_id', 'default')
+    meter = registry.get("usage")
+    return jsonify({
+        "session_id": session_id,
+        "tenant": tenant,
+        "session": meter.session_usage(session_id, tenant),
+        "tenant_totals": meter.tenant_usage(tenant),
+        "budget": meter.check(session_id, tenant, count=False).to_dict()
+    })
+
+@app.route('/slo', methods=['GET'])
+def get_slo():
+    """Per-stage latency against target and the degradation steps in force"""
+    return jsonify(slo.snapshot())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose in-process counters and timings"""
+    return jsonify(metrics.snapshot())
+
+@app.route('/admin/profile', methods=['GET'])
+@admin_only
+def admin_profile():
+    """Sample every thread for ?seconds= and return folded stacks (flamegraph.pl / speedscope input)"""
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), Config.PROFILE_MAX_SECONDS)
+        interval_ms = max(float(request.args.get('interval_ms', Config.PROFILE_INTERVAL_MS)), 1.0)
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+
+    print(f"🔬 Profiling for {seconds:.0f}s every {interval_ms:.0f} ms...")
+    try:
+        folded, stats = profiler.run(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    print(f"🔬 Profile done: {stats['samples']} samples, sampler used {stats['sampler_cpu']:.1%} of a core")
+    return Response(folded, mimetype='text/plain', headers={
+        "Content-Disposition": f"attachment; filename=flask-{os.getpid()}.folded",
+        "X-Profile-Samples": str(stats["samples"]),
+        "X-Profile-Sampler-CPU": str(stats["sampler_cpu"])
+    })
+
+@app.route('/admin/slow-requests', methods=['GET'])
+@admin_only
+def admin_slow_requests():
+    """Timelines of recent /process-voice calls slower than SLOW_REQUEST_MS"""
+    return jsonify({
+        "threshold_ms": Config.SLOW_REQUEST_MS,
+        "captures": slow_requests.list()
+    })
+
+@app.route('/admin/slow-requests/<capture_id>/profile', methods=['GET'])
+@admin_only
+def admin_slow_request_profile(capture_id):
+    """Folded stack samples of one slow request"""
+    folded = slow_requests.folded(capture_id)
+    if folded is None:
+        return jsonify({"error": "Capture not found (it may have been evicted)"}), 404
+    return Response(folded, mimetype='text/plain', headers={
+        "Content-Disposition": f"attachment; filename=slow-{capture_id}.folded"
+    })
 
 @app.route('/create-hedra-room', methods=['POST'])
 def create_hedra_room():
@@ -105,6 +593,7 @@ def create_hedra_room():
     try:
         data = request.get_json() or {}
         session_id = data.get('session_id', str(uuid.uuid4()))
+        tenant = request.headers.get('X-Tenant-ID') or data.get('tenant_id', 'default')
         
         # Check if we have LiveKit credentials
         if not all([Config.LIVEKIT_API_KEY, Config.LIVEKIT_API_SECRET, Config.LIVEKIT_URL]):
@@ -114,9 +603,18 @@ def create_hedra_room():
                 "error": "LiveKit credentials not configured"
             }), 400
         
-        # Import LiveKit API
+        livekit_service = registry.get("livekit")
+        
+        # Create a room name - use consistent naming
+        room_name = f"hedra-room-{session_id}"
+        
+        # Generate access token for the frontend user
         try:
-            from livekit.api import AccessToken, VideoGrants
+            user_token = livekit_service.build_access_token(
+                room_name,
+                "Frontend User",
+                identity=f"user-{session_id}"
+            )
         except ImportError as e:
             print(f"❌ LiveKit import error: {e}")
             return jsonify({
@@ -124,21 +622,14 @@ def create_hedra_room():
                 "error": f"LiveKit not properly installed: {str(e)}"
             }), 500
         
-        # Create a room name - use consistent naming
-        room_name = f"hedra-room-{session_id}"
-        
-        # Generate access token for the frontend user
-        token = AccessToken(Config.LIVEKIT_API_KEY, Config.LIVEKIT_API_SECRET) \
-            .with_identity(f"user-{session_id}") \
-            .with_name("Frontend User") \
-            .with_grants(VideoGrants(
-                room_join=True,
-                room=room_name,
-                can_publish=True,
-                can_subscribe=True
-            ))
-        
-        user_token = token.to_jwt()
+        # Create the room server-side so it has an empty timeout and can be
+        # reconciled; the room still auto-creates on join if this fails. The
+        # metadata lets the agent meter usage under the same session and tenant.
+        try:
+            metadata = json.dumps({"session_id": session_id, "tenant": tenant})
+            livekit_service.run(livekit_service.create_room(room_name, metadata=metadata))
+        except Exception as e:
+            print(f"⚠️ Could not pre-create room {room_name}: {e}")
         
         # Store room info
         active_rooms[session_id] = {
@@ -167,6 +658,64 @@ def create_hedra_room():
             "error": f"Room creation failed: {str(e)}"
         }), 500
 
+def _room_names(data):
+    """room_names from a request body if it's a non-empty list of non-empty strings, else None"""
+    room_names = data.get('room_names') if isinstance(data, dict) else None
+    if not isinstance(room_names, list) or not room_names:
+        return None
+    if not all(isinstance(name, str) and name.strip() for name in room_names):
+        return None
+    return room_names
+
+@app.route('/rooms', methods=['GET'])
+@admin_only
+def list_rooms():
+    """List rooms on the LiveKit server (briefly cached)"""
+    try:
+        rooms = registry.get("livekit").run(registry.get("livekit").list_rooms())
+        return jsonify({"rooms": rooms, "tracked_sessions": len(active_rooms)})
+    except Exception as e:
+        print(f"❌ Error listing rooms: {e}")
+        return jsonify({"error": f"Room listing failed: {str(e)}"}), 500
+
+@app.route('/rooms/bulk-create', methods=['POST'])
+@admin_only
+def bulk_create_rooms():
+    """Create several rooms at once: {"room_names": [...]}"""
+    try:
+        room_names = _room_names(request.get_json(silent=True))
+        if room_names is None:
+            return jsonify({"error": "room_names must be a non-empty list of room names"}), 400
+        
+        livekit_service = registry.get("livekit")
+        rooms = livekit_service.run(livekit_service.create_rooms(room_names), timeout=60)
+        return jsonify({"rooms": rooms})
+    except Exception as e:
+        print(f"❌ Error creating rooms: {e}")
+        return jsonify({"error": f"Bulk room creation failed: {str(e)}"}), 500
+
+@app.route('/rooms/bulk-delete', methods=['POST'])
+@admin_only
+def bulk_delete_rooms():
+    """Delete several rooms at once: {"room_names": [...]}"""
+    try:
+        room_names = _room_names(request.get_json(silent=True))
+        if room_names is None:
+            return jsonify({"error": "room_names must be a non-empty list of room names"}), 400
+        
+        livekit_service = registry.get("livekit")
+        results = livekit_service.run(livekit_service.delete_rooms(room_names), timeout=60)
+        
+        deleted = {name for name, ok in results.items() if ok}
+        for session_id, info in list(active_rooms.items()):
+            if info["room_name"] in deleted:
+                active_rooms.pop(session_id, None)
+        
+        return jsonify({"deleted": results})
+    except Exception as e:
+        print(f"❌ Error deleting rooms: {e}")
+        return jsonify({"error": f"Bulk room deletion failed: {str(e)}"}), 500
+
 @app.route('/send-to-avatar', methods=['POST'])
 def send_to_avatar():
     """Send text to avatar via LiveKit room"""
@@ -193,7 +742,7 @@ def send_to_avatar():
 def test_elevenlabs():
     """Test ElevenLabs connection"""
     try:
-        audio_stream = elevenlabs_service.text_to_speech_sync("Hello, this is a test.")
+        audio_stream = registry.get("elevenlabs").text_to_speech_sync("Hello, this is a test.")
         
         if audio_stream:
             return jsonify({
@@ -251,6 +800,31 @@ def test_livekit():
             "message": f"LiveKit test failed: {str(e)}"
         }), 500
 
+def start_room_reconciler():
+    """Reap active_rooms entries whose LiveKit room has ended"""
+    livekit_service = registry.get("livekit")
+    if not livekit_service.configured:
+        return
+    
+    def on_reap(session_id, info):
+        turn_manager.forget(session_id)
+    
+    livekit_service.start_reconciler(active_rooms, on_reap=on_reap)
+
+def prepare_filler_clips():
+    """Synthesize (or load cached) filler clips in every client-facing format"""
+    if Config.FILLER_ENABLED:
+        fillers.prepare_in_background(registry.get("elevenlabs"), formats=("mp3", "mp3_low", "opus"))
+
+def check_livekit_import():
+    """Verify the LiveKit API package is importable"""
+    try:
+        from livekit.api import AccessToken, VideoGrants
+        print("✅ LiveKit API imports successful")
+    except ImportError as e:
+        print(f"❌ LiveKit API import failed: {e}")
+        print("💡 Try: pip install livekit-api")
+
 if __name__ == '__main__':
     print("🚀 Starting Voice Avatar POC server...")
     print(f"🔑 OpenAI Key: {'✅ Set' if Config.OPENAI_API_KEY else '❌ Missing'}")
@@ -259,12 +833,13 @@ if __name__ == '__main__':
     print(f"🔑 LiveKit URL: {'✅ Set' if Config.LIVEKIT_URL else '❌ Missing'}")
     print(f"🔑 LiveKit API Key: {'✅ Set' if Config.LIVEKIT_API_KEY else '❌ Missing'}")
     
-    # Test LiveKit configuration on startup
-    try:
-        from livekit.api import AccessToken, VideoGrants
-        print("✅ LiveKit API imports successful")
-    except ImportError as e:
-        print(f"❌ LiveKit API import failed: {e}")
-        print("💡 Try: pip install livekit-api")
+    # Startup checks and service construction run in the background so the
+    # server starts accepting requests immediately
+    # (with the debug reloader, only in the child process that serves requests)
+    if not Config.DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(target=check_livekit_import, name="livekit-check", daemon=True).start()
+        registry.warm_up()
+        threading.Thread(target=start_room_reconciler, name="room-reconciler-start", daemon=True).start()
+        threading.Thread(target=prepare_filler_clips, name="filler-start", daemon=True).start()
     
-    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5001) 
\ No newline at end of file
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5001)
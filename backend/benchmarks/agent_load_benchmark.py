@@ -0,0 +1,195 @@
+"""Load benchmark for the LiveKit agent path (hedra_agent.py)
+
+Runs N synthetic participants against real AgentSessions in one worker
+process. Each participant replays a recorded utterance on a schedule into the
+session through a fake room transport (tools/stub_agent_services.py) and the
+STT, LLM and TTS are local stubs with fixed latencies, so runs are
+deterministic and cost nothing. The agent is hedra_agent's FillerAgent with
+the same session settings and metrics hooks as production.
+
+For each concurrency level it reports end-of-speech to first-agent-audio
+latency, worker CPU and RSS per room, and event-loop lag, then the largest
+level whose p95 latency stays within --degrade-ms of the single-room p95.
+
+    cd backend
+    python benchmarks/agent_load_benchmark.py
+    python benchmarks/agent_load_benchmark.py --levels 1 4 16 32 64 --turns 4 --audio question.wav
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the benchmark's metered usage and the stub TTS's speaking rate out of the real stores
+STATE_DIR = tempfile.mkdtemp(prefix="agent-load-")
+os.environ.setdefault("USAGE_DB_PATH", os.path.join(STATE_DIR, "usage.db"))
+os.environ.setdefault("SPEECH_RATE_DB_PATH", os.path.join(STATE_DIR, "usage.db"))
+
+import hedra_agent
+from services.prompt_registry import prompts
+from tools.stub_agent_services import (
+    INPUT_SAMPLE_RATE, PlayoutAudioOutput, ReplayAudioInput, StubLLM, StubSTT, StubTTS, load_wav, tone
+)
+
+def rss_mb():
+    """Current resident set size (peak RSS where /proc isn't available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class SyntheticParticipant:
+    """One room: a scripted caller talking to its own agent session"""
+
+    def __init__(self, room_name, utterance, sample_rate, schedule, args):
+        self.room_name = room_name
+        self.latencies = []
+        self._waiting = []  # end-of-speech times not yet answered
+        self.turns = len(schedule)
+        self.duration = schedule[-1] + args.turn_interval
+        self.args = args
+        self.audio_in = ReplayAudioInput(utterance, sample_rate, schedule, on_end_of_speech=self._on_end_of_speech)
+        self.audio_out = PlayoutAudioOutput(on_first_frame=self._on_first_frame)
+
+    def _on_end_of_speech(self, turn, at):
+        self._waiting.append(at)
+
+    def _on_first_frame(self, at):
+        if self._waiting:
+            self.latencies.append(at - self._waiting.pop(0))
+
+    async def run(self):
+        session = hedra_agent.create_session(
+            stt=StubSTT(endpoint_seconds=self.args.stt_endpoint),
+            llm=StubLLM(ttft=self.args.llm_ttft),
+            tts=StubTTS(ttfb=self.args.tts_ttfb),
+            turn_detection="stt"
+        )
+        session.input.audio = self.audio_in
+        session.output.audio = self.audio_out
+        hedra_agent.track_session_metrics(session, self.room_name)
+
+        await session.start(agent=hedra_agent.FillerAgent(instructions=prompts.get("audio_only").instructions))
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.audio_in.close()
+            await session.aclose()
+
+async def sample_loop_lag(samples, stop, interval=0.05):
+    """How late the event loop wakes up; grows when the worker is CPU-bound"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def sample_rss(samples, stop, interval=0.5):
+    while not stop.is_set():
+        samples.append(rss_mb())
+        await asyncio.sleep(interval)
+
+async def run_level(rooms, utterance, sample_rate, args, rng):
+    participants = []
+    for index in range(rooms):
+        # Stagger callers so they don't all finish speaking in the same frame
+        offset = rng.uniform(0.5, args.turn_interval)
+        schedule = [offset + turn * args.turn_interval + rng.uniform(-0.3, 0.3) for turn in range(args.turns)]
+        participants.append(SyntheticParticipant(f"load-{rooms}-{index}", utterance, sample_rate, schedule, args))
+
+    baseline_rss = rss_mb()
+    lag, rss, stop = [], [], asyncio.Event()
+    monitors = [asyncio.create_task(sample_loop_lag(lag, stop)), asyncio.create_task(sample_rss(rss, stop))]
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(participant.run() for participant in participants))
+    cpu, wall = time.process_time() - cpu_started, time.perf_counter() - wall_started
+
+    stop.set()
+    await asyncio.gather(*monitors)
+
+    latencies = [latency for participant in participants for latency in participant.latencies]
+    expected = sum(participant.turns for participant in participants)
+    return {
+        "rooms": rooms,
+        "turns": expected,
+        "answered": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "cpu_cores": cpu / wall,
+        "cpu_per_room": cpu / wall / rooms,
+        "rss_per_room_mb": max(0.0, max(rss, default=baseline_rss) - baseline_rss) / rooms,
+        "rss_mb": max(rss, default=baseline_rss),
+        "loop_lag_p95": percentile(lag, 95)
+    }
+
+async def main_async(args):
+    if args.audio:
+        utterance, sample_rate = load_wav(args.audio)
+    else:
+        utterance, sample_rate = tone(args.utterance_seconds), INPUT_SAMPLE_RATE
+
+    floor = args.stt_endpoint + args.llm_ttft + args.tts_ttfb
+    print(f"🎙️ {len(utterance) / sample_rate:.1f}s utterance, {args.turns} turns/room every {args.turn_interval}s")
+    print(f"⏱️ Stub latency floor: STT endpoint {args.stt_endpoint}s + LLM TTFT {args.llm_ttft}s + TTS TTFB {args.tts_ttfb}s = {floor:.2f}s")
+    header = (f"{'rooms':>5} {'answered':>9} {'p50 s':>7} {'p95 s':>7} {'cores':>6} "
+              f"{'CPU/room':>9} {'RSS MB':>7} {'MB/room':>8} {'loop lag p95 ms':>16}")
+    print(header)
+    print("-" * len(header))
+
+    rng = random.Random(args.seed)
+    results = []
+    for rooms in args.levels:
+        result = await run_level(rooms, utterance, sample_rate, args, rng)
+        results.append(result)
+        print(
+            f"{result['rooms']:>5} {result['answered']:>4}/{result['turns']:<4} {result['p50']:>7.3f} {result['p95']:>7.3f} "
+            f"{result['cpu_cores']:>6.2f} {result['cpu_per_room']:>8.1%} {result['rss_mb']:>7.0f} "
+            f"{result['rss_per_room_mb']:>8.1f} {result['loop_lag_p95'] * 1000:>16.1f}"
+        )
+
+    baseline = results[0]["p95"]
+    max_rooms = None
+    for result in results:
+        if result["answered"] < result["turns"] or result["p95"] > baseline + args.degrade_ms / 1000:
+            break
+        max_rooms = result["rooms"]
+
+    print(f"\n🏠 Max rooms per worker within {args.degrade_ms} ms of single-room p95 ({baseline:.3f}s): {max_rooms}")
+    if max_rooms == results[-1]["rooms"]:
+        print("   (no degradation seen; try higher --levels)")
+    # Endpointing delay and first-sentence buffering in the session, not stub time
+    print(f"   Pipeline overhead over the stub floor at 1 room: {(results[0]['p50'] - floor) * 1000:.0f} ms p50")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--turns", type=int, default=3, help="utterances per participant")
+    parser.add_argument("--turn-interval", type=float, default=6.0, help="seconds between a participant's utterances")
+    parser.add_argument("--audio", help="16-bit mono WAV to replay (default: a synthetic tone)")
+    parser.add_argument("--utterance-seconds", type=float, default=1.5)
+    parser.add_argument("--stt-endpoint", type=float, default=0.3, help="stub STT silence before end of speech")
+    parser.add_argument("--llm-ttft", type=float, default=0.4)
+    parser.add_argument("--tts-ttfb", type=float, default=0.2)
+    parser.add_argument("--degrade-ms", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
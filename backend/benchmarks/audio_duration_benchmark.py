@@ -0,0 +1,95 @@
+"""Cost and accuracy of reading MP3 durations from frame headers (services/audio_duration.py)
+
+Builds synthetic MP3 streams shaped like ElevenLabs output (frame headers
+with random payloads, so no encoder is needed): constant bitrate for the
+mp3 and mp3_low formats, variable bitrate, and variable bitrate with a
+Xing header. For each it reports parse time per clip and per MB, and the
+error of the parsed duration and of the naive size / nominal bitrate guess
+against the true length. --file adds real MP3s (true length unknown, so
+only the two estimates are compared).
+
+    cd backend
+    python benchmarks/audio_duration_benchmark.py
+    python benchmarks/audio_duration_benchmark.py --seconds 30 --file reply.mp3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_duration import _FRAMES, mp3_duration
+from services.audio_formats import AUDIO_FORMATS
+
+def frame(byte1, bitrate_index, rate_index=0, rng=random, padding=0):
+    """One stereo frame: header plus random payload"""
+    byte2 = bitrate_index << 4 | rate_index << 2 | padding << 1
+    length = _FRAMES[byte1 << 8 | byte2][0]
+    return bytes([0xFF, byte1, byte2, 0x00]) + rng.randbytes(length - 4)
+
+def stream(seconds, byte1, sample_rate, bitrates, rng, xing=False):
+    """(mp3 bytes, true seconds) for about seconds of audio"""
+    samples_per_frame = 1152 if byte1 == 0xFB else 576
+    count = int(seconds * sample_rate / samples_per_frame)
+    frames = [frame(byte1, rng.choice(bitrates), rng=rng) for _ in range(count)]
+    if xing:
+        # An Info frame up front carrying the frame count, as LAME writes for VBR
+        info = bytearray(frame(byte1, bitrates[-1], rng=rng))
+        offset = 4 + (32 if byte1 == 0xFB else 17)
+        info[offset:offset + 12] = b"Xing" + (1).to_bytes(4, "big") + count.to_bytes(4, "big")
+        frames.insert(0, bytes(info))
+    return b"".join(frames), count * samples_per_frame / sample_rate
+
+def time_parse(data, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parsed = mp3_duration(data)
+    return (time.perf_counter() - started) / repeat, parsed
+
+def report(name, data, truth, nominal_kbps, repeat):
+    per_clip, parsed = time_parse(data, repeat)
+    naive = len(data) * 8 / (nominal_kbps * 1000)
+    megabytes = len(data) / 1024 / 1024
+
+    def error(value):
+        if truth is None or value is None:
+            return "-"
+        return f"{(value - truth) / truth:+.2%}"
+
+    print(f"{name:<14} {len(data) / 1024:>8.0f} {truth or float('nan'):>8.2f} {parsed or float('nan'):>8.2f} "
+          f"{error(parsed):>8} {naive:>8.2f} {error(naive):>8} {per_clip * 1e6:>9.0f} {per_clip / megabytes * 1e6:>9.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of each synthetic clip")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--file", action="append", default=[], help="also parse this MP3 (repeatable)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mp3, mp3_low = AUDIO_FORMATS["mp3"], AUDIO_FORMATS["mp3_low"]
+    # Bitrate indexes: 9 = 128 kbps (MPEG-1), 4 = 32 kbps (MPEG-2); VBR spans 64-256 kbps with a 128 kbps nominal rate
+    cases = [
+        ("mp3 CBR", *stream(args.seconds, 0xFB, 44100, [9], rng), mp3.bitrate_kbps),
+        ("mp3_low CBR", *stream(args.seconds, 0xF3, 22050, [4], rng), mp3_low.bitrate_kbps),
+        ("mp3 VBR", *stream(args.seconds, 0xFB, 44100, [5, 7, 9, 11, 12], rng), mp3.bitrate_kbps),
+        ("mp3 VBR+Xing", *stream(args.seconds, 0xFB, 44100, [5, 7, 9, 11, 12], rng, xing=True), mp3.bitrate_kbps)
+    ]
+    for path in args.file:
+        with open(path, "rb") as f:
+            cases.append((os.path.basename(path)[:14], f.read(), None, mp3.bitrate_kbps))
+
+    header = (f"{'clip':<14} {'KB':>8} {'true s':>8} {'parsed s':>8} {'error':>8} "
+              f"{'naive s':>8} {'error':>8} {'us/clip':>9} {'us/MB':>9}")
+    print(header)
+    print("-" * len(header))
+    for name, data, truth, nominal_kbps in cases:
+        report(name, data, truth, nominal_kbps, args.repeat)
+
+    print("\nparsed = frame header walk (Xing frame count when present), naive = bytes / nominal bitrate")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Agent audio input path: per-frame objects vs. the PCM ring buffer
+
+Pushes a recorded (or synthetic) call through an emulation of the agent's
+input path, as fast as possible, once per path:
+
+- frames: what the session does without the ring. Each room-track frame
+  object is forwarded as-is; the VAD converts it, buffers speech frames in a
+  list and joins them for STT at end of speech (rtc.combine_audio_frames).
+- ring:   RingBufferAudioInput's path. Each track frame is copied into
+  services.pcm_ring.PCMRingBuffer; VAD reads zero-copy frame views and STT
+  gets the utterance as a view of the ring (ring.span).
+
+Both paths allocate the incoming track frame exactly like the FFI does. It
+reports frames/sec, CPU per frame and, per room, peak traced memory and the
+rate of generation-0 GC collections in real time (CPython has no allocation
+counter; gen-0 collections run every 700 net container allocations).
+
+    cd backend
+    python benchmarks/audio_ring_benchmark.py --seconds 60 --rooms 20
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit import rtc
+from services.pcm_ring import PCMRingBuffer
+
+SAMPLE_RATE = 24000  # RoomInputOptions default
+TRACK_FRAME_MS = 50  # what the room's AudioStream delivers
+SPEECH_THRESHOLD = 500
+
+def synthetic_call(seconds, sample_rate=SAMPLE_RATE, talk=1.5, pause=2.5):
+    """Alternating talk/pause, like a caller taking turns"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voiced = (t % (talk + pause)) < talk
+    return (np.sin(2 * np.pi * 220 * t) * 0.3 * 32767 * voiced).astype(np.int16)
+
+def track_frames(pcm):
+    """Yield frames the way rtc.AudioStream does: a fresh buffer per frame"""
+    step = SAMPLE_RATE * TRACK_FRAME_MS // 1000
+    raw = pcm.tobytes()
+    for offset in range(0, len(raw) - step * 2 + 1, step * 2):
+        yield rtc.AudioFrame(bytearray(raw[offset:offset + step * 2]), SAMPLE_RATE, 1, step)
+
+class Vad:
+    """Stand-in VAD: converts each frame like silero does and endpoints on energy"""
+
+    def __init__(self):
+        self.speaking = False
+        self.silent_frames = 0
+        self.utterances = 0
+
+    def is_speech(self, samples):
+        data = samples.astype(np.float32) / 32768.0
+        return float(np.abs(data).mean()) * 32768.0 > SPEECH_THRESHOLD
+
+    def update(self, speech):
+        """True when this frame ends an utterance"""
+        if speech:
+            self.speaking, self.silent_frames = True, 0
+            return False
+        if self.speaking:
+            self.silent_frames += 1
+            if self.silent_frames >= 6:
+                self.speaking = False
+                self.utterances += 1
+                return True
+        return False
+
+async def frames_path(pcm):
+    queue = asyncio.Queue()
+    vad = Vad()
+    speech = []
+    stt_bytes = 0
+
+    async def consume():
+        nonlocal stt_bytes
+        while (frame := await queue.get()) is not None:
+            voiced = vad.is_speech(np.frombuffer(frame.data, dtype=np.int16))
+            if voiced or vad.speaking:
+                speech.append(frame)
+            if vad.update(voiced):
+                utterance = rtc.combine_audio_frames(speech)
+                stt_bytes += utterance.data.nbytes
+                speech.clear()
+
+    async def produce():
+        count = 0
+        for frame in track_frames(pcm):
+            queue.put_nowait(frame)
+            count += 1
+            if count % 8 == 0:
+                await asyncio.sleep(0)
+        queue.put_nowait(None)
+        return count
+
+    count, _ = await asyncio.gather(produce(), consume())
+    return count, vad.utterances, stt_bytes
+
+async def ring_path(pcm, ring_seconds, frame_ms):
+    ring = PCMRingBuffer.for_duration(ring_seconds, frame_ms, SAMPLE_RATE)
+    vad = Vad()
+    start = None
+    stt_bytes = 0
+
+    async def consume():
+        nonlocal start, stt_bytes
+        while (seq := await ring.read()) is not None:
+            frame = rtc.AudioFrame(ring.frame_bytes(seq), SAMPLE_RATE, 1, ring.frame_samples)
+            voiced = vad.is_speech(np.frombuffer(frame.data, dtype=np.int16))
+            if (voiced or vad.speaking) and start is None:
+                start = seq
+            if vad.update(voiced):
+                utterance = ring.span(start, seq + 1)
+                stt_bytes += utterance.nbytes
+                start = None
+
+    async def produce():
+        count = 0
+        for frame in track_frames(pcm):
+            await ring.write(frame.data)
+            count += 1
+            if count % 8 == 0:
+                await asyncio.sleep(0)
+        ring.close()
+        return count
+
+    # gather so a consumer error (e.g. an utterance longer than the ring
+    # retains) fails the run instead of leaving the writer blocked
+    count, _ = await asyncio.gather(produce(), consume())
+    return count, vad.utterances, stt_bytes
+
+async def run_rooms(path, rooms, pcm, args):
+    if path == "frames":
+        return await asyncio.gather(*(frames_path(pcm) for _ in range(rooms)))
+    return await asyncio.gather(*(ring_path(pcm, args.ring_seconds, args.frame_ms) for _ in range(rooms)))
+
+def measure(path, pcm, args):
+    """Timing run, then a traced run for memory (tracemalloc skews timings)"""
+    gc.collect()
+    collections = gc.get_stats()[0]["collections"]
+    cpu, wall = time.process_time(), time.perf_counter()
+    results = asyncio.run(run_rooms(path, args.rooms, pcm, args))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    gc.collect()
+    tracemalloc.start()
+    asyncio.run(run_rooms(path, args.rooms, pcm, args))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    frames = sum(result[0] for result in results)
+    # The call is replayed faster than real time; scale rates to one room in real time
+    realtime = args.seconds / wall * args.rooms
+    return {
+        "utterances": sum(result[1] for result in results),
+        "stt_mb": sum(result[2] for result in results) / 1024 / 1024,
+        "frames_per_sec": frames / wall,
+        "cpu_us_per_frame": cpu / frames * 1e6,
+        "peak_kb_per_room": peak / 1024 / args.rooms,
+        "gc_per_room_sec": collections / wall / realtime
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60, help="call length per room")
+    parser.add_argument("--rooms", type=int, default=20)
+    # Half the ring stays readable after it's consumed, which has to cover the
+    # longest utterance here because STT reads it back out of the ring
+    parser.add_argument("--ring-seconds", type=float, default=5)
+    parser.add_argument("--frame-ms", type=int, default=TRACK_FRAME_MS)
+    args = parser.parse_args()
+
+    pcm = synthetic_call(args.seconds)
+    print(f"🎙️ {args.rooms} rooms x {args.seconds:.0f}s call, track frames {TRACK_FRAME_MS} ms, ring frames {args.frame_ms} ms")
+    header = (f"{'path':>7} {'frames/s':>10} {'µs/frame':>9} {'peak KB/room':>13} "
+              f"{'gen0 GC/room/s':>15} {'utterances':>11} {'STT MB':>7}")
+    print(header)
+    print("-" * len(header))
+    for path in ("frames", "ring"):
+        result = measure(path, pcm, args)
+        print(
+            f"{path:>7} {result['frames_per_sec']:>10.0f} {result['cpu_us_per_frame']:>9.1f} "
+            f"{result['peak_kb_per_room']:>13.1f} {result['gc_per_room_sec']:>15.3f} "
+            f"{result['utterances']:>11} {result['stt_mb']:>7.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Perceived-latency benchmark for filler audio
+
+Runs the agent's filler scheduler (services.filler_audio.play_with_filler)
+against a stub LLM that injects a configurable time-to-first-token and a stub
+TTS with a fixed time-to-first-audio. Filler starts when the first
+synthesized frame isn't ready after the threshold. Perceived latency is the time from the
+end of the user's turn until the first audible frame, with and without filler.
+
+    cd backend
+    python benchmarks/filler_latency_benchmark.py
+    python benchmarks/filler_latency_benchmark.py --delays 0.2 0.5 1 2 4 --threshold-ms 700
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.filler_audio import pcm_chunks, play_with_filler
+
+SAMPLE_RATE = 22050
+FRAME_SECONDS = 0.02
+
+async def stub_llm(ttft, tokens=12, inter_token=0.03):
+    """Text stream whose first token arrives after ttft seconds"""
+    await asyncio.sleep(ttft)
+    for i in range(tokens):
+        yield f"word{i} "
+        await asyncio.sleep(inter_token)
+
+def stub_tts(tts_first_audio, frames=25):
+    async def synthesize(text_stream):
+        await text_stream.__anext__()
+        await asyncio.sleep(tts_first_audio)
+        for _ in range(frames):
+            yield b"\x10\x00" * int(SAMPLE_RATE * FRAME_SECONDS)
+        async for _ in text_stream:
+            pass
+    return synthesize
+
+async def run_turn(ttft, tts_first_audio, threshold, filler_chunks):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_audio = None
+    real_audio = None
+    stats = {}
+    async for frame in play_with_filler(
+        stub_llm(ttft),
+        stub_tts(tts_first_audio),
+        filler_chunks,
+        threshold,
+        frame_seconds=FRAME_SECONDS,
+        stats=stats
+    ):
+        now = loop.time() - started
+        if first_audio is None:
+            first_audio = now
+        if frame.startswith(b"\x10\x00") and real_audio is None:
+            real_audio = now
+    return first_audio, real_audio, stats
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def main_async(args):
+    # 1.5 s of quiet tone standing in for a synthesized "Hmm, let me think"
+    filler = pcm_chunks(b"\x20\x00" * int(SAMPLE_RATE * 1.5), SAMPLE_RATE, frame_ms=int(FRAME_SECONDS * 1000))
+    threshold = args.threshold_ms / 1000
+
+    print(f"threshold {args.threshold_ms} ms, TTS first audio {args.tts_ms} ms")
+    header = f"{'LLM TTFT s':>10} {'no filler s':>12} {'filler s':>9} {'improved s':>11} {'filler?':>8} {'real audio delay s':>19}"
+    print(header)
+    print("-" * len(header))
+
+    baselines, perceived_all, played = [], [], 0
+    for delay in args.delays:
+        baseline, _, _ = await run_turn(delay, args.tts_ms / 1000, threshold, [])
+        perceived, real, stats = await run_turn(delay, args.tts_ms / 1000, threshold, filler)
+        baselines.append(baseline)
+        perceived_all.append(perceived)
+        played += stats["filler_played"]
+        print(
+            f"{delay:>10.2f} {baseline:>12.3f} {perceived:>9.3f} {baseline - perceived:>11.3f} "
+            f"{'yes' if stats['filler_played'] else 'no':>8} {real - baseline:>19.3f}"
+        )
+
+    print(f"\n💬 Filler played on {played}/{len(args.delays)} turns ({played / len(args.delays):.0%})")
+    for label, values in (("no filler", baselines), ("filler", perceived_all)):
+        print(f"⏱️ {label:>9}: p50 {percentile(values, 50) * 1000:.0f} ms, p95 {percentile(values, 95) * 1000:.0f} ms")
+    print("   (last column: extra delay of the real reply caused by the filler cut-off; should be ~0)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delays", type=float, nargs="*", default=[0.2, 0.5, 0.8, 1.2, 2.0, 3.0])
+    parser.add_argument("--threshold-ms", type=int, default=700)
+    parser.add_argument("--tts-ms", type=int, default=250)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Exercise the SLO degradation ladder (services/slo_controller.py) with injected latency
+
+Runs a scripted scenario - normal, slow LLM, slow TTS, slow avatar, then
+recovered - against stub services with per-phase latencies, and prints how
+the controller steps down and back up. The stubs answer the way the real
+services would to each step: a faster model halves time to first token,
+a shorter max_tokens shortens the reply, cache-only TTS returns only clips
+it has synthesized before.
+
+By default turns go through the Flask /process-voice path in-process (test
+client, stub OpenAI/ElevenLabs in the service registry). --agent runs them
+through --rooms AgentSessions with the agent's FillerAgent and metrics
+hooks and the stubs from tools/stub_agent_services.py instead; the sessions
+follow the ladder's model and max_tokens as they change
+(hedra_agent.follow_ladder). In both modes a new room joins every
+--room-interval seconds in a process of its own, like an agent job, which
+starts an avatar (at the phase's avatar latency) unless the ladder has new
+rooms on audio-only and reports the start through the shared SLO store;
+each phase ends with the plan a new room would get.
+
+Window, hold and recovery times are scaled down so a run takes a couple
+of minutes.
+
+    cd backend
+    python benchmarks/slo_ladder_benchmark.py
+    python benchmarks/slo_ladder_benchmark.py --agent --phase-seconds 30
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Short windows so the ladder moves within a phase; keep metered usage, SLO
+# state and the stub TTS's speaking rate out of the real stores. Room-start
+# processes inherit all of it, including the one temporary directory.
+if "SLO_BENCHMARK_DIR" not in os.environ:
+    os.environ["SLO_BENCHMARK_DIR"] = tempfile.mkdtemp(prefix="slo-ladder-")
+STATE_DIR = os.environ["SLO_BENCHMARK_DIR"]
+os.environ.setdefault("SLO_WINDOW_SECONDS", "10")
+os.environ.setdefault("SLO_HOLD_SECONDS", "2")
+os.environ.setdefault("SLO_RECOVER_SECONDS", "5")
+os.environ.setdefault("SLO_SYNC_INTERVAL", "0.5")
+os.environ.setdefault("SLO_ENABLED", "true")
+os.environ.setdefault("USAGE_DB_PATH", os.path.join(STATE_DIR, "usage.db"))
+os.environ.setdefault("SPEECH_RATE_DB_PATH", os.path.join(STATE_DIR, "usage.db"))
+os.environ["TURN_RECORDER_ENABLED"] = "false"
+
+from config import Config
+from services.slo_controller import slo
+
+# name: latency in seconds per stage (LLM is time to first token with the normal model)
+PHASES = [
+    ("normal", {"stt": 0.3, "llm": 0.5, "tts": 0.3, "avatar": 1.5}),
+    ("slow_llm", {"stt": 0.3, "llm": 2.5, "tts": 0.3, "avatar": 1.5}),
+    ("slow_tts", {"stt": 0.3, "llm": 0.5, "tts": 2.5, "avatar": 1.5}),
+    ("slow_avatar", {"stt": 0.3, "llm": 0.5, "tts": 0.3, "avatar": 7.0}),
+    ("recovered", {"stt": 0.3, "llm": 0.5, "tts": 0.3, "avatar": 1.5})
+]
+
+# Each reply opens with a sentence unique to the turn, so TTS has fresh work as well as cache hits
+REPLIES = [
+    "Sure, the train leaves every ten minutes from the north platform. The ride takes about twenty minutes.",
+    "It should be sunny all afternoon with a light breeze. It's a good day for a walk by the river.",
+    "I can help with that. Tell me which day works best and I'll look for an open slot in the morning."
+]
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Scenario:
+    """Current phase latencies, shared by the stubs"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.latency = dict(PHASES[0][1])
+
+    def sleep(self, stage, factor=1.0):
+        time.sleep(self.latency[stage] * self.scale * factor)
+
+class StubOpenAI:
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.turns = 0
+
+    def transcribe_audio_sync(self, audio_file, cancel_event=None, usage=None):
+        self.scenario.sleep("stt")
+        return "How do I get to the station?"
+
+    def stream_response_sync(self, user_message, conversation_history=None, cancel_event=None,
+                             model=None, max_tokens=None, usage=None, **kwargs):
+        self.scenario.sleep("llm", 0.5 if model == Config.SLO_FAST_MODEL else 1.0)
+        self.turns += 1
+        reply = f"Okay, question {self.turns}. {REPLIES[self.turns % len(REPLIES)]}".split()
+        # Roughly 1.3 tokens per word
+        for word in reply[:max(1, int((max_tokens or 150) / 1.3))]:
+            yield word + " "
+            time.sleep(0.005)
+
+class StubElevenLabs:
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.cache = set()
+
+    def text_to_speech_sync(self, text, cancel_event=None, audio_format=None, usage=None, cache_only=False):
+        if text not in self.cache:
+            if cache_only:
+                return None
+            self.scenario.sleep("tts")
+            self.cache.add(text)
+            if usage is not None:
+                usage["tts_characters"] = usage.get("tts_characters", 0) + len(text)
+        return io.BytesIO(b"\xff\xfb\x90\x00" * 64)
+
+class RoomStarts:
+    """A new room every interval, each in its own process like an agent job (start_room)"""
+
+    def __init__(self, scenario, interval):
+        self.scenario = scenario
+        self.interval = interval
+        self._context = multiprocessing.get_context("spawn")
+        self._rooms = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="room-starts", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        for room in self._rooms:
+            room.join()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            room = self._context.Process(
+                target=start_room, args=(self.scenario.latency["avatar"] * self.scenario.scale,), daemon=True
+            )
+            room.start()
+            self._rooms = [other for other in self._rooms if other.is_alive()] + [room]
+
+def start_room(avatar_seconds):
+    """One job process: the avatar starts unless the shared ladder says audio-only, and reports how long it took"""
+    from services.usage_meter import BudgetDecision
+
+    slo.wait_ready()
+    if slo.apply(BudgetDecision(Config.OPENAI_MODEL, Config.OPENAI_MAX_TOKENS)).avatar_enabled:
+        started = time.perf_counter()
+        time.sleep(avatar_seconds)
+        slo.observe("avatar", time.perf_counter() - started)
+    slo.stop()
+
+def describe(budget):
+    mode = "avatar" if budget.avatar_enabled else "audio-only"
+    return f"{mode}, {budget.model}, max_tokens {budget.max_tokens}"
+
+def run_flask(args, scenario):
+    import app as appmod
+    from services.usage_meter import BudgetDecision
+
+    appmod.registry.register("openai", lambda: StubOpenAI(scenario))
+    appmod.registry.register("elevenlabs", lambda: StubElevenLabs(scenario))
+    client = appmod.app.test_client()
+
+    def plan():
+        return slo.apply(BudgetDecision(Config.OPENAI_MODEL, Config.OPENAI_MAX_TOKENS))
+
+    index = 0
+    with RoomStarts(scenario, args.room_interval):
+        for name, latency in PHASES:
+            scenario.latency = dict(latency)
+            latencies = []
+            phase_end = time.perf_counter() + args.phase_seconds
+            while time.perf_counter() < phase_end:
+                started = time.perf_counter()
+                response = client.post(
+                    "/process-voice",
+                    data={"audio": (io.BytesIO(b"RIFF" + index.to_bytes(4, "big")), "turn.wav"),
+                          "session_id": "slo-bench"},
+                    headers={"Accept": "text/event-stream"}
+                )
+                response.get_data()  # Drain the event stream
+                latencies.append(time.perf_counter() - started)
+                index += 1
+                time.sleep(args.turn_interval)
+            print_phase(name, latencies, describe(plan()))
+
+def run_agent(args, scenario):
+    import hedra_agent
+    from services.prompt_registry import prompts
+    from tools.stub_agent_services import (
+        INPUT_SAMPLE_RATE, PlayoutAudioOutput, ReplayAudioInput, StubLLM, StubSTT, StubTTS, tone
+    )
+
+    llms = []  # (model, StubLLM) for every LLM the sessions have built
+
+    def llm_ttft(model):
+        return scenario.latency["llm"] * scenario.scale * (0.5 if model == Config.SLO_FAST_MODEL else 1.0)
+
+    def make_llm(model, max_completion_tokens=None):
+        """A stub answering like the options would: faster on the fast model, shorter with fewer tokens"""
+        reply = f"Okay. {REPLIES[len(llms) % len(REPLIES)]}".split()
+        llm = StubLLM(ttft=llm_ttft(model),
+                      reply=" ".join(reply[:max(1, int((max_completion_tokens or 150) / 1.3))]))
+        llms.append((model, llm))
+        return llm
+
+    def plan():
+        return hedra_agent.session_budget("slo-bench-new-room", count=False)
+
+    async def run_room(index, tts, latencies, stop):
+        # Rooms are staggered so their turns spread over the interval
+        offset = 0.5 + index * args.turn_interval / args.rooms
+        turns = int(args.phase_seconds * len(PHASES) / args.turn_interval) + 1
+        waiting = []
+        audio_in = ReplayAudioInput(tone(1.0), INPUT_SAMPLE_RATE,
+                                    [offset + turn * args.turn_interval for turn in range(turns)],
+                                    on_end_of_speech=lambda turn, at: waiting.append(at))
+
+        def on_first_frame(at):
+            if waiting:
+                latencies.append(at - waiting.pop(0))
+
+        room_name = f"slo-bench-{index}"
+        ladder_llm = hedra_agent.LadderLLM(make_llm, hedra_agent.llm_options(hedra_agent.session_budget(room_name)))
+        session = hedra_agent.create_session(stt=StubSTT(), llm=ladder_llm, tts=tts, turn_detection="stt")
+        session.input.audio = audio_in
+        session.output.audio = PlayoutAudioOutput(on_first_frame=on_first_frame)
+        hedra_agent.track_session_metrics(session, room_name)
+        await session.start(agent=hedra_agent.FillerAgent(instructions=prompts.get("audio_only").instructions))
+        try:
+            # What hold_session does between its checks
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=args.ladder_interval)
+                except asyncio.TimeoutError:
+                    await hedra_agent.follow_ladder(ladder_llm, room_name)
+        finally:
+            audio_in.close()
+            await session.aclose()
+
+    async def main():
+        tts = StubTTS(ttfb=scenario.latency["tts"] * scenario.scale)
+        latencies, stop = [], asyncio.Event()
+        rooms = [asyncio.create_task(run_room(index, tts, latencies, stop)) for index in range(args.rooms)]
+
+        with RoomStarts(scenario, args.room_interval):
+            for name, latency in PHASES:
+                scenario.latency = dict(latency)
+                for model, llm in llms:
+                    llm.ttft = llm_ttft(model)
+                tts.ttfb = latency["tts"] * scenario.scale
+                first = len(latencies)
+                await asyncio.sleep(args.phase_seconds)
+                budget = plan()
+                print_phase(name, latencies[first:], f"{describe(budget)} {hedra_agent.llm_options(budget)}")
+        stop.set()
+        await asyncio.gather(*rooms)
+
+    asyncio.run(main())
+
+def print_phase(name, latencies, plan):
+    steps = ", ".join(slo.active_steps()) or "-"
+    print(f"{name:<12} {len(latencies):>5} {percentile(latencies, 50) * 1000:>7.0f} "
+          f"{percentile(latencies, 95) * 1000:>7.0f}  {steps:<45} {plan}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent", action="store_true", help="run turns through an AgentSession instead of Flask")
+    parser.add_argument("--phase-seconds", type=float, default=None, help="default 20 (Flask) or 30 (agent)")
+    parser.add_argument("--turn-interval", type=float, default=None,
+                        help="seconds between a session's turns (default 0.2 for Flask, 10 for the agent)")
+    parser.add_argument("--rooms", type=int, default=5, help="concurrent agent sessions (--agent)")
+    parser.add_argument("--room-interval", type=float, default=1.0, help="seconds between new rooms (avatar starts)")
+    parser.add_argument("--ladder-interval", type=float, default=2.0,
+                        help="seconds between an agent session's ladder checks (--agent)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every injected latency")
+    args = parser.parse_args()
+    if args.phase_seconds is None:
+        args.phase_seconds = 30.0 if args.agent else 20.0
+    if args.turn_interval is None:
+        args.turn_interval = 10.0 if args.agent else 0.2
+
+    scenario = Scenario(args.scale)
+    targets = {stage: round(seconds * 1000) for stage, seconds in slo.targets.items()}
+    print(f"🎯 p95 targets (ms): {targets}; ladder: {' -> '.join(slo.ladder)}")
+    print(f"⏱️ Window {slo.window_seconds:g}s, hold {slo.hold_seconds:g}s, recover {slo.recover_seconds:g}s, "
+          f"{args.phase_seconds:g}s per phase ({'agent' if args.agent else 'flask'} path)")
+    header = f"{'phase':<12} {'turns':>5} {'p50 ms':>7} {'p95 ms':>7}  {'steps at phase end':<45} new room"
+    print(header)
+    print("-" * len(header))
+
+    if args.agent:
+        run_agent(args, scenario)
+    else:
+        run_flask(args, scenario)
+
+    print("\nLadder changes (oldest first):")
+    for change in slo.snapshot()["changes"]:
+        arrow = "📉" if change["direction"] == "down" else "📈"
+        print(f"   {arrow} {change['direction']:<4} {change['step']:<14} {', '.join(change['breached'])}")
+
+if __name__ == "__main__":
+    main()
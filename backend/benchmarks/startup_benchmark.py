@@ -0,0 +1,127 @@
+"""Startup-time benchmark for the Flask backend and the agent worker
+
+Measures:
+  * import time of each entry point via `python -X importtime`
+  * time-to-first-served-request: spawn the Flask app and poll /health
+
+Exits non-zero when a measurement exceeds its budget, so it can gate CI.
+
+    cd backend
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --import-budget-ms 800 --ttfr-budget-ms 2500
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGETS_MS = {
+    "app": 1500,
+    "hedra_agent": 3000,
+    "ttfr": 4000
+}
+
+def measure_import(module, top=8):
+    """Import a module in a fresh interpreter with -X importtime; returns (total_ms, slowest)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # Lines look like: "import time:   self [us] | cumulative | <2 spaces per depth>name"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line.split("|")
+        raw_name = raw_name[1:]
+        depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+        entries.append((int(cumulative_us), depth, raw_name.strip()))
+
+    total_us = next((us for us, _, name in entries if name == module), max(us for us, _, _ in entries))
+    top_level = sorted(((us, name) for us, depth, name in entries if depth == 0), reverse=True)[:top]
+    return total_us / 1000, [(us / 1000, name) for us, name in top_level]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_time_to_first_request(timeout=30):
+    """Start the Flask app in a subprocess and time until /health answers"""
+    port = free_port()
+    code = (
+        "from app import app; "
+        f"app.run(host='127.0.0.1', port={port}, debug=False, use_reloader=False)"
+    )
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"app exited early with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="repetitions; the best run is reported")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_BUDGETS_MS["app"])
+    parser.add_argument("--agent-import-budget-ms", type=float, default=DEFAULT_BUDGETS_MS["hedra_agent"])
+    parser.add_argument("--ttfr-budget-ms", type=float, default=DEFAULT_BUDGETS_MS["ttfr"])
+    parser.add_argument("--skip-agent", action="store_true", help="don't measure hedra_agent imports")
+    args = parser.parse_args()
+
+    budgets = {
+        "import app": args.import_budget_ms,
+        "import hedra_agent": args.agent_import_budget_ms,
+        "time to first request": args.ttfr_budget_ms
+    }
+    results = {}
+
+    modules = ["app"] if args.skip_agent else ["app", "hedra_agent"]
+    for module in modules:
+        runs = [measure_import(module) for _ in range(args.runs)]
+        best_ms, slowest = min(runs, key=lambda run: run[0])
+        results[f"import {module}"] = best_ms
+        print(f"📦 import {module}: {best_ms:.1f} ms")
+        for ms, name in slowest:
+            print(f"     {ms:8.1f} ms  {name}")
+
+    results["time to first request"] = min(measure_time_to_first_request() for _ in range(args.runs))
+    print(f"🚀 time to first served request: {results['time to first request']:.1f} ms")
+
+    failed = False
+    for name, value in results.items():
+        budget = budgets[name]
+        ok = value <= budget
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {name}: {value:.1f} ms (budget {budget:.0f} ms)")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare TTS output formats: bytes on the wire and client time-to-playable
+
+For every format in services.audio_formats the script synthesizes the same
+text through ElevenLabsService (or, with --offline / no API key, estimates the
+size from the nominal bitrate) and models how long a client on each link
+profile waits before playback can start. /process-voice returns audio as
+base64 inside JSON, so bytes on the wire are the base64 size.
+
+    cd backend
+    python benchmarks/tts_format_benchmark.py
+    python benchmarks/tts_format_benchmark.py --offline --text "Hello there"
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.audio_formats import AUDIO_FORMATS
+
+DEFAULT_TEXT = (
+    "Sure! The quickest way to get there is to take the train two stops north, "
+    "then walk about five minutes east. Let me know if you'd like directions for driving instead."
+)
+
+# name: (downlink megabits per second, round trip seconds)
+LINK_PROFILES = {
+    "3g": (0.75, 0.30),
+    "4g": (9.0, 0.08),
+    "wifi": (30.0, 0.02)
+}
+
+WORDS_PER_SECOND = 2.5
+
+def synthesize(service, text, fmt_name):
+    """Return (audio_bytes, seconds) from the real API, bypassing the cache"""
+    service._cache.clear()
+    started = time.perf_counter()
+    audio = service.text_to_speech_sync(text, audio_format=fmt_name)
+    elapsed = time.perf_counter() - started
+    if audio is None:
+        raise RuntimeError(f"synthesis failed for {fmt_name}")
+    return audio.getvalue(), elapsed
+
+def estimate(text, fmt):
+    """Nominal size for offline runs: bitrate x estimated speech duration"""
+    duration = len(text.split()) / WORDS_PER_SECOND
+    return int(fmt.bitrate_kbps * 1000 / 8 * duration), None
+
+def time_to_playable(wire_bytes, synthesis_seconds, link):
+    megabits, rtt = link
+    transfer = wire_bytes * 8 / (megabits * 1_000_000)
+    return (synthesis_seconds or 0.0) + rtt + transfer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--text", default=DEFAULT_TEXT)
+    parser.add_argument("--offline", action="store_true", help="estimate sizes instead of calling ElevenLabs")
+    parser.add_argument("--formats", nargs="*", default=list(AUDIO_FORMATS))
+    args = parser.parse_args()
+
+    offline = args.offline or not Config.ELEVENLABS_API_KEY
+    service = None
+    if not offline:
+        from services.elevenlabs_service import ElevenLabsService
+        service = ElevenLabsService()
+    else:
+        print("ℹ️ Offline mode: sizes estimated from nominal bitrates, synthesis time excluded")
+
+    header = f"{'format':<9} {'audio B':>9} {'wire B':>9} {'synth s':>8}" + "".join(
+        f" {name + ' ttp s':>10}" for name in LINK_PROFILES
+    )
+    print(header)
+    print("-" * len(header))
+
+    for fmt_name in args.formats:
+        fmt = AUDIO_FORMATS[fmt_name]
+        if offline:
+            audio_len, synthesis = estimate(args.text, fmt)
+        else:
+            audio_bytes, synthesis = synthesize(service, args.text, fmt_name)
+            audio_len = len(audio_bytes)
+        wire = len(base64.b64encode(b"\0" * audio_len))
+        synth_text = f"{synthesis:.2f}" if synthesis is not None else "-"
+        row = f"{fmt_name:<9} {audio_len:>9} {wire:>9} {synth_text:>8}"
+        for link in LINK_PROFILES.values():
+            row += f" {time_to_playable(wire, synthesis, link):>10.2f}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
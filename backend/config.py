@@ -6,19 +6,81 @@ load_dotenv()
 class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '150'))
+    OPENAI_FALLBACK_MODEL = os.getenv('OPENAI_FALLBACK_MODEL', 'gpt-4o-mini')  # Cheaper model once over budget
+    OPENAI_FALLBACK_MAX_TOKENS = int(os.getenv('OPENAI_FALLBACK_MAX_TOKENS', '80'))
     
     # ElevenLabs Configuration
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
     ELEVENLABS_VOICE_ID = os.getenv('ELEVENLABS_VOICE_ID', 'EXAVITQu4vr4xnSDxMaL')  # Default voice
+    TTS_CACHE_SIZE = int(os.getenv('TTS_CACHE_SIZE', '128'))  # Cached clips per (voice, format, text)
+    TTS_STREAM_WORKERS = int(os.getenv('TTS_STREAM_WORKERS', '8'))  # Concurrent sentence TTS calls for streamed replies
     
     # Hedra Live Avatar Configuration
     HEDRA_API_KEY = os.getenv('HEDRA_API_KEY')
     HEDRA_AVATAR_ID = os.getenv('HEDRA_AVATAR_ID', 'default-avatar-id')
+    HEDRA_MAX_SPEAKING_SECONDS = int(os.getenv('HEDRA_MAX_SPEAKING_SECONDS', '60'))  # Per response
+    
+    # Turn Sequencing
+    TURN_SESSION_TTL_SECONDS = int(os.getenv('TURN_SESSION_TTL_SECONDS', '1800'))  # Idle sessions' turn state is dropped after this
+    
+    # Agent Configuration
+    AGENT_MAX_SESSION_SECONDS = int(os.getenv('AGENT_MAX_SESSION_SECONDS', '3600'))  # Hard cap per room
+    
+    # Filler Audio (masks slow LLM responses)
+    FILLER_ENABLED = os.getenv('FILLER_ENABLED', 'True').lower() == 'true'
+    FILLER_THRESHOLD_MS = int(os.getenv('FILLER_THRESHOLD_MS', '700'))  # Agent: time to first synthesized audio
+    FILLER_CLIENT_THRESHOLD_MS = int(os.getenv('FILLER_CLIENT_THRESHOLD_MS', '1800'))  # Browser: upload to reply
+    FILLER_CACHE_DIR = os.getenv('FILLER_CACHE_DIR', 'filler_cache')
+    
+    # Usage Metering
+    USAGE_DB_PATH = os.getenv('USAGE_DB_PATH', 'usage.db')
+    USAGE_FLUSH_INTERVAL = float(os.getenv('USAGE_FLUSH_INTERVAL', '5'))  # Seconds between batch writes
+    USAGE_REFRESH_INTERVAL = float(os.getenv('USAGE_REFRESH_INTERVAL', '5'))  # Seconds a stored total is reused before re-reading it
+    USAGE_CACHE_SESSIONS = int(os.getenv('USAGE_CACHE_SESSIONS', '10000'))  # Sessions whose stored totals stay in memory
+    USAGE_BUDGETS = os.getenv('USAGE_BUDGETS')  # JSON overriding services.usage_meter.DEFAULT_BUDGETS
+    
+    # Speaking Rates (per voice, fitted from TTS output)
+    SPEECH_RATE_DB_PATH = os.getenv('SPEECH_RATE_DB_PATH', USAGE_DB_PATH)  # Fits shared by every process
+    SPEECH_RATE_SYNC_INTERVAL = float(os.getenv('SPEECH_RATE_SYNC_INTERVAL', '30'))  # Seconds between merging new clips into the store
+    
+    # Latency SLOs (per-stage p95 targets; a breach steps down SLO_LADDER until latency recovers)
+    SLO_ENABLED = os.getenv('SLO_ENABLED', 'True').lower() == 'true'
+    SLO_TARGETS_MS = os.getenv('SLO_TARGETS_MS')  # JSON overriding services.slo_controller.DEFAULT_TARGETS_MS
+    SLO_LADDER = os.getenv('SLO_LADDER', 'short_replies,fast_model,cached_audio,audio_only')
+    SLO_WINDOW_SECONDS = float(os.getenv('SLO_WINDOW_SECONDS', '60'))  # Rolling window per stage
+    SLO_HOLD_SECONDS = float(os.getenv('SLO_HOLD_SECONDS', '15'))  # Minimum time between ladder changes
+    SLO_RECOVER_SECONDS = float(os.getenv('SLO_RECOVER_SECONDS', '60'))  # Healthy this long before stepping back up
+    SLO_SHORT_MAX_TOKENS = int(os.getenv('SLO_SHORT_MAX_TOKENS', '60'))
+    SLO_FAST_MODEL = os.getenv('SLO_FAST_MODEL', OPENAI_FALLBACK_MODEL)
+    SLO_DB_PATH = os.getenv('SLO_DB_PATH', USAGE_DB_PATH)  # Samples and ladder state shared by every process
+    SLO_SYNC_INTERVAL = float(os.getenv('SLO_SYNC_INTERVAL', '2'))  # Seconds between writing samples and re-evaluating
+    
+    # Profiling (admin endpoints need an X-Admin-Token header matching ADMIN_TOKEN; unset disables them)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '60'))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_SIGNAL_SECONDS = int(os.getenv('PROFILE_SIGNAL_SECONDS', '30'))  # Agent: kill -USR1 <pid>
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '4000'))  # /process-voice calls slower than this are captured; 0 disables
+    SLOW_REQUEST_CAPTURES = int(os.getenv('SLOW_REQUEST_CAPTURES', '20'))  # Captures kept in memory
+    SLOW_REQUEST_SAMPLE_MS = float(os.getenv('SLOW_REQUEST_SAMPLE_MS', '20'))  # Stack sample interval per open request
+    
+    # Turn Recorder (keeps recent /process-voice turns for debugging and replay)
+    TURN_RECORDER_ENABLED = os.getenv('TURN_RECORDER_ENABLED', 'False').lower() == 'true'
+    TURN_RECORDER_DIR = os.getenv('TURN_RECORDER_DIR', 'recordings')
+    TURN_RECORDER_MAX_MB = int(os.getenv('TURN_RECORDER_MAX_MB', '500'))  # Blobs + log; oldest segments dropped first
+    TURN_RECORDER_MAX_AGE_HOURS = float(os.getenv('TURN_RECORDER_MAX_AGE_HOURS', '72'))
     
     # LiveKit Configuration
     LIVEKIT_API_KEY = os.getenv('LIVEKIT_API_KEY')
     LIVEKIT_API_SECRET = os.getenv('LIVEKIT_API_SECRET')
     LIVEKIT_URL = os.getenv('LIVEKIT_URL')
+    LIVEKIT_ROOM_LIST_TTL = float(os.getenv('LIVEKIT_ROOM_LIST_TTL', '2'))  # Seconds a room listing is reused
+    LIVEKIT_RECONCILE_INTERVAL = float(os.getenv('LIVEKIT_RECONCILE_INTERVAL', '30'))  # Seconds between stale-room sweeps
+    LIVEKIT_ROOM_EMPTY_TIMEOUT = int(os.getenv('LIVEKIT_ROOM_EMPTY_TIMEOUT', '300'))  # Server closes empty rooms after this
+    LIVEKIT_MAX_CONNECTIONS = int(os.getenv('LIVEKIT_MAX_CONNECTIONS', '20'))  # Pooled HTTP connections to the server API
     
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -1,17 +1,387 @@
 import asyncio
+import json
 import logging
-from livekit import agents
-from livekit.agents import JobContext, AgentSession, Agent, RoomOutputOptions, stt
-from livekit.plugins import openai, hedra, silero, elevenlabs
+import signal
+import threading
+import time
+from livekit.agents import (
+    JobContext, JobProcess, AgentSession, Agent, RoomOutputOptions, APIConnectOptions, DEFAULT_API_CONNECT_OPTIONS, llm, stt
+)
 from dotenv import load_dotenv
 import os
 
+from config import Config
+from services.audio_formats import get_format
+from services.filler_audio import fillers, pcm_chunks, play_with_filler
+from services.metrics_service import metrics
+from services.prompt_registry import prompts, prompt_usage, record_prompt_usage
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def prewarm(proc: JobProcess):
+    """Load plugins and the VAD model once per job process, before any job is assigned
+
+    Plugin imports are deferred to here (instead of module import time) so the
+    worker registers quickly; LiveKit requires plugins to be imported on the
+    main thread, which is where prewarm runs.
+    """
+    from livekit.plugins import openai, hedra, silero, elevenlabs  # noqa: F401
+    # Session-time services (SQLite-backed state, profiler) load here too, not in the worker
+    from services import interruptions, profiler, slo_controller, usage_meter  # noqa: F401
+    
+    proc.userdata["vad"] = silero.VAD.load()
+    install_profile_signal()
+    
+    # Filler clips come from the disk cache only; the worker synthesizes missing ones once
+    if Config.FILLER_ENABLED:
+        fillers.load(formats=(FILLER_FORMAT,))
+    
+    logger.info("🔥 Job process prewarmed (plugins + VAD loaded)")
+
+# PCM at the ElevenLabs plugin's output rate so filler frames need no resampling
+FILLER_FORMAT = "pcm_22050"
+
+class FillerAgent(Agent):
+    """Agent that plays a short pre-synthesized acknowledgement when the LLM is slow to start
+    
+    While the SLO controller has the cached_audio step on, the filler
+    starts right away instead of after FILLER_THRESHOLD_MS.
+    """
+    
+    async def tts_node(self, text, model_settings):
+        clip = fillers.pick(FILLER_FORMAT) if Config.FILLER_ENABLED else None
+        if clip is None:
+            async for frame in Agent.default.tts_node(self, text, model_settings):
+                yield frame
+            return
+        
+        from livekit import rtc
+        
+        sample_rate = get_format(FILLER_FORMAT).sample_rate
+        
+        def to_frame(chunk):
+            return rtc.AudioFrame(
+                data=chunk,
+                sample_rate=sample_rate,
+                num_channels=1,
+                samples_per_channel=len(chunk) // 2
+            )
+        
+        def synthesize(text_stream):
+            return Agent.default.tts_node(self, text_stream, model_settings)
+        
+        from services.slo_controller import slo
+        
+        stats = {}
+        threshold = 0.0 if slo.active("cached_audio") else Config.FILLER_THRESHOLD_MS / 1000
+        async for frame in play_with_filler(
+            text,
+            synthesize,
+            pcm_chunks(clip[1], sample_rate),
+            threshold,
+            to_frame=to_frame,
+            stats=stats
+        ):
+            yield frame
+        
+        if stats.get("filler_played"):
+            logger.info(f"💬 Filler '{clip[0]}' covered {stats['filler_seconds'] * 1000:.0f} ms until the first "
+                        f"audio at {stats.get('time_to_first_audio', 0) * 1000:.0f} ms")
+
+class LadderLLM(llm.LLM):
+    """The session's LLM, rebuilt as make_llm(**options) when set_options() changes them
+    
+    Sessions last up to AGENT_MAX_SESSION_SECONDS, so they follow the ladder
+    rather than keep the model they started with. A change applies from the
+    next reply; swapping the agent instead would drop a turn in flight.
+    Replies stream through LadderLLMStream, which reports the metrics the
+    session's usage and SLO hooks listen for.
+    """
+    
+    def __init__(self, make_llm, options):
+        super().__init__()
+        self.make_llm = make_llm
+        self.options = options
+        self._llms = {}  # One instance per set of options, reused when the ladder steps back
+        self.current = self._get(options)
+    
+    def _get(self, options):
+        key = tuple(sorted(options.items()))
+        if key not in self._llms:
+            self._llms[key] = self.make_llm(**options)
+        return self._llms[key]
+    
+    @property
+    def model(self):
+        return self.current.model
+    
+    def set_options(self, options):
+        if options == self.options:
+            return
+        logger.info(f"🪜 Ladder changed - switching the session's LLM to {options}")
+        metrics.increment("slo.agent_llm_switches")
+        self.options = options
+        self.current = self._get(options)
+    
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        inner = self.current.chat(chat_ctx=chat_ctx, tools=tools, conn_options=conn_options, **kwargs)
+        # The inner stream already retries; retrying here would re-read a consumed stream
+        outer_options = APIConnectOptions(max_retry=0, retry_interval=conn_options.retry_interval,
+                                          timeout=conn_options.timeout)
+        return LadderLLMStream(self, inner, chat_ctx=chat_ctx, tools=tools or [], conn_options=outer_options)
+    
+    def prewarm(self):
+        self.current.prewarm()
+    
+    async def aclose(self):
+        for instance in self._llms.values():
+            await instance.aclose()
+
+class LadderLLMStream(llm.LLMStream):
+    def __init__(self, ladder_llm, inner, *, chat_ctx, tools, conn_options):
+        super().__init__(ladder_llm, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._inner = inner
+    
+    async def _run(self):
+        async with self._inner as stream:
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+
+def prepare_filler_clips():
+    """Synthesize any filler clips missing from the disk cache, once per worker (job processes only load them)"""
+    if Config.FILLER_ENABLED and Config.ELEVENLABS_API_KEY:
+        from services.elevenlabs_service import ElevenLabsService
+        fillers.prepare_in_background(ElevenLabsService(), formats=(FILLER_FORMAT,))
+
+def install_profile_signal():
+    """`kill -USR1 <pid>` profiles this process for PROFILE_SIGNAL_SECONDS
+
+    Works for the worker and for each job process (install it from their main
+    thread). The folded stacks are written to PROFILE_DIR off the event loop.
+    """
+    def write_profile():
+        from services.profiler import profiler
+        
+        try:
+            path, stats = profiler.write(
+                Config.PROFILE_SIGNAL_SECONDS,
+                Config.PROFILE_DIR,
+                "agent",
+                interval=Config.PROFILE_INTERVAL_MS / 1000
+            )
+            logger.info(f"🔬 Profile written to {path} ({stats['samples']} samples, "
+                        f"sampler used {stats['sampler_cpu']:.1%} of a core)")
+        except RuntimeError as e:
+            logger.warning(f"🔬 {e}")
+
+    def on_signal(signum, frame):
+        logger.info(f"🔬 Profiling pid {os.getpid()} for {Config.PROFILE_SIGNAL_SECONDS}s...")
+        threading.Thread(target=write_profile, name="profiler", daemon=True).start()
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, on_signal)
+
+def load_vad(ctx: JobContext):
+    """Return the prewarmed VAD, loading it now if prewarm didn't run"""
+    vad = ctx.proc.userdata.get("vad")
+    if vad is None:
+        from livekit.plugins import silero
+        vad = silero.VAD.load()
+        ctx.proc.userdata["vad"] = vad
+    return vad
+
+def create_session(**components):
+    """AgentSession shared by every agent mode (and the load benchmarks)
+    
+    Barge-in is AgentSession's default behaviour (allow_interruptions, after
+    min_interruption_duration of user speech), so there is nothing to set here;
+    track_session_metrics times how long it takes the agent to go quiet.
+    """
+    return AgentSession(**components)
+
+# Participant identity the Hedra avatar joins the room with (the plugin's default)
+AVATAR_IDENTITY = "hedra-avatar-agent"
+
+# /create-hedra-room names rooms ROOM_PREFIX + session_id
+ROOM_PREFIX = "hedra-room-"
+
+_usage_meter = None
+
+def get_usage_meter():
+    """One usage meter per job process, flushed to the same store as the Flask app"""
+    global _usage_meter
+    if _usage_meter is None:
+        from services.usage_meter import UsageMeter
+        _usage_meter = UsageMeter()
+        _usage_meter.start()
+    return _usage_meter
+
+def usage_key(room):
+    """(session_id, tenant) the Flask app meters this room's conversation under
+    
+    /create-hedra-room puts both in the room metadata; a room created on
+    join has none, so the session id comes from the room name.
+    """
+    try:
+        info = json.loads(room.metadata or "{}")
+    except ValueError:
+        info = {}
+    if not isinstance(info, dict):
+        info = {}
+    session_id = info.get("session_id") or room.name.removeprefix(ROOM_PREFIX)
+    return session_id, info.get("tenant") or "default"
+
+def session_budget(session_id, tenant="default", count=True):
+    """Usage budget for a session, degraded further by the SLO ladder (blocking; run it off the event loop)"""
+    from services.slo_controller import slo
+    
+    # A fresh job process has to load the shared ladder before its first decision
+    slo.wait_ready()
+    return slo.apply(get_usage_meter().check(session_id, tenant, count=count))
+
+def llm_options(budget):
+    """openai.LLM arguments for a budget: its model, and its max_tokens once degraded"""
+    options = {"model": budget.model}
+    if budget.degraded:
+        options["max_completion_tokens"] = budget.max_tokens
+    return options
+
+async def follow_ladder(ladder_llm, session_id, tenant="default"):
+    """Move a running session's LadderLLM to what its budget and the SLO ladder call for now"""
+    budget = await asyncio.to_thread(session_budget, session_id, tenant, count=False)
+    ladder_llm.set_options(llm_options(budget))
+
+def track_session_metrics(session: AgentSession, session_id, tenant="default"):
+    """Report usage, stage latency (SLOs), LLM cached tokens and barge-in latency from the session"""
+    from livekit.agents.metrics import LLMMetrics, STTMetrics, TTSMetrics
+    from services.interruptions import record_interrupt
+    from services.slo_controller import slo
+    from services.speech_rate import speech_rates
+    
+    meter = get_usage_meter()
+    barge_in = {"started_at": None}
+    
+    @session.on("metrics_collected")
+    def _on_metrics_collected(event):
+        if isinstance(event.metrics, LLMMetrics):
+            if event.metrics.ttft > 0:
+                slo.observe("llm", event.metrics.ttft)
+            record_prompt_usage(event.metrics.prompt_tokens, event.metrics.prompt_cached_tokens, source="agent")
+            meter.record(
+                session_id,
+                tenant,
+                prompt_tokens=event.metrics.prompt_tokens,
+                completion_tokens=event.metrics.completion_tokens
+            )
+        elif isinstance(event.metrics, STTMetrics):
+            # Streaming STT reports no request duration
+            if event.metrics.duration > 0:
+                slo.observe("stt", event.metrics.duration)
+            meter.record(session_id, tenant, whisper_seconds=event.metrics.audio_duration)
+        elif isinstance(event.metrics, TTSMetrics):
+            if event.metrics.ttfb > 0:
+                slo.observe("tts", event.metrics.ttfb)
+            meter.record(
+                session_id,
+                tenant,
+                tts_characters=event.metrics.characters_count,
+                tts_seconds=event.metrics.audio_duration
+            )
+            speech_rates.observe(Config.ELEVENLABS_VOICE_ID, event.metrics.characters_count, event.metrics.audio_duration)
+    
+    @session.on("user_state_changed")
+    def _on_user_state_changed(event):
+        # The user talking over the agent is a barge-in; time until the agent goes quiet
+        if event.new_state == "speaking" and session.agent_state == "speaking":
+            barge_in["started_at"] = time.perf_counter()
+    
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(event):
+        if event.old_state == "speaking" and barge_in["started_at"] is not None:
+            latency = time.perf_counter() - barge_in["started_at"]
+            record_interrupt("agent", interrupt_to_silence_seconds=latency)
+            logger.info(f"✋ Agent interrupted, silent after {latency * 1000:.0f} ms")
+        if event.old_state == "speaking":
+            barge_in["started_at"] = None
+
+async def hold_session(ctx: JobContext, session: AgentSession, avatar=False, ladder_llm=None):
+    """Keep the session alive up to AGENT_MAX_SESSION_SECONDS, then end the job (cost control)
+    
+    Between checks the session's LadderLLM follows the budget and SLO
+    ladder. In avatar mode the avatar seconds are metered as they accrue,
+    until the avatar is torn down. Once the avatar budget is spent the
+    avatar is ended and this returns True so the caller can carry on
+    audio-only. Store reads and writes run in a thread, so a busy database
+    never stalls the session's audio.
+    """
+    from services.slo_controller import slo
+    from services.speech_rate import speech_rates
+    
+    meter = get_usage_meter()
+    session_id, tenant = usage_key(ctx.room)
+    started = last = time.monotonic()
+    
+    try:
+        while time.monotonic() - started < Config.AGENT_MAX_SESSION_SECONDS:
+            await asyncio.sleep(min(10, Config.AGENT_MAX_SESSION_SECONDS))
+            if ladder_llm is not None:
+                await follow_ladder(ladder_llm, session_id, tenant)
+            if not avatar:
+                continue
+            now = time.monotonic()
+            meter.record(session_id, tenant, avatar_seconds=now - last)
+            last = now
+            budget = await asyncio.to_thread(meter.check, session_id, tenant, count=False)
+            if not budget.avatar_enabled:
+                logger.warning("💰 Avatar budget reached - ending the avatar, continuing audio-only")
+                metrics.increment("usage.avatar_sessions_ended")
+                await end_avatar(ctx, session)
+                return True
+        
+        logger.info(f"⏰ Session reached {Config.AGENT_MAX_SESSION_SECONDS}s - disconnecting (cost control)")
+        if avatar:
+            await end_avatar(ctx, session)
+        else:
+            await session.aclose()
+        ctx.shutdown(reason="max session length reached")
+        return False
+    finally:
+        if avatar:
+            meter.record(session_id, tenant, avatar_seconds=time.monotonic() - last)
+        await asyncio.to_thread(meter.flush)
+        await asyncio.to_thread(slo.sync)
+        # The job process ends with the session; store its clips before it goes
+        await asyncio.to_thread(speech_rates.sync)
+        log_prompt_usage()
+
+async def end_avatar(ctx: JobContext, session: AgentSession):
+    """Stop the Hedra avatar: close the session feeding it and remove its participant from the room
+    
+    Returning from the entrypoint leaves both running (and billed) in livekit-agents 1.x.
+    """
+    from livekit import api
+    
+    await session.aclose()
+    try:
+        await ctx.api.room.remove_participant(
+            api.RoomParticipantIdentity(room=ctx.room.name, identity=AVATAR_IDENTITY)
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not remove the avatar from the room: {e}")
+
+def log_prompt_usage():
+    """Log the job's prompt caching numbers (its metrics aren't exported anywhere else)"""
+    usage = prompt_usage("agent")
+    if usage["prompt_tokens"]:
+        logger.info(f"🧾 Prompt tokens this session: {usage['prompt_tokens']}, "
+                    f"{usage['cached_tokens']} cached ({usage['cached_ratio']:.0%})")
+
 async def entrypoint(ctx: JobContext):
     """Main entry point for LiveKit Agent with Hedra - CORRECTED VERSION"""
+    from services.slo_controller import slo
+    
     logger.info("🚀 Starting Hedra Voice Agent...")
     logger.info(f"🏠 Connecting to room: {ctx.room.name}")
     
@@ -29,9 +399,18 @@ async def entrypoint(ctx: JobContext):
     
     logger.info(f"🎬 Using Hedra Avatar ID: {avatar_id}")
     
+    session_id, tenant = usage_key(ctx.room)
+    budget = await asyncio.to_thread(session_budget, session_id, tenant)
+    if not budget.avatar_enabled:
+        logger.warning(f"💰 Avatar disabled ({budget.reasons}) - using audio-only mode")
+        await start_audio_only_agent(ctx)
+        return
+    
+    from livekit.plugins import openai, hedra, elevenlabs
+    
     try:
         # CORRECTED: Create AgentSession with StreamAdapter for real streaming
-        vad = silero.VAD.load()
+        vad = load_vad(ctx)
         
         # FIXED: Use StreamAdapter for proper streaming STT
         streaming_stt = stt.StreamAdapter(
@@ -39,26 +418,29 @@ async def entrypoint(ctx: JobContext):
             vad=vad
         )
         
-        session = AgentSession(
+        ladder_llm = LadderLLM(openai.LLM, llm_options(budget))
+        session = create_session(
             vad=vad,
             stt=streaming_stt,  # Use StreamAdapter for real streaming
-            llm=openai.LLM(model="gpt-3.5-turbo"), 
-            tts=elevenlabs.TTS()  # Better for lip-sync accuracy
+            llm=ladder_llm,
+            tts=elevenlabs.TTS(voice_id=Config.ELEVENLABS_VOICE_ID)  # Better for lip-sync accuracy
         )
         
         # CORRECTED: Create avatar session separately
-        avatar = hedra.AvatarSession(avatar_id=avatar_id)
+        avatar = hedra.AvatarSession(avatar_id=avatar_id, avatar_participant_identity=AVATAR_IDENTITY)
         
         # CRITICAL: Start avatar first, passing session and room
-        await avatar.start(session, room=ctx.room)
+        avatar_started = time.perf_counter()
+        try:
+            await avatar.start(session, room=ctx.room)
+        finally:
+            # A slow (or failing) avatar start moves new sessions toward audio-only
+            slo.observe("avatar", time.perf_counter() - avatar_started)
         logger.info("🎬 Hedra avatar started successfully!")
         
         # Create agent
-        agent = Agent(
-            instructions="""You are a helpful AI assistant with a friendly personality. 
-            Keep responses concise but engaging, suitable for voice interaction.
-            Respond naturally and conversationally. Keep responses under 100 words."""
-        )
+        agent = FillerAgent(instructions=prompts.get("avatar").instructions)
+        track_session_metrics(session, session_id, tenant)
         
         # CORRECTED: Start session with audio_enabled=False for avatar mode
         await session.start(
@@ -74,8 +456,8 @@ async def entrypoint(ctx: JobContext):
         logger.info(f"🎬 Avatar is now live in room: {ctx.room.name}")
         logger.info("🎥 Video avatar should now be visible to users")
         
-        # Keep session alive for maximum 1 hour (cost control)
-        await asyncio.sleep(3600)
+        # Keep session alive for at most AGENT_MAX_SESSION_SECONDS (cost control)
+        avatar_budget_spent = await hold_session(ctx, session, avatar=True, ladder_llm=ladder_llm)
         
     except Exception as e:
         logger.error(f"❌ Error starting Hedra session: {e}")
@@ -86,35 +468,45 @@ async def entrypoint(ctx: JobContext):
         logger.error("   - Network connectivity issues")
         logger.error("💡 Falling back to audio-only mode")
         await start_audio_only_agent(ctx)
+        return
+    
+    if avatar_budget_spent:
+        # The same conversation carries on without the avatar
+        await start_audio_only_agent(ctx, chat_ctx=session.history)
 
-async def start_audio_only_agent(ctx: JobContext):
-    """Fallback audio-only agent with proper VAD"""
+async def start_audio_only_agent(ctx: JobContext, chat_ctx=None):
+    """Fallback audio-only agent with proper VAD (chat_ctx carries over an earlier session's history)"""
+    from livekit.plugins import openai, elevenlabs
+    
+    session_id, tenant = usage_key(ctx.room)
+    budget = await asyncio.to_thread(session_budget, session_id, tenant)
+    
     try:
         # CORRECTED: Use proper VAD and StreamAdapter for audio-only mode
-        vad = silero.VAD.load()
+        vad = load_vad(ctx)
         
         streaming_stt = stt.StreamAdapter(
             stt=openai.STT(),
             vad=vad
         )
         
-        session = AgentSession(
+        ladder_llm = LadderLLM(openai.LLM, llm_options(budget))
+        session = create_session(
             vad=vad,
             stt=streaming_stt,  # Use StreamAdapter for streaming
-            llm=openai.LLM(model="gpt-3.5-turbo"),
-            tts=elevenlabs.TTS()  # Consistent TTS choice
+            llm=ladder_llm,
+            tts=elevenlabs.TTS(voice_id=Config.ELEVENLABS_VOICE_ID)  # Consistent TTS choice
         )
         
-        agent = Agent(
-            instructions="You are a helpful AI assistant. Keep responses brief and friendly for voice interaction."
-        )
+        agent = FillerAgent(instructions=prompts.get("audio_only").instructions, chat_ctx=chat_ctx)
+        track_session_metrics(session, session_id, tenant)
         
         await session.start(agent=agent, room=ctx.room)
         logger.info("✅ Audio-only agent started as fallback")
         logger.info("🔊 Users will hear OpenAI TTS responses")
         
-        # Keep session alive for maximum 1 hour
-        await asyncio.sleep(3600)
+        # Keep session alive for at most AGENT_MAX_SESSION_SECONDS
+        await hold_session(ctx, session, ladder_llm=ladder_llm)
         
     except Exception as e:
         logger.error(f"❌ Error starting audio-only agent: {e}")
@@ -181,14 +573,16 @@ if __name__ == "__main__":
     from livekit.agents import cli, WorkerOptions
     
     logger.info("🎯 Starting LiveKit Agent Worker...")
+    install_profile_signal()
     
-    # Test environment before starting
-    test_environment()
+    # Test environment in the background so the worker registers right away
+    threading.Thread(target=test_environment, name="env-check", daemon=True).start()
+    prepare_filler_clips()
     
     logger.info("🚀 Starting agent worker...")
     logger.info("💡 Agent will:")
     logger.info("   1. Try to connect with Hedra avatar for VIDEO")
     logger.info("   2. Fall back to audio-only if Hedra fails")
-    logger.info("   3. Auto-disconnect after 1 hour (cost control)")
+    logger.info(f"   3. Auto-disconnect after {Config.AGENT_MAX_SESSION_SECONDS}s or when the usage budget runs out (cost control)")
     
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint)) 
\ No newline at end of file
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)) 
\ No newline at end of file
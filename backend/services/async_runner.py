@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+class AsyncRunner:
+    """A persistent event loop on a daemon thread for calling async clients from Flask
+
+    Keeping one loop alive (instead of asyncio.run per request) lets aiohttp
+    sessions and their pooled connections be reused across requests.
+    """
+
+    def __init__(self, name="async-runner"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop without waiting; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
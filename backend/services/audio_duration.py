@@ -0,0 +1,142 @@
+from services.audio_formats import get_format
+
+# Bitrates in kbps by (MPEG-1?, layer) and the header's 4-bit index
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+# Sample rates by the header's version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def _build_frame_table():
+    """(frame bytes, samples, sample rate, MPEG-1?, layer) for header bytes 1-2, or None if invalid"""
+    table = [None] * 65536
+    for byte1 in range(0xE0, 0x100):
+        version, layer = (byte1 >> 3) & 3, 4 - ((byte1 >> 1) & 3)
+        if version == 1 or layer == 4:
+            continue
+        mpeg1 = version == 3
+        for byte2 in range(256):
+            bitrate_index, rate_index, padding = byte2 >> 4, (byte2 >> 2) & 3, (byte2 >> 1) & 1
+            if bitrate_index in (0, 15) or rate_index == 3:
+                continue  # free-format or invalid
+            bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+            sample_rate = _SAMPLE_RATES[version][rate_index]
+            if layer == 1:
+                length, samples = (12 * bitrate // sample_rate + padding) * 4, 384
+            elif layer == 3 and not mpeg1:
+                length, samples = 72 * bitrate // sample_rate + padding, 576
+            else:
+                length, samples = 144 * bitrate // sample_rate + padding, 1152
+            table[byte1 << 8 | byte2] = (length, samples, sample_rate, mpeg1, layer)
+    return table
+
+_FRAMES = _build_frame_table()
+
+def _skip_id3(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+def _frame_at(data, pos):
+    if pos + 4 > len(data) or data[pos] != 0xFF:
+        return None
+    return _FRAMES[data[pos + 1] << 8 | data[pos + 2]]
+
+def _xing_frames(data, pos, frame):
+    """Frame count from a Xing/Info header in the first frame, if it has one"""
+    _, _, _, mpeg1, layer = frame
+    if layer != 3:
+        return None
+    mono = (data[pos + 3] >> 6) == 3
+    offset = pos + 4 + ((17 if mono else 32) if mpeg1 else (9 if mono else 17))
+    if len(data) < offset + 12 or data[offset:offset + 4] not in (b"Xing", b"Info") or not data[offset + 7] & 1:
+        return None
+    return int.from_bytes(data[offset + 8:offset + 12], "big")
+
+def mp3_duration(data):
+    """Seconds of MPEG audio, from frame headers only (no decoding)
+
+    Uses the Xing/Info frame count when the encoder wrote one; otherwise
+    walks the frame headers, which also handles VBR. A trailing partial
+    frame is not counted. Returns None if no frames are found.
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        data = bytes(data)
+    pos = _skip_id3(data)
+    frame = _frame_at(data, pos)
+    if frame is None:
+        pos = _resync(data, pos)
+        frame = _frame_at(data, pos) if pos is not None else None
+        if frame is None:
+            return None
+
+    counted = _xing_frames(data, pos, frame)
+    if counted is not None:
+        return counted * frame[1] / frame[2]
+
+    samples = 0
+    sample_rate = frame[2]
+    end = len(data)
+    table = _FRAMES
+    while pos + 4 <= end:
+        frame = table[data[pos + 1] << 8 | data[pos + 2]] if data[pos] == 0xFF else None
+        if frame is None:
+            pos = _resync(data, pos + 1)
+            if pos is None:
+                break
+            continue
+        length = frame[0]
+        if pos + length > end:
+            break
+        samples += frame[1]
+        pos += length
+    return samples / sample_rate if samples else None
+
+def _resync(data, pos):
+    """Next offset holding a frame header that's followed by another one (or the end)"""
+    while True:
+        pos = data.find(b"\xff", pos)
+        if pos < 0:
+            return None
+        frame = _frame_at(data, pos)
+        if frame is not None:
+            following = pos + frame[0]
+            if following >= len(data) or _frame_at(data, following) is not None:
+                return pos
+        pos += 1
+
+def ogg_opus_duration(data):
+    """Seconds of Opus in Ogg: the last page's granule position minus the pre-skip"""
+    data = bytes(data)
+    last_page = data.rfind(b"OggS")
+    # Skip "OggS" inside packet data (not version 0) and a last page cut off before its granule
+    while last_page >= 0 and (data[last_page + 4:last_page + 5] != b"\x00" or last_page + 14 > len(data)):
+        last_page = data.rfind(b"OggS", 0, last_page)
+    head = data.find(b"OpusHead")
+    if last_page < 0:
+        return None
+    granule = int.from_bytes(data[last_page + 6:last_page + 14], "little")
+    pre_skip = int.from_bytes(data[head + 10:head + 12], "little") if head >= 0 else 0
+    return max(granule - pre_skip, 0) / 48000
+
+def pcm_duration(data, sample_rate, channels=1, sample_width=2):
+    return len(data) / (sample_rate * channels * sample_width)
+
+def audio_duration(data, audio_format):
+    """Seconds of audio in one of the AUDIO_FORMATS, or None if it can't be parsed"""
+    if not data:
+        return None
+    fmt = get_format(audio_format) if isinstance(audio_format, str) else audio_format
+    if fmt.name.startswith("mp3"):
+        return mp3_duration(data)
+    if fmt.name.startswith("opus"):
+        return ogg_opus_duration(data)
+    if fmt.name.startswith("pcm"):
+        return pcm_duration(data, fmt.sample_rate)
+    return None
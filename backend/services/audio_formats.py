@@ -0,0 +1,90 @@
+class AudioFormat:
+    """A TTS output profile and how the ElevenLabs API names it"""
+
+    def __init__(self, name, output_format, mime_type, sample_rate, bitrate_kbps):
+        self.name = name
+        self.output_format = output_format
+        self.mime_type = mime_type
+        self.sample_rate = sample_rate
+        self.bitrate_kbps = bitrate_kbps
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "mime_type": self.mime_type,
+            "sample_rate": self.sample_rate,
+            "bitrate_kbps": self.bitrate_kbps
+        }
+
+AUDIO_FORMATS = {
+    # Provider default, what every client got before
+    "mp3": AudioFormat("mp3", "mp3_44100_128", "audio/mpeg", 44100, 128),
+    # Low-bitrate MP3 for constrained or metered links; still plays everywhere
+    "mp3_low": AudioFormat("mp3_low", "mp3_22050_32", "audio/mpeg", 22050, 32),
+    # Opus in Ogg: best quality per byte where the browser can play it
+    "opus": AudioFormat("opus", "opus_48000_32", "audio/ogg; codecs=opus", 48000, 32),
+    # Raw 16-bit mono PCM for server-side consumers that re-encode anyway
+    "pcm": AudioFormat("pcm", "pcm_24000", "audio/L16; rate=24000; channels=1", 24000, 384),
+    # Matches the LiveKit ElevenLabs plugin's output rate, so agent audio can be mixed without resampling
+    "pcm_22050": AudioFormat("pcm_22050", "pcm_22050", "audio/L16; rate=22050; channels=1", 22050, 353)
+}
+
+DEFAULT_FORMAT = "mp3"
+
+# Network Information API effective types that should get the smallest audio
+SLOW_CONNECTIONS = {"slow-2g", "2g", "3g"}
+
+# Accept media types we can serve byte-for-byte. ElevenLabs has no WebM
+# output, and PCM is only for clients that name it in the audio_format
+# hint, since browsers can't play it
+ACCEPT_TYPES = {
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3"
+}
+
+# Smaller variant of a format with the same media type, so a player handles either
+LOW_BITRATE = {"mp3": "mp3_low"}
+
+def get_format(name):
+    return AUDIO_FORMATS.get(name) or AUDIO_FORMATS[DEFAULT_FORMAT]
+
+def low_bitrate(fmt):
+    """The smallest format a client that accepted fmt can play the same way"""
+    return AUDIO_FORMATS[LOW_BITRATE.get(fmt.name, fmt.name)]
+
+def _parse_accept(accept_header):
+    """Return audio media ranges from an Accept header, highest q first"""
+    ranges = []
+    for index, item in enumerate((accept_header or "").split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        media_type = parts[0].lower()
+        if not media_type.startswith("audio/"):
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, index, media_type))
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+def negotiate_format(hint=None, accept_header=None, save_data=False, effective_type=None):
+    """Pick an output format from an explicit client hint, the Accept header and network hints"""
+    if hint in AUDIO_FORMATS:
+        return AUDIO_FORMATS[hint]
+
+    constrained = save_data or (effective_type or "").lower() in SLOW_CONNECTIONS
+
+    for media_type in _parse_accept(accept_header):
+        name = ACCEPT_TYPES.get(media_type)
+        if name == "mp3" and constrained:
+            name = "mp3_low"
+        if name is not None:
+            return AUDIO_FORMATS[name]
+
+    return AUDIO_FORMATS["mp3_low" if constrained else DEFAULT_FORMAT]
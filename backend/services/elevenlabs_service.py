@@ -1,6 +1,12 @@
 import requests
 import io
+import threading
+from collections import OrderedDict
 from config import Config
+from services.audio_duration import audio_duration
+from services.audio_formats import get_format, DEFAULT_FORMAT
+from services.metrics_service import metrics
+from services.speech_rate import speech_rates
 
 class ElevenLabsService:
     def __init__(self):
@@ -8,21 +14,46 @@ class ElevenLabsService:
         self.voice_id = Config.ELEVENLABS_VOICE_ID
         self.base_url = "https://api.elevenlabs.io/v1"
         
+        # Small LRU of synthesized audio keyed by (voice, format, text)
+        self.cache_size = Config.TTS_CACHE_SIZE
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         print(f"✅ ElevenLabs service initialized")
         print(f"🔑 API Key: {'✅ Set' if self.api_key else '❌ Missing'}")
         print(f"🎵 Voice ID: {self.voice_id}")
     
-    def text_to_speech_sync(self, text):
-        """FIXED: Synchronous text-to-speech"""
+    def text_to_speech_sync(self, text, cancel_event=None, audio_format=DEFAULT_FORMAT, usage=None, cache_only=False):
+        """FIXED: Synchronous text-to-speech
+        
+        The audio is streamed from the API; if cancel_event is set while
+        downloading, the connection is dropped and None is returned.
+        audio_format is a name from services.audio_formats.AUDIO_FORMATS.
+        Billed characters (cache misses only) and the seconds of audio
+        returned are added to the usage dict. Fresh clips also update the
+        voice's speech-rate fit. With cache_only a cache miss returns None
+        without calling the API.
+        """
         try:
             if not self.api_key:
                 print("❌ ElevenLabs API key missing")
                 return None
             
+            fmt = get_format(audio_format)
+            cache_key = (self.voice_id, fmt.name, text)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._add_seconds(usage, audio_duration(cached, fmt))
+                return io.BytesIO(cached)
+            if cache_only:
+                metrics.increment("tts_cache_only_skips")
+                return None
+            
             url = f"{self.base_url}/text-to-speech/{self.voice_id}"
+            params = {"output_format": fmt.output_format}
             
             headers = {
-                "Accept": "audio/mpeg",
+                "Accept": fmt.mime_type.split(";")[0],
                 "Content-Type": "application/json",
                 "xi-api-key": self.api_key
             }
@@ -38,20 +69,63 @@ class ElevenLabsService:
             
             print(f"🔊 Generating speech for: '{text[:50]}...'")
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                print("✅ ElevenLabs speech generated successfully")
-                return io.BytesIO(response.content)
-            else:
-                print(f"❌ ElevenLabs API error: {response.status_code}")
-                print(f"❌ Response: {response.text}")
+            if cancel_event is not None and cancel_event.is_set():
+                print("⏹️ Speech generation skipped - turn cancelled")
                 return None
+            
+            if usage is not None:
+                usage["tts_characters"] = usage.get("tts_characters", 0) + len(text)
+            
+            with requests.post(url, params=params, json=data, headers=headers, timeout=30, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"❌ ElevenLabs API error: {response.status_code}")
+                    print(f"❌ Response: {response.text}")
+                    return None
+                
+                audio = io.BytesIO()
+                for chunk in response.iter_content(chunk_size=4096):
+                    if cancel_event is not None and cancel_event.is_set():
+                        print("⏹️ Speech generation cancelled")
+                        return None
+                    audio.write(chunk)
+            
+            seconds = audio_duration(audio.getvalue(), fmt)
+            print(f"✅ ElevenLabs speech generated successfully ({fmt.name}, {audio.tell()} bytes, {seconds or 0:.1f}s)")
+            metrics.increment(f"tts_bytes.{fmt.name}", audio.tell())
+            self._add_seconds(usage, seconds)
+            speech_rates.observe(self.voice_id, len(text.strip()), seconds)
+            self._cache_put(cache_key, audio.getvalue())
+            audio.seek(0)
+            return audio
                 
         except Exception as e:
             print(f"❌ Error with text-to-speech: {e}")
             return None
     
+    @staticmethod
+    def _add_seconds(usage, seconds):
+        if usage is not None and seconds:
+            usage["tts_seconds"] = usage.get("tts_seconds", 0) + seconds
+    
+    def _cache_get(self, key):
+        with self._cache_lock:
+            audio_bytes = self._cache.get(key)
+            if audio_bytes is None:
+                metrics.increment("tts_cache_misses")
+                return None
+            self._cache.move_to_end(key)
+        metrics.increment("tts_cache_hits")
+        return audio_bytes
+    
+    def _cache_put(self, key, audio_bytes):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = audio_bytes
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
     def get_available_voices_sync(self):
         """Get available voices (synchronous)"""
         try:
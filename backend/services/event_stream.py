@@ -0,0 +1,58 @@
+import json
+import re
+
+# End of a sentence: terminal punctuation, optional closing quote/bracket, then whitespace
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+
+# Words whose trailing period doesn't end a sentence ("Dr. Smith", "e.g. this")
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "e.g", "i.e", "approx"}
+
+def sse_event(event, data):
+    """One server-sent event with compact single-line JSON data"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+class SentenceChunker:
+    """Collects streamed LLM text and releases it in sentence-sized pieces for TTS
+
+    The first piece goes out as soon as a sentence of min_first_chars has
+    arrived so audio can start early; later pieces wait for min_chars so
+    short sentences are synthesized together.
+    """
+
+    def __init__(self, min_first_chars=12, min_chars=60):
+        self.min_first_chars = min_first_chars
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._released = 0
+
+    def push(self, text):
+        """Add streamed text; returns the pieces that are ready"""
+        self._buffer += text
+        pieces = []
+        cut = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            if _is_abbreviation(self._buffer, match):
+                continue
+            candidate = self._buffer[cut:match.end()].strip()
+            threshold = self.min_chars if self._released else self.min_first_chars
+            if len(candidate) >= threshold:
+                pieces.append(candidate)
+                self._released += 1
+                cut = match.end()
+        self._buffer = self._buffer[cut:]
+        return pieces
+
+    def flush(self):
+        """Whatever is left once the stream has ended"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+def _is_abbreviation(text, match):
+    """Whether a SENTENCE_END match is the period of an abbreviation or an initial"""
+    if match.group().rstrip() != ".":
+        return False
+    words = text[:match.start()].split()
+    if not words:
+        return False
+    word = words[-1].lstrip("\"'([")
+    return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper())
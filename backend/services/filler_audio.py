@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from array import array
+
+from config import Config
+from services.metrics_service import metrics
+
+FILLER_PHRASES = (
+    "Hmm, let me think.",
+    "Let me see.",
+    "Good question.",
+    "One moment.",
+    "Okay, so."
+)
+
+class FillerLibrary:
+    """Short acknowledgement clips, pre-synthesized once and cached on disk
+
+    prepare() synthesizes whatever isn't cached yet; load() only reads the
+    cache, for processes (like agent jobs) that shouldn't call the TTS API
+    on startup. A format that load() found empty is re-read from disk by
+    pick() at most every reload_interval seconds, so clips another process
+    is still synthesizing show up once they're written.
+    """
+
+    def __init__(self, cache_dir=None, phrases=FILLER_PHRASES, reload_interval=10):
+        self.cache_dir = cache_dir or Config.FILLER_CACHE_DIR
+        self.phrases = tuple(phrases)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._clips = {}  # format name -> [(phrase, audio bytes)]
+        self._next = {}
+        self._reload = {}  # format name -> (voice_id, last load time) for formats loaded from disk only
+
+    def _path(self, voice_id, fmt_name, phrase):
+        digest = hashlib.sha1(f"{voice_id}|{fmt_name}|{phrase}".encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{fmt_name}-{digest}.bin")
+
+    def _read(self, voice_id, fmt_name, phrase):
+        path = self._path(voice_id, fmt_name, phrase)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def load(self, voice_id=None, formats=("mp3",)):
+        """Load the clips already cached on disk, without synthesizing any; returns how many"""
+        voice_id = voice_id or Config.ELEVENLABS_VOICE_ID
+        ready = 0
+        for fmt_name in formats:
+            clips = []
+            for phrase in self.phrases:
+                audio_bytes = self._read(voice_id, fmt_name, phrase)
+                if audio_bytes is not None:
+                    clips.append((phrase, audio_bytes))
+            with self._lock:
+                self._clips[fmt_name] = clips
+                self._reload[fmt_name] = (voice_id, time.monotonic())
+            ready += len(clips)
+        metrics.set_gauge("filler.clips_ready", ready)
+        return ready
+
+    def prepare(self, tts_service, formats=("mp3",)):
+        """Load clips from disk, synthesizing (and caching) any that are missing"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        ready = 0
+        for fmt_name in formats:
+            clips = []
+            for phrase in self.phrases:
+                audio_bytes = self._read(tts_service.voice_id, fmt_name, phrase)
+                if audio_bytes is not None:
+                    clips.append((phrase, audio_bytes))
+                    continue
+
+                audio = tts_service.text_to_speech_sync(phrase, audio_format=fmt_name)
+                if audio is None:
+                    continue
+                audio_bytes = audio.getvalue()
+                # Written under a temporary name so a process loading the cache never reads half a clip
+                path = self._path(tts_service.voice_id, fmt_name, phrase)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(audio_bytes)
+                os.replace(tmp, path)
+                clips.append((phrase, audio_bytes))
+
+            with self._lock:
+                self._clips[fmt_name] = clips
+                self._reload.pop(fmt_name, None)
+            ready += len(clips)
+
+        metrics.set_gauge("filler.clips_ready", ready)
+        print(f"💬 Filler library ready: {ready} clip(s) in {', '.join(formats)}")
+        return ready
+
+    def prepare_in_background(self, tts_service, formats=("mp3",)):
+        thread = threading.Thread(
+            target=self._prepare_safely,
+            args=(tts_service, formats),
+            name="filler-prepare",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _prepare_safely(self, tts_service, formats):
+        try:
+            self.prepare(tts_service, formats)
+        except Exception as e:
+            print(f"⚠️ Could not prepare filler clips: {e}")
+
+    def clips(self, fmt_name):
+        with self._lock:
+            return list(self._clips.get(fmt_name, []))
+
+    def pick(self, fmt_name):
+        """Next clip for a format (round-robin so the same phrase isn't repeated back to back)"""
+        with self._lock:
+            clips = self._clips.get(fmt_name)
+            reload = self._reload.get(fmt_name)
+        if not clips and reload is not None and time.monotonic() - reload[1] >= self.reload_interval:
+            self.load(reload[0], (fmt_name,))
+        with self._lock:
+            clips = self._clips.get(fmt_name)
+            if not clips:
+                return None
+            index = self._next.get(fmt_name, 0) % len(clips)
+            self._next[fmt_name] = index + 1
+            return clips[index]
+
+def pcm_chunks(pcm_bytes, sample_rate, frame_ms=20):
+    """Split 16-bit mono PCM into fixed-duration chunks"""
+    step = int(sample_rate * frame_ms / 1000) * 2
+    return [pcm_bytes[i:i + step] for i in range(0, len(pcm_bytes) - 1, step)]
+
+def fade_out(pcm_chunk):
+    """Linear fade to silence over one chunk so a cut-off doesn't click"""
+    samples = array("h")
+    samples.frombytes(pcm_chunk[:len(pcm_chunk) // 2 * 2])
+    count = len(samples)
+    for i in range(count):
+        samples[i] = int(samples[i] * (count - i) / count)
+    return samples.tobytes()
+
+async def play_with_filler(text_stream, synthesize, filler_chunks, threshold_seconds,
+                           to_frame=lambda chunk: chunk, frame_seconds=0.02, stats=None):
+    """Yield synthesized audio for text_stream, masking a slow start with filler
+
+    Synthesis starts right away. If its first audio frame isn't ready after
+    threshold_seconds, filler chunks are yielded in real time until it is;
+    the filler chunk at that frame boundary is faded out and the real audio
+    follows. stats (a dict) is filled with time_to_first_text,
+    time_to_first_audio, filler_played and filler_seconds.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    stats = stats if stats is not None else {}
+    stats.update(filler_played=False, filler_seconds=0.0)
+
+    async def timed_text():
+        async for text in text_stream:
+            if "time_to_first_text" not in stats:
+                stats["time_to_first_text"] = loop.time() - started
+                metrics.observe("filler.time_to_first_text", stats["time_to_first_text"])
+            yield text
+
+    audio_iter = synthesize(timed_text()).__aiter__()
+    first = asyncio.ensure_future(audio_iter.__anext__())
+
+    try:
+        done, _ = await asyncio.wait({first}, timeout=threshold_seconds)
+        if not done and filler_chunks:
+            stats["filler_played"] = True
+            metrics.increment("filler.played")
+            for chunk in filler_chunks:
+                if first.done():
+                    yield to_frame(fade_out(chunk))
+                    stats["filler_seconds"] += frame_seconds
+                    break
+                yield to_frame(chunk)
+                stats["filler_seconds"] += frame_seconds
+                await asyncio.wait({first}, timeout=frame_seconds)
+        elif not done:
+            metrics.increment("filler.unavailable")
+
+        try:
+            first_frame = await first
+        except StopAsyncIteration:
+            return
+        stats["time_to_first_audio"] = loop.time() - started
+        metrics.observe("filler.time_to_first_audio", stats["time_to_first_audio"])
+
+        yield first_frame
+        async for frame in audio_iter:
+            yield frame
+    finally:
+        if not first.done():
+            first.cancel()
+            try:
+                await first
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        aclose = getattr(audio_iter, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+fillers = FillerLibrary()
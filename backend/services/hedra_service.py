@@ -1,8 +1,13 @@
 import requests
 import json
 import asyncio
+import threading
 import time
 from config import Config
+from services.interruptions import estimate_speech_seconds, record_interrupt, spoken_prefix
+
+# Seconds the avatar stays connected after an utterance should have ended
+SPEAKING_GRACE_SECONDS = 2.0
 
 class HedraLiveAvatarService:
     def __init__(self):
@@ -11,15 +16,34 @@ class HedraLiveAvatarService:
         self.avatar_id = Config.HEDRA_AVATAR_ID
         self.is_connected = False
         self.speaking_start_time = None
-        self.max_speaking_duration = 60  # Maximum 60 seconds per response
+        self.max_speaking_duration = Config.HEDRA_MAX_SPEAKING_SECONDS  # Maximum seconds per response
+        self.current_text = None
+        self.expected_seconds = None  # Length of the current utterance
+        self._speaking_task = None
         
         print(f"✅ HedraLiveAvatarService initialized")
         print(f"🔑 API Key: {'✅ Set' if self.api_key else '❌ Missing'}")
         print(f"🎭 Avatar ID: {self.avatar_id}")
         
-        # Test connection on initialization
+        # Test connection in the background so construction never blocks
+        self.connection_ok = None
+        self._connection_check = None
         if self.api_key and not self.api_key.startswith("your_"):
-            self.test_connection()
+            self._connection_check = threading.Thread(
+                target=self._background_connection_check,
+                name="hedra-connection-check",
+                daemon=True
+            )
+            self._connection_check.start()
+    
+    def _background_connection_check(self):
+        self.connection_ok = self.test_connection()
+    
+    def wait_for_connection_check(self, timeout=None):
+        """Block until the startup connection check has finished; returns its result"""
+        if self._connection_check is not None:
+            self._connection_check.join(timeout)
+        return self.connection_ok
     
     def test_connection(self):
         """Test Hedra API connection and validate avatar"""
@@ -113,8 +137,8 @@ class HedraLiveAvatarService:
             
             print(f"🔗 Attempting to connect to Hedra avatar: {avatar_id}")
             
-            # Validate API connection first
-            connection_ok = self.test_connection()
+            # Validate API connection first (reuse the startup check if it already passed)
+            connection_ok = self.connection_ok or await asyncio.to_thread(self.test_connection)
             if connection_ok:
                 self.is_connected = True
                 print(f"✅ Successfully connected to Hedra avatar: {avatar_id}")
@@ -128,15 +152,29 @@ class HedraLiveAvatarService:
             print(f"❌ Error connecting to Hedra Live Avatar: {e}")
             return False
     
-    async def send_text_to_avatar(self, text):
-        """Send text to the live avatar for real-time speaking"""
+    async def send_text_to_avatar(self, text, audio_seconds=None):
+        """Send text to the live avatar for real-time speaking
+        
+        audio_seconds is the measured length of the utterance's audio when
+        the caller has it; otherwise it's estimated from the voice's
+        speech rate. Either way it schedules the auto-disconnect.
+        """
         if not self.is_connected:
             print("⚠️ Not connected to Hedra avatar")
             return False
         
         try:
+            # A new utterance replaces whatever the avatar is still saying
+            # (one that already ran its length isn't an interruption)
+            if self.is_speaking():
+                await self.interrupt()
+            if self._speaking_task and not self._speaking_task.done():
+                self._speaking_task.cancel()
+            
             # Record speaking start time
             self.speaking_start_time = time.time()
+            self.current_text = text
+            self.expected_seconds = min(audio_seconds or estimate_speech_seconds(text), self.max_speaking_duration)
             
             print(f"🎬 Hedra avatar speaking: '{text[:100]}{'...' if len(text) > 100 else ''}'")
             print("🎥 Live video should be generating now...")
@@ -145,7 +183,7 @@ class HedraLiveAvatarService:
             # This would integrate with Hedra's real-time video generation API
             
             # Schedule automatic disconnection after speaking
-            asyncio.create_task(self._auto_disconnect_after_speaking())
+            self._speaking_task = asyncio.create_task(self._auto_disconnect_after_speaking())
             
             return True
             
@@ -153,24 +191,64 @@ class HedraLiveAvatarService:
             print(f"❌ Error sending text to avatar: {e}")
             return False
     
+    async def interrupt(self):
+        """End the current utterance's bookkeeping early (barge-in)
+        
+        This service has no live speaking API to stop (see
+        send_text_to_avatar), so nothing on Hedra's side goes quiet here: it
+        re-arms the auto-disconnect from now instead of from the end of the
+        utterance, and returns what was spoken before the cut, so callers can
+        trim their conversation history, plus the avatar seconds that saves.
+        In the LiveKit agent the AgentSession interrupts the Hedra plugin's
+        audio itself.
+        """
+        if not self.is_speaking():
+            # Already finished on its own: nothing was cut, and the auto-disconnect stays as scheduled
+            return {"spoken_text": "", "spoken_seconds": 0.0, "seconds_saved": 0.0}
+        
+        spoken_seconds = time.time() - self.speaking_start_time
+        text = self.current_text or ""
+        expected_seconds = self.expected_seconds or min(estimate_speech_seconds(text), self.max_speaking_duration)
+        
+        if self._speaking_task and not self._speaking_task.done():
+            self._speaking_task.cancel()
+        self.speaking_start_time = None
+        self.current_text = None
+        self.expected_seconds = None
+        
+        # Keep the cost guard: disconnect if nothing else is said shortly
+        self._speaking_task = asyncio.create_task(self._auto_disconnect_after_speaking())
+        
+        seconds_saved = max(expected_seconds - spoken_seconds, 0.0)
+        record_interrupt("hedra", wasted_seconds_saved=seconds_saved)
+        print(f"✋ Avatar interrupted after {spoken_seconds:.1f}s ({seconds_saved:.1f}s saved)")
+        
+        return {
+            "spoken_text": spoken_prefix(text, spoken_seconds, expected_seconds),
+            "spoken_seconds": spoken_seconds,
+            "seconds_saved": seconds_saved
+        }
+    
     async def _auto_disconnect_after_speaking(self):
         """Automatically disconnect after speaking to save costs"""
         try:
-            # Estimate speaking duration (roughly 150 words per minute)
-            if self.speaking_start_time:
-                # Simple estimation: assume 3 words per second average speaking rate
-                estimated_words = 50  # Default assumption
-                estimated_duration = min(estimated_words / 3, self.max_speaking_duration, 30)
+            # Stay up for the rest of the utterance plus a short grace period
+            if self.speaking_start_time and self.expected_seconds:
+                remaining = self.expected_seconds - (time.time() - self.speaking_start_time)
+                estimated_duration = min(max(remaining, 0) + SPEAKING_GRACE_SECONDS, self.max_speaking_duration)
             else:
                 estimated_duration = 10  # Default 10 seconds
             
             print(f"⏰ Will auto-disconnect in {estimated_duration:.1f} seconds to save costs")
             await asyncio.sleep(estimated_duration)
+            self._speaking_task = None
             
             # Disconnect to stop charging
             await self.disconnect_avatar()
             print("🔄 Auto-disconnected from Hedra to save costs")
             
+        except asyncio.CancelledError:
+            print("⏹️ Auto-disconnect cancelled - avatar was interrupted")
         except Exception as e:
             print(f"❌ Error in auto-disconnect: {e}")
     
@@ -205,6 +283,7 @@ class HedraLiveAvatarService:
             if self.is_connected:
                 self.is_connected = False
                 self.speaking_start_time = None
+                self.expected_seconds = None
                 print("🛑 Disconnected from Hedra avatar")
                 print("💰 Avatar session ended - billing stopped")
             else:
@@ -261,7 +340,7 @@ class HedraLiveAvatarService:
             return False
         
         elapsed = time.time() - self.speaking_start_time
-        return elapsed < self.max_speaking_duration
+        return elapsed < (self.expected_seconds or self.max_speaking_duration)
     
     def get_avatar_info(self):
         """Get information about the current avatar"""
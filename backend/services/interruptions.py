@@ -0,0 +1,43 @@
+from services.metrics_service import metrics
+from services.speech_rate import speech_rates
+
+def estimate_speech_seconds(text, voice_id=None):
+    """How long text takes to say when no audio duration is known (see services/speech_rate.py)"""
+    return speech_rates.estimate(text, voice_id)
+
+def spoken_prefix(text, played_seconds, total_seconds):
+    """The part of text that was heard before playback stopped, cut at a word boundary"""
+    if not text or total_seconds <= 0 or played_seconds <= 0:
+        return ""
+    if played_seconds >= total_seconds:
+        return text
+
+    cut = int(len(text) * played_seconds / total_seconds)
+    prefix = text[:cut]
+    if cut < len(text) and not text[cut].isspace() and " " in prefix:
+        prefix = prefix[:prefix.rindex(" ")]
+    return prefix.rstrip()
+
+def truncate_history(history, spoken_text):
+    """Replace the last assistant message with what was actually spoken
+
+    If nothing was heard the assistant message is dropped entirely so the
+    model doesn't believe the user heard it. Returns True if history changed.
+    """
+    if not history or history[-1]["role"] != "assistant":
+        return False
+    if spoken_text:
+        if spoken_text == history[-1]["content"]:
+            return False
+        history[-1] = {"role": "assistant", "content": spoken_text + "..."}
+    else:
+        history.pop()
+    return True
+
+def record_interrupt(source, wasted_seconds_saved=0.0, interrupt_to_silence_seconds=None):
+    """Count a barge-in and the audio it avoided playing"""
+    metrics.increment(f"barge_in.interrupts.{source}")
+    if wasted_seconds_saved > 0:
+        metrics.increment(f"barge_in.audio_seconds_saved.{source}", round(wasted_seconds_saved, 3))
+    if interrupt_to_silence_seconds is not None:
+        metrics.observe(f"barge_in.interrupt_to_silence.{source}", interrupt_to_silence_seconds)
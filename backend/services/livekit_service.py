@@ -1,25 +1,225 @@
 import asyncio
+import time
+from datetime import datetime
 from config import Config
+from services.async_runner import AsyncRunner
+from services.metrics_service import metrics
 
 class LiveKitService:
-    def __init__(self):
-        self.api_key = Config.LIVEKIT_API_KEY
-        self.api_secret = Config.LIVEKIT_API_SECRET
-        self.url = Config.LIVEKIT_URL
-        # LiveKit integration will be added when needed
-        print("LiveKit service initialized (optional for future features)")
-    
-    async def create_room(self, room_name):
-        """Create a LiveKit room (placeholder for future)"""
-        print(f"LiveKit room creation requested: {room_name}")
-        return {"name": room_name, "status": "placeholder"}
-    
+    """Async LiveKit server-API client with a pooled HTTP session
+
+    All room-service calls share one aiohttp session (and connection pool)
+    living on a background event loop, so sync Flask handlers can use
+    run() without paying a new TLS handshake per call.
+    """
+
+    def __init__(self, url=None, api_key=None, api_secret=None):
+        self.api_key = api_key or Config.LIVEKIT_API_KEY
+        self.api_secret = api_secret or Config.LIVEKIT_API_SECRET
+        self.url = url or Config.LIVEKIT_URL
+        self.list_ttl = Config.LIVEKIT_ROOM_LIST_TTL
+        self.empty_timeout = Config.LIVEKIT_ROOM_EMPTY_TIMEOUT
+        self.max_connections = Config.LIVEKIT_MAX_CONNECTIONS
+
+        self.runner = AsyncRunner(name="livekit-api")
+        self._session = None
+        self._api = None
+        self._list_cache = None  # (expires_at, rooms)
+        self._reconciler = None
+
+        print("✅ LiveKit service initialized")
+        print(f"🔗 LiveKit URL: {self.url or '❌ Missing'}")
+
+    @property
+    def configured(self):
+        return bool(self.api_key and self.api_secret and self.url)
+
+    @property
+    def http_url(self):
+        """Server API base URL (the room service speaks HTTP, not WebSocket)"""
+        url = self.url or ""
+        if url.startswith("wss://"):
+            return "https://" + url[len("wss://"):]
+        if url.startswith("ws://"):
+            return "http://" + url[len("ws://"):]
+        return url
+
+    async def _client(self):
+        """Create the shared session and API client on first use (on the runner's loop)"""
+        if self._api is None:
+            import aiohttp
+            from livekit import api
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+            self._api = api.LiveKitAPI(
+                self.http_url,
+                self.api_key,
+                self.api_secret,
+                session=self._session
+            )
+        return self._api
+
+    def run(self, coro, timeout=15):
+        """Run one of this service's coroutines from sync code"""
+        return self.runner.run(coro, timeout)
+
+    def build_access_token(self, room_name, participant_name, identity=None, is_recorder=False):
+        """Generate a join token for a room"""
+        from livekit.api import AccessToken, VideoGrants
+
+        token = AccessToken(self.api_key, self.api_secret) \
+            .with_identity(identity or participant_name) \
+            .with_name(participant_name) \
+            .with_grants(VideoGrants(
+                room_join=True,
+                room=room_name,
+                can_publish=not is_recorder,
+                can_subscribe=True,
+                hidden=is_recorder,
+                recorder=is_recorder
+            ))
+        return token.to_jwt()
+
     async def generate_access_token(self, room_name, participant_name, is_recorder=False):
-        """Generate access token for LiveKit room (placeholder for future)"""
-        print(f"LiveKit token generation requested for: {participant_name}")
-        return "placeholder_token"
-    
-    async def list_rooms(self):
-        """List all active rooms (placeholder for future)"""
-        print("LiveKit room listing requested")
-        return [] 
\ No newline at end of file
+        """Generate access token for LiveKit room"""
+        return self.build_access_token(room_name, participant_name, is_recorder=is_recorder)
+
+    async def create_room(self, room_name, empty_timeout=None, max_participants=0, metadata=""):
+        """Create a room on the server (idempotent: returns the existing room if present)"""
+        from livekit import api
+
+        client = await self._client()
+        started = time.perf_counter()
+        room = await client.room.create_room(api.CreateRoomRequest(
+            name=room_name,
+            empty_timeout=empty_timeout if empty_timeout is not None else self.empty_timeout,
+            max_participants=max_participants,
+            metadata=metadata
+        ))
+        metrics.observe("livekit.create_room", time.perf_counter() - started)
+        self._list_cache = None
+        print(f"🏠 LiveKit room ready: {room.name}")
+        return {"name": room.name, "sid": room.sid, "creation_time": room.creation_time}
+
+    async def create_rooms(self, room_names, concurrency=10, **kwargs):
+        """Create many rooms concurrently over the shared connection pool"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create(name):
+            async with semaphore:
+                try:
+                    return await self.create_room(name, **kwargs)
+                except Exception as e:
+                    print(f"❌ Failed to create room {name}: {e}")
+                    return {"name": name, "error": str(e)}
+
+        return await asyncio.gather(*(create(name) for name in room_names))
+
+    async def delete_room(self, room_name):
+        """Delete a room, disconnecting everyone in it"""
+        from livekit import api
+
+        client = await self._client()
+        await client.room.delete_room(api.DeleteRoomRequest(room=room_name))
+        self._list_cache = None
+        print(f"🗑️ LiveKit room deleted: {room_name}")
+        return True
+
+    async def delete_rooms(self, room_names, concurrency=10):
+        """Delete many rooms concurrently; returns {room_name: ok}"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def delete(name):
+            async with semaphore:
+                try:
+                    return name, await self.delete_room(name)
+                except Exception as e:
+                    print(f"❌ Failed to delete room {name}: {e}")
+                    return name, False
+
+        return dict(await asyncio.gather(*(delete(name) for name in room_names)))
+
+    async def list_rooms(self, use_cache=True):
+        """List all active rooms; results are cached for LIVEKIT_ROOM_LIST_TTL seconds"""
+        from livekit import api
+
+        now = time.monotonic()
+        if use_cache and self._list_cache and self._list_cache[0] > now:
+            metrics.increment("livekit.list_rooms_cache_hits")
+            return self._list_cache[1]
+
+        client = await self._client()
+        started = time.perf_counter()
+        response = await client.room.list_rooms(api.ListRoomsRequest())
+        metrics.observe("livekit.list_rooms", time.perf_counter() - started)
+
+        rooms = [
+            {
+                "name": room.name,
+                "sid": room.sid,
+                "num_participants": room.num_participants,
+                "creation_time": room.creation_time
+            }
+            for room in response.rooms
+        ]
+        self._list_cache = (time.monotonic() + self.list_ttl, rooms)
+        return rooms
+
+    async def reconcile(self, active_rooms, grace_seconds=60, on_reap=None):
+        """Drop entries from active_rooms whose room no longer exists on the server
+
+        Rooms younger than grace_seconds are kept since the user may not have
+        joined yet. Returns the reaped session ids.
+        """
+        server_rooms = {room["name"] for room in await self.list_rooms(use_cache=False)}
+        now = datetime.now()
+        reaped = []
+
+        for session_id, info in list(active_rooms.items()):
+            if info["room_name"] in server_rooms:
+                continue
+            age = (now - datetime.fromisoformat(info["created_at"])).total_seconds()
+            if age < grace_seconds:
+                continue
+            if active_rooms.pop(session_id, None) is not None:
+                reaped.append(session_id)
+                if on_reap:
+                    on_reap(session_id, info)
+
+        metrics.set_gauge("livekit.active_rooms", len(active_rooms))
+        if reaped:
+            metrics.increment("livekit.rooms_reaped", len(reaped))
+            print(f"🧹 Reaped {len(reaped)} stale room(s): {', '.join(reaped)}")
+        return reaped
+
+    def start_reconciler(self, active_rooms, interval=None, grace_seconds=60, on_reap=None):
+        """Periodically reconcile active_rooms against the server in the background"""
+        interval = interval or Config.LIVEKIT_RECONCILE_INTERVAL
+
+        async def loop():
+            while True:
+                try:
+                    await self.reconcile(active_rooms, grace_seconds, on_reap)
+                except Exception as e:
+                    print(f"⚠️ Room reconciliation failed: {e}")
+                await asyncio.sleep(interval)
+
+        if self._reconciler is None:
+            self._reconciler = self.runner.submit(loop())
+            print(f"🔄 Room reconciler running every {interval}s")
+        return self._reconciler
+
+    async def close(self):
+        """Close the API client and its connection pool"""
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            self._reconciler = None
+        if self._api is not None:
+            await self._api.aclose()
+            self._api = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
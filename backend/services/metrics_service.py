@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import deque
+
+class MetricsService:
+    """Thread-safe in-process counters, gauges and timings"""
+
+    def __init__(self, timing_window=500):
+        self._lock = threading.Lock()
+        self.timing_window = timing_window
+        self.counters = {}
+        self.gauges = {}
+        self.timings = {}
+        self.started_at = time.time()
+
+    def increment(self, name, value=1):
+        """Increase a counter by value"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """Record the latest value of a gauge"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        """Record a duration sample (seconds) for a timing"""
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.timing_window)}
+                self.timings[name] = timing
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            timing["recent"].append(seconds)
+
+    def get_counter(self, name):
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def snapshot(self):
+        """Return a JSON-serialisable copy of all metrics"""
+        with self._lock:
+            timings = {}
+            for name, timing in self.timings.items():
+                recent = sorted(timing["recent"])
+                timings[name] = {
+                    "count": timing["count"],
+                    "avg_ms": round(timing["total"] / timing["count"] * 1000, 2) if timing["count"] else 0.0,
+                    "max_ms": round(timing["max"] * 1000, 2),
+                    "p50_ms": round(_percentile(recent, 0.50) * 1000, 2),
+                    "p95_ms": round(_percentile(recent, 0.95) * 1000, 2)
+                }
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": timings
+            }
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+# Shared instance so the Flask app and agent workers report into one place
+metrics = MetricsService()
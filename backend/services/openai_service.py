@@ -1,14 +1,21 @@
 import openai
 import io
 from config import Config
+from services.prompt_registry import prompts, record_openai_usage
 
 class OpenAIService:
     def __init__(self):
         self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.model = Config.OPENAI_MODEL
+        prompts.precompute_token_counts(self.model)
         print("✅ OpenAI service initialized")
     
-    def transcribe_audio_sync(self, audio_file):
-        """FIXED: Synchronous transcription to fix Flask 500 error"""
+    def transcribe_audio_sync(self, audio_file, cancel_event=None, usage=None):
+        """FIXED: Synchronous transcription to fix Flask 500 error
+        
+        If a usage dict is passed, the billed audio duration is added to it
+        as whisper_seconds.
+        """
         try:
             print("🔊 Reading audio file...")
             audio_bytes = audio_file.read()
@@ -20,16 +27,12 @@ class OpenAIService:
                 print("❌ Audio file is empty")
                 return None
             
-            # Create proper file object for OpenAI
-            audio_io = io.BytesIO(audio_bytes)
-            audio_io.name = 'audio.wav'  # Force WAV extension
+            if cancel_event is not None and cancel_event.is_set():
+                print("⏹️ Transcription skipped - turn cancelled")
+                return None
             
             print("🤖 Sending to OpenAI Whisper...")
-            transcript = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_io,
-                response_format="text"
-            )
+            transcript = self._transcribe(audio_bytes, 'audio.wav', usage)  # Force WAV extension
             
             print(f"✅ Transcription successful: {transcript}")
             return transcript
@@ -40,48 +43,121 @@ class OpenAIService:
             # FALLBACK: Try with different extension
             try:
                 print("🔄 Trying fallback transcription...")
-                audio_io = io.BytesIO(audio_bytes)
-                audio_io.name = 'audio.mp3'
-                
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_io,
-                    response_format="text"
-                )
-                
-                return transcript
+                return self._transcribe(audio_bytes, 'audio.mp3', usage)
                 
             except Exception as e2:
                 print(f"❌ Fallback transcription failed: {e2}")
                 return None
     
-    def generate_response_sync(self, user_message, conversation_history=None):
-        """FIXED: Synchronous response generation"""
+    def _transcribe(self, audio_bytes, filename, usage):
+        # Create proper file object for OpenAI
+        audio_io = io.BytesIO(audio_bytes)
+        audio_io.name = filename
+        
+        # verbose_json includes the audio duration Whisper bills for
+        result = self.client.audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_io,
+            response_format="verbose_json"
+        )
+        
+        if usage is not None and getattr(result, "duration", None):
+            usage["whisper_seconds"] = usage.get("whisper_seconds", 0) + float(result.duration)
+        return result.text
+    
+    def generate_response_sync(self, user_message, conversation_history=None, cancel_event=None,
+                               persona="assistant", model=None, max_tokens=None, usage=None):
+        """FIXED: Synchronous response generation
+        
+        When cancel_event is given the completion is streamed so it can be
+        aborted mid-flight; returns None if the event fires first.
+        model / max_tokens override the defaults (e.g. when over budget) and
+        token counts are added to the usage dict if one is passed.
+        """
         try:
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant with a friendly personality. Keep responses concise but engaging, suitable for voice interaction."
-                }
-            ]
-            
-            if conversation_history:
-                messages.extend(conversation_history)
+            settings = prompts.get(persona)
+            messages = prompts.build_messages(persona, conversation_history, user_message)
+            request_options = {
+                "model": model or self.model,
+                "max_tokens": max_tokens or settings.max_tokens,
+                "temperature": settings.temperature
+            }
             
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
+            if cancel_event is not None:
+                return self._generate_cancellable(messages, request_options, cancel_event, usage)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=150,
-                temperature=0.7
-            )
+            response = self.client.chat.completions.create(messages=messages, **request_options)
+            self._record_usage(response.usage, usage)
             
             return response.choices[0].message.content
             
         except Exception as e:
             print(f"❌ Error generating response: {e}")
-            return "I'm sorry, I'm having trouble processing that right now." 
\ No newline at end of file
+            return "I'm sorry, I'm having trouble processing that right now."
+    
+    def stream_response_sync(self, user_message, conversation_history=None, cancel_event=None,
+                             persona="assistant", model=None, max_tokens=None, usage=None):
+        """Yield the response text as it streams in
+        
+        Stops early (closing the connection) once cancel_event is set. If the
+        request fails before any text arrives, yields the same apology that
+        generate_response_sync returns.
+        """
+        settings = prompts.get(persona)
+        messages = prompts.build_messages(persona, conversation_history, user_message)
+        request_options = {
+            "model": model or self.model,
+            "max_tokens": max_tokens or settings.max_tokens,
+            "temperature": settings.temperature
+        }
+        
+        streamed = False
+        try:
+            for text in self._stream_deltas(messages, request_options, cancel_event, usage):
+                streamed = True
+                yield text
+        except Exception as e:
+            print(f"❌ Error streaming response: {e}")
+            if not streamed:
+                yield "I'm sorry, I'm having trouble processing that right now."
+    
+    def _stream_deltas(self, messages, request_options, cancel_event, usage=None):
+        """Stream a completion's text deltas, closing the connection as soon as cancel_event is set"""
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_options
+        )
+        
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    print("⏹️ Response generation cancelled")
+                    return
+                if chunk.usage is not None:
+                    self._record_usage(chunk.usage, usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    
+    def _generate_cancellable(self, messages, request_options, cancel_event, usage=None):
+        """Stream a completion, returning None if cancel_event is set before it finishes"""
+        text = "".join(self._stream_deltas(messages, request_options, cancel_event, usage))
+        if cancel_event.is_set():
+            return None
+        return text
+    
+    @staticmethod
+    def _record_usage(response_usage, usage):
+        """Feed API usage into metrics and, if given, the caller's usage dict"""
+        if response_usage is None:
+            return
+        record_openai_usage(response_usage)
+        if usage is not None:
+            usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + response_usage.prompt_tokens
+            usage["completion_tokens"] = usage.get("completion_tokens", 0) + response_usage.completion_tokens
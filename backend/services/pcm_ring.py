@@ -0,0 +1,152 @@
+import asyncio
+
+import numpy as np
+
+from services.metrics_service import metrics
+
+class PCMRingBuffer:
+    """Preallocated ring of fixed-size 16-bit PCM frames
+
+    Writers copy PCM in once, re-framed to frame_samples per channel; readers
+    get zero-copy views of whole slots. A slot is only reused after it has been
+    read and retain_frames newer frames have been read too, so views handed
+    downstream (VAD, STT buffering) stay valid for that long. When the reader
+    falls behind, write() waits instead of letting a queue grow.
+    """
+
+    def __init__(self, capacity_frames, frame_samples, sample_rate, num_channels=1, retain_frames=None):
+        self.capacity = capacity_frames
+        self.frame_samples = frame_samples
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.retain_frames = capacity_frames // 2 if retain_frames is None else retain_frames
+        if self.retain_frames >= capacity_frames:
+            raise ValueError("retain_frames must be smaller than capacity_frames")
+
+        self._pcm = np.zeros((capacity_frames, frame_samples * num_channels), dtype=np.int16)
+        # Byte rows of the same memory; a memoryview of a whole row is what
+        # rtc.AudioFrame can wrap without copying
+        self._bytes = self._pcm.view(np.uint8)
+        self._frame_len = frame_samples * num_channels
+        self._partial = 0  # samples already in the slot being written
+        self.write_seq = 0  # complete frames written
+        self.read_seq = 0   # frames handed to the reader
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self.closed = False
+
+    @classmethod
+    def for_duration(cls, seconds, frame_ms, sample_rate, num_channels=1):
+        frame_samples = sample_rate * frame_ms // 1000
+        return cls(max(4, int(seconds * 1000 / frame_ms)), frame_samples, sample_rate, num_channels)
+
+    @property
+    def frame_seconds(self):
+        return self.frame_samples / self.sample_rate
+
+    @property
+    def queued(self):
+        """Frames written but not yet read"""
+        return self.write_seq - self.read_seq
+
+    @property
+    def free_frames(self):
+        """Slots that can be written without touching unread or retained frames"""
+        return self.capacity - self.retain_frames - self.queued
+
+    def _slots_needed(self, samples):
+        return -(-(self._partial + samples) // self._frame_len)
+
+    def write_nowait(self, pcm):
+        """Copy interleaved int16 PCM into the ring; returns the number of frames completed
+
+        Raises BufferError if the reader is too far behind for it to fit.
+        """
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+        if self._slots_needed(len(samples)) > self.free_frames:
+            raise BufferError("PCM ring buffer is full")
+
+        completed = 0
+        offset = 0
+        while offset < len(samples):
+            slot = self._pcm[self.write_seq % self.capacity]
+            take = min(self._frame_len - self._partial, len(samples) - offset)
+            slot[self._partial:self._partial + take] = samples[offset:offset + take]
+            self._partial += take
+            offset += take
+            if self._partial == self._frame_len:
+                self._partial = 0
+                self.write_seq += 1
+                completed += 1
+
+        if completed:
+            self._readable.set()
+        return completed
+
+    async def write(self, pcm):
+        """write_nowait(), waiting for the reader to catch up when the ring is full"""
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+        if self._slots_needed(len(samples)) > self.capacity - self.retain_frames:
+            raise ValueError("write is larger than the ring's writable capacity")
+
+        while not self.closed and self._slots_needed(len(samples)) > self.free_frames:
+            metrics.increment("audio_ring.backpressure_waits")
+            self._writable.clear()
+            await self._writable.wait()
+        if self.closed:
+            return 0
+        return self.write_nowait(samples)
+
+    def read_nowait(self):
+        """Sequence number of the next complete frame, or None if none is ready"""
+        if self.read_seq >= self.write_seq:
+            return None
+        seq = self.read_seq
+        self.read_seq += 1
+        self._writable.set()
+        return seq
+
+    async def read(self):
+        """Wait for the next complete frame; None once the ring is closed and drained"""
+        while True:
+            seq = self.read_nowait()
+            if seq is not None or self.closed:
+                return seq
+            self._readable.clear()
+            await self._readable.wait()
+
+    def close(self):
+        self.closed = True
+        self._readable.set()
+        self._writable.set()
+
+    def _check(self, seq):
+        if seq >= self.write_seq or seq < self.read_seq - self.retain_frames or seq < self.write_seq - self.capacity:
+            raise IndexError(f"frame {seq} is not in the ring (read {self.read_seq}, written {self.write_seq})")
+
+    def frame_bytes(self, seq):
+        """Zero-copy byte view of one frame"""
+        self._check(seq)
+        return memoryview(self._bytes[seq % self.capacity])
+
+    def samples(self, seq):
+        """Zero-copy int16 view of one frame"""
+        self._check(seq)
+        return self._pcm[seq % self.capacity]
+
+    def span(self, start_seq, end_seq):
+        """int16 samples of frames [start_seq, end_seq)
+
+        A view when the frames are contiguous in memory; one copy only when
+        the range wraps around the end of the ring.
+        """
+        if end_seq <= start_seq:
+            return self._pcm[:0].reshape(-1)
+        self._check(start_seq)
+        self._check(end_seq - 1)
+        first, last = start_seq % self.capacity, (end_seq - 1) % self.capacity
+        if first <= last:
+            return self._pcm[first:last + 1].reshape(-1)
+        metrics.increment("audio_ring.span_copies")
+        return np.concatenate((self._pcm[first:], self._pcm[:last + 1])).reshape(-1)
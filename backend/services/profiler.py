@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+
+from services.metrics_service import metrics
+
+def _stack(frame):
+    """Root-first (code, line) pairs of a frame's call stack"""
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+def fold(stacks):
+    """Counter of (root label, stack) -> folded stacks, one "frame;frame;... count" per line
+
+    This is the input format of flamegraph.pl, inferno and speedscope.
+    """
+    labels = {}
+    lines = []
+    for (root, stack), count in stacks.most_common():
+        frames = [root] if root else []
+        for code, line in stack:
+            label = labels.get((code, line))
+            if label is None:
+                label = labels[(code, line)] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{line})"
+            frames.append(label)
+        lines.append(f"{';'.join(frames)} {count}")
+    return "".join(line + "\n" for line in lines)
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler: every thread's stack at a fixed interval
+
+    Samples are taken from the calling thread (which is left out of the
+    profile), so nothing runs between profiles. Only one profile runs per
+    process at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def run(self, seconds, interval=0.005):
+        """Profile for seconds; returns (folded stacks, stats)
+
+        Raises RuntimeError if a profile is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            return self._sample(seconds, interval)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, interval):
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        cpu_started, started = time.thread_time(), time.perf_counter()
+        deadline, next_at = started + seconds, started
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[(names.get(ident, f"thread-{ident}"), _stack(frame))] += 1
+            samples += 1
+            # Skip missed ticks rather than sampling in a burst to catch up
+            next_at = max(next_at + interval, time.perf_counter())
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+        wall = time.perf_counter() - started
+        metrics.increment("profiler.runs")
+        return fold(stacks), {
+            "samples": samples,
+            "interval_ms": interval * 1000,
+            "seconds": round(wall, 3),
+            # Share of one core the sampler used; the profiling overhead
+            "sampler_cpu": round((time.thread_time() - cpu_started) / wall, 4)
+        }
+
+    def write(self, seconds, directory, prefix, interval=0.005):
+        """Profile for seconds into <directory>/<prefix>-<pid>-<time>.folded; returns (path, stats)"""
+        folded, stats = self.run(seconds, interval)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{prefix}-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, "w") as f:
+            f.write(folded)
+        return path, stats
+
+class RequestTrace:
+    """Stage timeline of one request (plus its thread's stack samples while it's open)"""
+
+    def __init__(self, kind, started, info):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.started = started
+        self.started_at = datetime.now().isoformat()
+        self.info = info
+        self.thread_id = threading.get_ident()
+        self.timeline = []
+        self.stacks = Counter()
+
+    def mark(self, stage):
+        """Record that a stage was reached; returns seconds since the request started"""
+        elapsed = time.perf_counter() - self.started
+        self.timeline.append((stage, elapsed))
+        return elapsed
+
+class SlowRequestCapture:
+    """Keeps the timeline and stack samples of requests slower than threshold_ms
+
+    One background thread samples the threads of open traces every interval,
+    and sleeps while none are open. A fast request's samples are dropped when
+    it finishes; slow ones go into a ring of the last capacity captures.
+    threshold_ms=0 turns sampling off (timelines are still recorded).
+    """
+
+    def __init__(self, threshold_ms=4000, capacity=20, interval=0.02):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.enabled = threshold_ms > 0
+        self.captures = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._open = {}  # trace id -> RequestTrace
+        self._wake = threading.Event()
+        self._sampler = None
+
+    def begin(self, kind, started=None, **info):
+        """Start tracing the current thread's request"""
+        trace = RequestTrace(kind, started or time.perf_counter(), info)
+        if self.enabled:
+            with self._lock:
+                self._open[trace.id] = trace
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+                    self._sampler.start()
+            self._wake.set()
+        return trace
+
+    def finish(self, trace, status_code):
+        """Close a trace; returns its capture summary if it was slow"""
+        elapsed = trace.mark("finished")
+        with self._lock:
+            self._open.pop(trace.id, None)
+        if not self.enabled or elapsed < self.threshold:
+            return None
+
+        capture = {
+            "id": trace.id,
+            "kind": trace.kind,
+            "started_at": trace.started_at,
+            "duration_ms": round(elapsed * 1000, 1),
+            "status": status_code,
+            "samples": sum(trace.stacks.values()),
+            "timeline": [{"stage": stage, "at_ms": round(at * 1000, 1)} for stage, at in trace.timeline],
+            "info": trace.info
+        }
+        with self._lock:
+            self.captures.append((capture, trace.stacks))
+        metrics.increment("slow_requests.captured")
+        print(f"🐢 Slow {trace.kind} ({capture['duration_ms']:.0f} ms) captured as {trace.id}")
+        return capture
+
+    def list(self):
+        """Capture summaries, newest first"""
+        with self._lock:
+            return [capture for capture, _ in reversed(self.captures)]
+
+    def folded(self, capture_id):
+        """Folded stacks of a capture, or None if it's no longer in the ring"""
+        with self._lock:
+            for capture, stacks in self.captures:
+                if capture["id"] == capture_id:
+                    return fold(stacks)
+        return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._open
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for trace in self._open.values():
+                    frame = frames.get(trace.thread_id)
+                    if frame is not None:
+                        trace.stacks[(None, _stack(frame))] += 1
+            del frames
+            time.sleep(self.interval)
+
+profiler = SamplingProfiler()
@@ -0,0 +1,134 @@
+import threading
+
+from config import Config
+from services.metrics_service import metrics
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character estimate
+    tiktoken = None
+
+# Every persona starts with the same text so the longest possible prefix is
+# shared across entry points and upstream prompt caching can reuse it
+BASE_INSTRUCTIONS = (
+    "You are a helpful AI assistant with a friendly personality. "
+    "Keep responses concise but engaging, suitable for voice interaction."
+)
+
+# OpenAI only caches prompts (system prompt plus history) at least this long
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+def _normalize(text):
+    """Collapse whitespace so the prompt is byte-identical however it was written"""
+    return " ".join(text.split())
+
+class Persona:
+    """A named system prompt plus its generation settings"""
+
+    def __init__(self, name, instructions, max_tokens=None, temperature=0.7):
+        self.name = name
+        self.instructions = _normalize(instructions)
+        self.max_tokens = max_tokens or Config.OPENAI_MAX_TOKENS
+        self.temperature = temperature
+        # Built once and shared; callers must not mutate it
+        self.system_message = {"role": "system", "content": self.instructions}
+        self._token_counts = {}
+
+    def prefix_tokens(self, model):
+        """Token count of the system prompt for a model (cached)"""
+        count = self._token_counts.get(model)
+        if count is None:
+            count = count_tokens(self.instructions, model)
+            self._token_counts[model] = count
+        return count
+
+class PromptRegistry:
+    """Single source of truth for the system prompts used by every entry point"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._personas = {}
+
+    def register(self, persona):
+        with self._lock:
+            self._personas[persona.name] = persona
+        return persona
+
+    def get(self, name):
+        return self._personas[name]
+
+    def names(self):
+        return list(self._personas)
+
+    def build_messages(self, name, conversation_history=None, user_message=None):
+        """Stable system prefix, then history, then the new user message"""
+        messages = [self.get(name).system_message]
+        if conversation_history:
+            messages.extend(conversation_history)
+        if user_message is not None:
+            messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def precompute_token_counts(self, model):
+        """Count prefix tokens for every persona and publish them as gauges"""
+        counts = {}
+        for persona in list(self._personas.values()):
+            counts[persona.name] = persona.prefix_tokens(model)
+            metrics.set_gauge(f"prompt_prefix_tokens.{persona.name}", counts[persona.name])
+        if counts and max(counts.values()) < PROMPT_CACHE_MIN_TOKENS:
+            print(f"ℹ️ System prompts are {min(counts.values())}-{max(counts.values())} tokens, under OpenAI's "
+                  f"{PROMPT_CACHE_MIN_TOKENS}-token caching minimum; only turns with enough history get cached tokens")
+        return counts
+
+_encodings = {}
+
+def count_tokens(text, model):
+    """Count tokens with tiktoken when available, otherwise estimate ~4 chars/token"""
+    if tiktoken is None:
+        return max(1, len(text) // 4)
+
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model] = encoding
+    return len(encoding.encode(text))
+
+def record_prompt_usage(prompt_tokens, cached_tokens, source):
+    """Track prompt vs cached tokens so the cache hit ratio shows up in /metrics"""
+    if not prompt_tokens:
+        return
+    cached_tokens = cached_tokens or 0
+    metrics.increment(f"llm_prompt_tokens.{source}", prompt_tokens)
+    metrics.increment(f"llm_cached_tokens.{source}", cached_tokens)
+    total_prompt = metrics.get_counter(f"llm_prompt_tokens.{source}")
+    total_cached = metrics.get_counter(f"llm_cached_tokens.{source}")
+    metrics.set_gauge(f"llm_cached_token_ratio.{source}", round(total_cached / total_prompt, 4))
+
+def prompt_usage(source):
+    """Prompt and cached token totals recorded for a source so far"""
+    prompt_tokens = metrics.get_counter(f"llm_prompt_tokens.{source}")
+    cached_tokens = metrics.get_counter(f"llm_cached_tokens.{source}")
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "cached_ratio": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0
+    }
+
+def record_openai_usage(usage, source="flask"):
+    """Pull prompt/cached token counts out of an OpenAI usage object"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) if details is not None else 0
+    record_prompt_usage(usage.prompt_tokens, cached_tokens, source)
+
+prompts = PromptRegistry()
+prompts.register(Persona("assistant", BASE_INSTRUCTIONS))
+prompts.register(Persona(
+    "avatar",
+    BASE_INSTRUCTIONS + " Respond naturally and conversationally. Keep responses under 100 words."
+))
+prompts.register(Persona("audio_only", BASE_INSTRUCTIONS + " Keep responses brief and friendly."))
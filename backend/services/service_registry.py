@@ -0,0 +1,58 @@
+import importlib
+import threading
+import time
+
+from services.metrics_service import metrics
+
+class ServiceRegistry:
+    """Builds services on first use so importing the app stays cheap"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._instances = {}
+
+    def register(self, name, target):
+        """Register a factory callable or a 'module.path:ClassName' string (replacing any built instance)"""
+        with self._lock:
+            self._factories[name] = target
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        service = self._instances.get(name)
+        if service is not None:
+            return service
+
+        with self._lock:
+            service = self._instances.get(name)
+            if service is None:
+                started = time.perf_counter()
+                service = self._build(self._factories[name])
+                metrics.observe(f"service_init.{name}", time.perf_counter() - started)
+                self._instances[name] = service
+        return service
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warm_up(self, names=None):
+        """Construct services in a background thread, off the request path"""
+        names = list(names or self._factories)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Background warm-up of {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name="service-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _build(target):
+        if isinstance(target, str):
+            module_name, class_name = target.split(":")
+            target = getattr(importlib.import_module(module_name), class_name)
+        return target()
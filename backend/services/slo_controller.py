@@ -0,0 +1,423 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from config import Config
+from services.metrics_service import metrics
+
+STAGES = ("stt", "llm", "tts", "avatar")
+
+DEFAULT_TARGETS_MS = {
+    # p95 per stage: transcription, LLM time to first token, TTS per clip, avatar start
+    "stt": 2000,
+    "llm": 1500,
+    "tts": 1500,
+    "avatar": 5000
+}
+
+# The stages each ladder step takes load off
+LADDER_STEPS = {
+    "short_replies": ("llm", "tts"),  # max_tokens down to SLO_SHORT_MAX_TOKENS
+    "fast_model": ("llm",),           # SLO_FAST_MODEL
+    "cached_audio": ("tts",),         # Cached TTS, misses at low bitrate; the agent plays filler right away
+    "audio_only": ("avatar",)         # New agent sessions start without the avatar (no effect on /process-voice)
+}
+
+class SLOController:
+    """Steps down a degradation ladder while a stage's latency is over its target
+
+    Stages report latencies with observe(); each keeps the samples from the
+    last window_seconds. When a stage's p95 is over target, the next ladder
+    step that relieves it is switched on, at most one step per hold_seconds.
+    Once every stage has stayed under recover_ratio x target for
+    recover_seconds, the most recent step is switched off again. Samples
+    for the stages a step affects are dropped when it changes, since they
+    describe the old setup, and those stages need min_samples new ones
+    before they count as recovered. A stage with no recent samples at all
+    (TTS while only cached audio is served, the avatar while new sessions
+    are audio-only) counts as healthy, so its step gets retried.
+
+    Samples and ladder state live in SQLite (db_path, the usage database by
+    default), so every Flask worker and agent job process feeds one window
+    and follows one ladder - a job process on its own sees a single avatar
+    start. observe() only buffers a sample; sync(), every sync_interval
+    seconds on a background thread, writes buffered samples and
+    re-evaluates the ladder in one write transaction, or only re-reads the
+    ladder when this process has nothing to write. Reads use the state as
+    of the last sync. Times are wall-clock, as processes compare them.
+    """
+
+    def __init__(self, targets_ms=None, ladder=None, window_seconds=None, hold_seconds=None,
+                 recover_seconds=None, min_samples=3, recover_ratio=0.7, enabled=None,
+                 db_path=None, sync_interval=None, clock=time.time):
+        self.targets = {stage: ms / 1000 for stage, ms in (targets_ms or load_targets()).items()}
+        self.ladder = list(ladder if ladder is not None else load_ladder())
+        self.window_seconds = window_seconds if window_seconds is not None else Config.SLO_WINDOW_SECONDS
+        self.hold_seconds = hold_seconds if hold_seconds is not None else Config.SLO_HOLD_SECONDS
+        self.recover_seconds = recover_seconds if recover_seconds is not None else Config.SLO_RECOVER_SECONDS
+        self.min_samples = min_samples
+        self.recover_ratio = recover_ratio
+        self.enabled = enabled if enabled is not None else Config.SLO_ENABLED
+        self.db_path = db_path or Config.SLO_DB_PATH
+        self.sync_interval = sync_interval if sync_interval is not None else Config.SLO_SYNC_INTERVAL
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Held while syncing, so two threads never evaluate the same state
+        self._io_lock = threading.Lock()
+        self._samples = {stage: deque() for stage in STAGES}
+        self._active = []  # Steps switched on, oldest first
+        self._changed_at = None
+        self._healthy_since = None
+        self._changes = deque(maxlen=20)
+        self._pending = []  # (stage, at, seconds) not yet written
+        self._cleared = []  # Stages whose samples a change dropped during this sync
+        self._new_changes = []
+        self._started = False
+        self._ready = threading.Event()
+        self._tables = False
+        self._stop = threading.Event()
+        self._syncer = None
+
+    def start(self):
+        """Start the background sync, which creates the tables and loads the shared state
+
+        Never touches the database itself, so the first Flask request or
+        agent callback to read the ladder doesn't wait on a write lock; they
+        see no steps until the first sync, unless they wait_ready().
+        """
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            self._started = True
+        self._syncer = threading.Thread(target=self._sync_loop, name="slo-sync", daemon=True)
+        self._syncer.start()
+
+    def wait_ready(self, timeout=5):
+        """Block until the first background sync has loaded the shared ladder (off the event loop only)"""
+        self.start()
+        return self._ready.wait(timeout) if self.enabled else True
+
+    def stop(self):
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=5)
+            self._syncer = None
+        self.sync()
+
+    def observe(self, stage, seconds):
+        """Record one latency sample for a stage"""
+        if not self.enabled or seconds is None or seconds < 0:
+            return
+        metrics.observe(f"slo.{stage}", seconds)
+        self.start()
+        with self._lock:
+            self._pending.append((stage, self._clock(), seconds))
+
+    def active(self, step):
+        return step in self.active_steps()
+
+    def active_steps(self):
+        self.start()
+        with self._lock:
+            return list(self._active)
+
+    def apply(self, decision):
+        """Degrade a usage_meter.BudgetDecision by the active steps; returns it"""
+        for step in self.active_steps():
+            if step == "short_replies":
+                decision.max_tokens = min(decision.max_tokens, Config.SLO_SHORT_MAX_TOKENS)
+            elif step == "fast_model":
+                decision.model = Config.SLO_FAST_MODEL
+            elif step == "cached_audio":
+                decision.tts_cache_only = True
+            elif step == "audio_only":
+                decision.avatar_enabled = False
+            decision.reasons.append(f"slo:{step}")
+        return decision
+
+    def snapshot(self):
+        self.start()
+        self.sync(evaluate=True)
+        with self._lock:
+            now = self._clock()
+            stages = {}
+            for stage in STAGES:
+                values = [seconds for _, seconds in self._samples[stage]]
+                p95 = _percentile(values, 95)
+                stages[stage] = {
+                    "samples": len(values),
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "target_ms": round(self.targets[stage] * 1000)
+                }
+            return {
+                "enabled": self.enabled,
+                "ladder": list(self.ladder),
+                "active_steps": list(self._active),
+                "stages": stages,
+                "changes": [
+                    {"direction": change["direction"], "step": change["step"], "breached": change["breached"],
+                     "seconds_ago": round(now - change["at"], 1)}
+                    for change in self._changes
+                ]
+            }
+
+    def reset(self):
+        """Forget every process's samples and switch all steps off"""
+        self.start()
+        with self._io_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                with self._connect() as db:
+                    for table in ("slo_samples", "slo_state", "slo_changes"):
+                        db.execute(f"DELETE FROM {table}")
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not reset the SLO state: {e}")
+            with self._lock:
+                for samples in self._samples.values():
+                    samples.clear()
+                self._active = []
+                self._changed_at = self._healthy_since = None
+                self._changes.clear()
+        self._publish()
+
+    def sync(self, evaluate=False):
+        """Write buffered samples, then re-evaluate the ladder against every process's samples
+
+        With nothing buffered (and evaluate not set) it only re-reads the
+        ladder, which needs no write lock.
+        """
+        if not self.enabled:
+            return
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not self._tables:
+                self._create_tables()
+            if not pending and not evaluate:
+                self._refresh()
+                return
+            db = self._connect()
+            try:
+                db.isolation_level = None
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany("INSERT INTO slo_samples (stage, at, seconds) VALUES (?, ?, ?)", pending)
+                now = self._clock()
+                db.execute("DELETE FROM slo_samples WHERE at < ?", (now - self.window_seconds,))
+                rows = db.execute("SELECT stage, at, seconds FROM slo_samples ORDER BY at").fetchall()
+                state = db.execute("SELECT active, changed_at, healthy_since FROM slo_state WHERE id = 1").fetchone()
+                changes = db.execute(
+                    "SELECT at, direction, step, breached FROM slo_changes ORDER BY at DESC LIMIT ?",
+                    (self._changes.maxlen,)
+                ).fetchall()
+
+                with self._lock:
+                    self._load(rows, state, reversed(changes))
+                    self._evaluate(now)
+                    cleared, self._cleared = self._cleared, []
+                    new_changes, self._new_changes = self._new_changes, []
+                    active, changed_at, healthy_since = json.dumps(self._active), self._changed_at, self._healthy_since
+
+                for stage in cleared:
+                    db.execute("DELETE FROM slo_samples WHERE stage = ? AND at <= ?", (stage, now))
+                db.execute("""
+                    INSERT INTO slo_state (id, active, changed_at, healthy_since) VALUES (1, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET active = excluded.active, changed_at = excluded.changed_at,
+                        healthy_since = excluded.healthy_since
+                """, (active, changed_at, healthy_since))
+                db.executemany(
+                    "INSERT INTO slo_changes (at, direction, step, breached) VALUES (?, ?, ?, ?)",
+                    [(change["at"], change["direction"], change["step"], json.dumps(change["breached"]))
+                     for change in new_changes]
+                )
+                db.execute("DELETE FROM slo_changes WHERE at < ?", (now - 86400,))
+                db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                print(f"⚠️ SLO sync failed, will retry: {e}")
+                with self._lock:
+                    self._pending[:0] = pending
+                    self._cleared, self._new_changes = [], []
+                return
+            finally:
+                db.close()
+        metrics.increment("slo.syncs")
+        self._publish()
+
+    def _create_tables(self):
+        # Called with the io lock held
+        db = self._connect()
+        try:
+            db.isolation_level = None
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("CREATE TABLE IF NOT EXISTS slo_samples (stage TEXT NOT NULL, at REAL NOT NULL, seconds REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS slo_samples_at ON slo_samples (at)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS slo_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    active TEXT NOT NULL,
+                    changed_at REAL,
+                    healthy_since REAL
+                )
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS slo_changes (
+                    at REAL NOT NULL,
+                    direction TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    breached TEXT NOT NULL
+                )
+            """)
+            db.execute("COMMIT")
+            self._tables = True
+        except sqlite3.Error as e:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            print(f"⚠️ Could not create the SLO tables: {e}")
+        finally:
+            db.close()
+
+    def _refresh(self):
+        # Called with the io lock held
+        try:
+            with self._connect() as db:
+                state = db.execute("SELECT active, changed_at, healthy_since FROM slo_state WHERE id = 1").fetchone()
+                changes = db.execute(
+                    "SELECT at, direction, step, breached FROM slo_changes ORDER BY at DESC LIMIT ?",
+                    (self._changes.maxlen,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not read the SLO state: {e}")
+            return
+        with self._lock:
+            self._load_state(state, reversed(changes))
+        self._publish()
+
+    def _load(self, rows, state, changes):
+        # Called with the lock held: replace the local copy with the stored one
+        for samples in self._samples.values():
+            samples.clear()
+        for stage, at, seconds in rows:
+            if stage in self._samples:
+                self._samples[stage].append((at, seconds))
+        self._load_state(state, changes)
+
+    def _load_state(self, state, changes):
+        if state is None:
+            self._active, self._changed_at, self._healthy_since = [], None, None
+        else:
+            self._active = [step for step in json.loads(state[0]) if step in LADDER_STEPS]
+            self._changed_at, self._healthy_since = state[1], state[2]
+        self._changes.clear()
+        for at, direction, step, breached in changes:
+            self._changes.append({"at": at, "direction": direction, "step": step, "breached": json.loads(breached)})
+
+    def _publish(self):
+        with self._lock:
+            active = list(self._active)
+        for step in LADDER_STEPS:
+            metrics.set_gauge(f"slo.step.{step}", 1 if step in active else 0)
+        metrics.set_gauge("slo.level", len(active))
+
+    def _evaluate(self, now):
+        # Called with the lock held
+        if not self.enabled:
+            return
+        relieved = {stage for step in self._active for stage in LADDER_STEPS[step]}
+        breached, healthy = [], True
+        for stage, samples in self._samples.items():
+            while samples and samples[0][0] < now - self.window_seconds:
+                samples.popleft()
+            if len(samples) < self.min_samples:
+                # Too few to judge; a degraded stage has to show it's recovered
+                if samples and stage in relieved:
+                    healthy = False
+                continue
+            p95 = _percentile([seconds for _, seconds in samples], 95)
+            metrics.set_gauge(f"slo.{stage}.p95_ms", round(p95 * 1000, 1))
+            if p95 > self.targets[stage]:
+                breached.append(stage)
+            if p95 > self.targets[stage] * self.recover_ratio:
+                healthy = False
+
+        settled = self._changed_at is None or now - self._changed_at >= self.hold_seconds
+        if breached:
+            self._healthy_since = None
+            step = next((step for step in self.ladder if step not in self._active
+                         and set(LADDER_STEPS[step]) & set(breached)), None)
+            if step is not None and settled:
+                self._change(now, "down", step, breached)
+        elif not healthy:
+            self._healthy_since = None
+        elif self._active:
+            if self._healthy_since is None:
+                self._healthy_since = now
+            elif now - self._healthy_since >= self.recover_seconds and settled:
+                self._change(now, "up", self._active[-1], [])
+                self._healthy_since = now
+
+    def _change(self, now, direction, step, breached):
+        if direction == "down":
+            self._active.append(step)
+        else:
+            self._active.remove(step)
+        for stage in LADDER_STEPS[step]:
+            self._samples[stage].clear()
+            self._cleared.append(stage)
+        self._changed_at = now
+        change = {"at": now, "direction": direction, "step": step, "breached": breached}
+        self._changes.append(change)
+        self._new_changes.append(change)
+
+        metrics.increment(f"slo.step_{direction}.{step}")
+        if direction == "down":
+            print(f"📉 SLO breached ({', '.join(breached)}) - stepping down: {step}")
+        else:
+            print(f"📈 Latency recovered - stepping back up: {step} off")
+
+    def _sync_loop(self):
+        self.sync()
+        self._ready.set()
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=5)
+        # Readers don't wait for the sync writers of other processes
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def load_targets():
+    """DEFAULT_TARGETS_MS overridden by the SLO_TARGETS_MS JSON env var"""
+    targets = dict(DEFAULT_TARGETS_MS)
+    if Config.SLO_TARGETS_MS:
+        try:
+            targets.update({stage: float(ms) for stage, ms in json.loads(Config.SLO_TARGETS_MS).items()
+                            if stage in targets})
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"⚠️ Ignoring invalid SLO_TARGETS_MS: {e}")
+    return targets
+
+def load_ladder():
+    """SLO_LADDER as a list of known steps, in order"""
+    ladder = []
+    for step in (Config.SLO_LADDER or "").split(","):
+        step = step.strip()
+        if not step:
+            continue
+        if step not in LADDER_STEPS:
+            print(f"⚠️ Ignoring unknown SLO_LADDER step: {step}")
+            continue
+        ladder.append(step)
+    return ladder
+
+slo = SLOController()
@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+import time
+
+from config import Config
+from services.metrics_service import metrics
+
+# Speaking rate assumed for a voice until it has enough measured clips
+DEFAULT_CHARS_PER_SECOND = 15.0
+
+class VoiceFit:
+    """Exponentially weighted least-squares fit of seconds = pause + chars / chars_per_second"""
+
+    def __init__(self, n=0.0, sx=0.0, sy=0.0, sxx=0.0, sxy=0.0, samples=0):
+        self.n, self.sx, self.sy, self.sxx, self.sxy = n, sx, sy, sxx, sxy
+        self.samples = samples
+
+    def add(self, chars, seconds, decay):
+        self.n = self.n * decay + 1
+        self.sx = self.sx * decay + chars
+        self.sy = self.sy * decay + seconds
+        self.sxx = self.sxx * decay + chars * chars
+        self.sxy = self.sxy * decay + chars * seconds
+        self.samples += 1
+
+    def coefficients(self):
+        """(pause seconds, seconds per char)"""
+        variance = self.n * self.sxx - self.sx * self.sx
+        if variance > 1e-9 * max(self.n * self.sxx, 1.0):
+            slope = (self.n * self.sxy - self.sx * self.sy) / variance
+            pause = (self.sy - slope * self.sx) / self.n
+            if slope > 0 and pause >= 0:
+                return pause, slope
+        # Clips all about the same length (or a fit that makes no sense): plain ratio
+        return 0.0, self.sy / self.sx if self.sx else 1 / DEFAULT_CHARS_PER_SECOND
+
+    def then(self, later, decay):
+        """This fit followed by the clips of later (a fit started from nothing)"""
+        factor = decay ** later.samples
+        return VoiceFit(
+            self.n * factor + later.n, self.sx * factor + later.sx, self.sy * factor + later.sy,
+            self.sxx * factor + later.sxx, self.sxy * factor + later.sxy, self.samples + later.samples
+        )
+
+    def to_dict(self):
+        return {"n": self.n, "sx": self.sx, "sy": self.sy, "sxx": self.sxx, "sxy": self.sxy, "samples": self.samples}
+
+class SpeechRateModel:
+    """Per-voice speaking rate fitted from measured TTS clip durations
+
+    observe() takes clips whose length is known (parsed from the audio or
+    reported by the agent's TTS); estimate() predicts how long text will take
+    to say in that voice, using DEFAULT_CHARS_PER_SECOND until the voice has
+    min_samples clips. Fits live in SQLite (db_path, the usage database by
+    default) so every process starts warm and learns from the others: a
+    background thread adds this process's new clips to the stored fit with
+    one upsert per voice every sync_interval seconds (so no process
+    overwrites another's clips), then loads every voice's fit back. Nothing
+    here touches the database on the caller's thread, so observe() is safe
+    on the agent's event loop.
+    """
+
+    def __init__(self, db_path=None, min_samples=5, decay=0.99, sync_interval=None):
+        self.db_path = db_path or Config.SPEECH_RATE_DB_PATH
+        self.min_samples = min_samples
+        self.decay = decay
+        self.sync_interval = sync_interval if sync_interval is not None else Config.SPEECH_RATE_SYNC_INTERVAL
+        self._lock = threading.Lock()
+        # Held while syncing, so two threads never merge the same clips
+        self._io_lock = threading.Lock()
+        self._fits = {}     # voice_id -> VoiceFit: every process's clips as of the last sync, then ours
+        self._pending = {}  # voice_id -> VoiceFit of this process's clips not yet stored
+        self._tables = False
+        self._started = False
+        self._stop = threading.Event()
+        self._syncer = None
+
+    def start(self):
+        """Start the background sync, which loads the stored fits first"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._syncer = threading.Thread(target=self._sync_loop, name="speech-rate-sync", daemon=True)
+        self._syncer.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=5)
+            self._syncer = None
+        self.sync()
+
+    def observe(self, voice_id, chars, seconds):
+        """Add a clip of chars characters that lasted seconds"""
+        if chars <= 0 or not seconds or seconds <= 0:
+            return
+        self.start()
+        with self._lock:
+            fit = self._fits.setdefault(voice_id, VoiceFit())
+            fit.add(chars, seconds, self.decay)
+            self._pending.setdefault(voice_id, VoiceFit()).add(chars, seconds, self.decay)
+            pause, per_char = fit.coefficients()
+        metrics.set_gauge(f"speech_rate.{voice_id}.chars_per_second", round(1 / per_char, 2))
+
+    def estimate(self, text, voice_id=None):
+        """Seconds text should take to speak in voice_id (default: ELEVENLABS_VOICE_ID)"""
+        chars = len((text or "").strip())
+        if not chars:
+            return 0.0
+        self.start()
+        pause, per_char = self._coefficients(voice_id or Config.ELEVENLABS_VOICE_ID)
+        return pause + chars * per_char
+
+    def rate(self, voice_id=None):
+        """The fit for a voice as the client sees it"""
+        voice_id = voice_id or Config.ELEVENLABS_VOICE_ID
+        self.start()
+        with self._lock:
+            fit = self._fits.get(voice_id)
+            samples = fit.samples if fit else 0
+        pause, per_char = self._coefficients(voice_id)
+        return {
+            "voice_id": voice_id,
+            "chars_per_second": round(1 / per_char, 2),
+            "pause_seconds": round(pause, 3),
+            "samples": samples,
+            "fitted": samples >= self.min_samples
+        }
+
+    def sync(self):
+        """Merge this process's new clips into the stored fits and load every voice's fit back (blocking)"""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            now = time.time()
+            db = self._connect()
+            try:
+                if not self._tables:
+                    db.execute("""
+                        CREATE TABLE IF NOT EXISTS speech_rates (
+                            voice_id TEXT PRIMARY KEY,
+                            n REAL NOT NULL, sx REAL NOT NULL, sy REAL NOT NULL,
+                            sxx REAL NOT NULL, sxy REAL NOT NULL,
+                            samples INTEGER NOT NULL,
+                            updated_at REAL NOT NULL
+                        )
+                    """)
+                    self._tables = True
+                with db:
+                    # Stored fit decayed by our clip count, then our clips: the same as replaying them on it
+                    db.executemany("""
+                        INSERT INTO speech_rates (voice_id, n, sx, sy, sxx, sxy, samples, updated_at)
+                        VALUES (:voice_id, :n, :sx, :sy, :sxx, :sxy, :samples, :updated_at)
+                        ON CONFLICT (voice_id) DO UPDATE SET
+                            n = n * :factor + excluded.n, sx = sx * :factor + excluded.sx,
+                            sy = sy * :factor + excluded.sy, sxx = sxx * :factor + excluded.sxx,
+                            sxy = sxy * :factor + excluded.sxy, samples = samples + excluded.samples,
+                            updated_at = excluded.updated_at
+                    """, [dict(fit.to_dict(), voice_id=voice_id, factor=self.decay ** fit.samples, updated_at=now)
+                          for voice_id, fit in pending.items()])
+                rows = db.execute("SELECT voice_id, n, sx, sy, sxx, sxy, samples FROM speech_rates").fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not sync speech rates, will retry: {e}")
+                with self._lock:
+                    for voice_id, fit in pending.items():
+                        later = self._pending.get(voice_id)
+                        self._pending[voice_id] = fit.then(later, self.decay) if later else fit
+                return
+            finally:
+                db.close()
+            with self._lock:
+                fits = {voice_id: VoiceFit(*state) for voice_id, *state in rows}
+                # Clips observed while this sync ran come after the stored fit
+                for voice_id, later in self._pending.items():
+                    fits[voice_id] = fits.get(voice_id, VoiceFit()).then(later, self.decay)
+                self._fits = fits
+        metrics.increment("speech_rate.syncs")
+
+    def _coefficients(self, voice_id):
+        with self._lock:
+            fit = self._fits.get(voice_id)
+            if fit is not None and fit.samples >= self.min_samples:
+                return fit.coefficients()
+        return 0.0, 1 / DEFAULT_CHARS_PER_SECOND
+
+    def _sync_loop(self):
+        self.sync()
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+speech_rates = SpeechRateModel()
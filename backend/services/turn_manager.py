@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import time
+
+from services.metrics_service import metrics
+
+class TurnCancelled(Exception):
+    """Raised when a turn has been superseded by a newer one for the same session"""
+
+class Turn:
+    """A single /process-voice request for a session"""
+
+    def __init__(self, session_id, seq, content_hash):
+        self.session_id = session_id
+        self.seq = seq
+        self.content_hash = content_hash
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        self.result = None
+        self.status_code = 200
+        self.committed = False
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise TurnCancelled if a newer turn has superseded this one"""
+        if self.cancel_event.is_set():
+            raise TurnCancelled(f"Turn {self.seq} for session {self.session_id} was superseded")
+
+class TurnManager:
+    """Sequences turns per session: newer turns cancel older ones, identical uploads coalesce
+
+    Sessions with no turn in flight are dropped once they've been idle for
+    idle_ttl seconds (checked at most every sweep_interval seconds), so
+    session ids that never get a room don't pile up.
+    """
+
+    def __init__(self, follower_timeout=60, idle_ttl=1800, sweep_interval=60, clock=time.monotonic):
+        self.follower_timeout = follower_timeout
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._swept_at = clock()
+
+    @staticmethod
+    def content_hash(audio_bytes):
+        return hashlib.sha256(audio_bytes).hexdigest()
+
+    def _state(self, session_id):
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = {"seq": 0, "inflight": None, "committed_seq": 0, "lock": threading.Lock()}
+            self._sessions[session_id] = state
+        state["used_at"] = self._clock()
+        return state
+
+    def _evict_idle(self):
+        # Called with the lock held
+        now = self._clock()
+        if now - self._swept_at < self.sweep_interval:
+            return
+        self._swept_at = now
+        idle = [session_id for session_id, state in self._sessions.items()
+                if state["inflight"] is None and now - state["used_at"] > self.idle_ttl]
+        for session_id in idle:
+            del self._sessions[session_id]
+        if idle:
+            metrics.increment("turn_sessions_evicted", len(idle))
+        metrics.set_gauge("turn_sessions", len(self._sessions))
+
+    def begin(self, session_id, content_hash):
+        """Start a turn. Returns (turn, is_leader); followers should wait() on the leader's turn"""
+        with self._lock:
+            self._evict_idle()
+            state = self._state(session_id)
+            current = state["inflight"]
+
+            if current and not current.done_event.is_set() and not current.cancelled:
+                if current.content_hash == content_hash:
+                    metrics.increment("turns_coalesced")
+                    print(f"🔁 Coalesced duplicate upload onto turn {current.seq} for session {session_id}")
+                    return current, False
+
+                current.cancel_event.set()
+                metrics.increment("turns_cancelled")
+                print(f"⏹️ Cancelled turn {current.seq} for session {session_id} (superseded)")
+
+            state["seq"] += 1
+            turn = Turn(session_id, state["seq"], content_hash)
+            state["inflight"] = turn
+            metrics.increment("turns_started")
+            return turn, True
+
+    def wait(self, turn):
+        """Block until the leader finishes; returns (result, status_code)"""
+        if not turn.done_event.wait(self.follower_timeout):
+            return None, 504
+        return turn.result, turn.status_code
+
+    def commit(self, turn, apply_fn):
+        """Apply a history update only if the turn is still current and in order"""
+        with self._lock:
+            state = self._state(turn.session_id)
+        with state["lock"]:
+            if turn.cancelled or turn.seq <= state["committed_seq"]:
+                return False
+            apply_fn()
+            state["committed_seq"] = turn.seq
+            turn.committed = True
+            return True
+
+    def cancel_inflight(self, session_id):
+        """Cancel the session's in-flight turn (barge-in); returns it, or None if idle"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            current = state["inflight"] if state else None
+            if current is None or current.done_event.is_set() or current.cancelled:
+                return None
+            current.cancel_event.set()
+        metrics.increment("turns_cancelled")
+        print(f"✋ Cancelled turn {current.seq} for session {session_id} (interrupted)")
+        return current
+
+    def finish(self, turn, result, status_code=200):
+        """Publish the turn's result to coalesced followers and release the session slot"""
+        turn.result = result
+        turn.status_code = status_code
+        turn.done_event.set()
+        with self._lock:
+            state = self._sessions.get(turn.session_id)
+            if state and state["inflight"] is turn:
+                state["inflight"] = None
+                state["used_at"] = self._clock()
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
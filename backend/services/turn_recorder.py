@@ -0,0 +1,320 @@
+import base64
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import Config
+from services.metrics_service import metrics
+
+# Seconds between retention passes on the writer thread
+RETENTION_INTERVAL = 60
+# Seconds between sweeps for blob files no index row tracks (left by a crash
+# mid-write), and how old such a file must be, so an open write is never swept
+SWEEP_INTERVAL = 3600
+SWEEP_MIN_AGE = 600
+
+class TurnRecorder:
+    """Keeps recent /process-voice turns on disk for debugging and replay
+
+    Audio is stored once per distinct content under blobs/<sha256[:2]>/<sha256>,
+    so repeated clips (test phrases, cached TTS answers) only cost an index
+    row after the first. Each turn's metadata is one compact JSON line in an
+    append-only log segment (log/<start ms>.jsonl), indexed in index.db by
+    turn id, session and time together with the blobs it references.
+
+    record() only enqueues; a writer thread hashes and writes, and applies
+    retention by dropping whole segments, oldest first, once they're older
+    than max_age_seconds or the store is over max_bytes. Blobs no remaining
+    turn references go with them, as do blob files no index row tracks. A
+    blob's row is inserted before its file is written, in the turn's
+    transaction, so a committed row always has its file. The read methods (find, read_turn,
+    read_blob, stats) work without start(), e.g. from tools/replay_turns.py.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, max_age_seconds=None,
+                 segment_bytes=1024 * 1024, queue_size=256):
+        self.directory = directory or Config.TURN_RECORDER_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.TURN_RECORDER_MAX_MB * 1024 * 1024
+        self.max_age_seconds = (max_age_seconds if max_age_seconds is not None
+                                else Config.TURN_RECORDER_MAX_AGE_HOURS * 3600)
+        self.segment_bytes = segment_bytes
+        self.blob_dir = os.path.join(self.directory, "blobs")
+        self.log_dir = os.path.join(self.directory, "log")
+        self.index_path = os.path.join(self.directory, "index.db")
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._segment = None  # (name, file) being appended to
+        self._swept_at = time.monotonic()
+
+    def start(self):
+        """Create the store and start the writer thread"""
+        if self._writer is not None:
+            return
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.log_dir, exist_ok=True)
+        with self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS turns (
+                    turn_id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    segment TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, recorded_at);
+                CREATE INDEX IF NOT EXISTS turns_by_segment ON turns (segment);
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS turn_blobs (
+                    turn_id TEXT NOT NULL,
+                    hash TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS turn_blobs_by_turn ON turn_blobs (turn_id);
+                CREATE INDEX IF NOT EXISTS turn_blobs_by_hash ON turn_blobs (hash);
+            """)
+        self._writer = threading.Thread(target=self._write_loop, name="turn-recorder", daemon=True)
+        self._writer.start()
+
+    def stop(self, timeout=5):
+        """Write what's queued, then stop the writer"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=timeout)
+        self._writer = None
+
+    def record(self, metadata, input_audio=None, output_audio=()):
+        """Queue a turn; returns False (and drops it) if the writer is behind
+
+        input_audio is the uploaded bytes; output_audio is a list of clips as
+        bytes or base64 strings (decoded on the writer thread).
+        """
+        try:
+            self._queue.put_nowait((time.time(), metadata, input_audio, list(output_audio)))
+        except queue.Full:
+            metrics.increment("turn_recorder.dropped")
+            return False
+        return True
+
+    def flush(self):
+        """Block until every queued turn has been written"""
+        self._queue.join()
+
+    def find(self, session_id=None, since=None, turn_ids=None, limit=None):
+        """Index rows (turn_id, session_id, recorded_at), oldest first; limit keeps the newest"""
+        clauses, params = [], []
+        if session_id:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if since:
+            clauses.append("recorded_at >= ?")
+            params.append(since)
+        if turn_ids:
+            clauses.append(f"turn_id IN ({','.join('?' * len(turn_ids))})")
+            params.extend(turn_ids)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT turn_id, session_id, recorded_at FROM turns {where} ORDER BY recorded_at DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._connect() as db:
+            # Newest first so the limit keeps the most recent turns
+            return db.execute(query, params).fetchall()[::-1]
+
+    def read_turn(self, turn_id):
+        """A turn's metadata record, or None if it's been dropped"""
+        with self._connect() as db:
+            row = db.execute("SELECT segment, offset, length FROM turns WHERE turn_id = ?", (turn_id,)).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        try:
+            with open(os.path.join(self.log_dir, segment), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except FileNotFoundError:
+            return None
+
+    def read_blob(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def stats(self):
+        """Turn and blob counts, bytes stored vs. bytes the turns reference (the dedup saving)"""
+        with self._connect() as db:
+            turns = db.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+            blobs, stored = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            referenced = db.execute(
+                "SELECT COALESCE(SUM(blobs.size), 0) FROM turn_blobs JOIN blobs USING (hash)"
+            ).fetchone()[0]
+        return {
+            "turns": turns,
+            "blobs": blobs,
+            "blob_bytes": stored,
+            "referenced_bytes": referenced,
+            "log_bytes": self._log_bytes()
+        }
+
+    def _write_loop(self):
+        db = self._connect()
+        last_retention = 0.0
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                self._write_turn(db, *item)
+                if time.monotonic() - last_retention >= RETENTION_INTERVAL:
+                    last_retention = time.monotonic()
+                    self._apply_retention(db)
+            except (OSError, sqlite3.Error, ValueError) as e:
+                print(f"❌ Turn recording failed: {e}")
+                metrics.increment("turn_recorder.errors")
+            finally:
+                self._queue.task_done()
+
+        if self._segment is not None:
+            self._segment[1].close()
+            self._segment = None
+        db.close()
+
+    def _write_turn(self, db, recorded_at, metadata, input_audio, output_audio):
+        turn_id = uuid.uuid4().hex[:16]
+        with db:
+            input_ref = self._store_blob(db, input_audio) if input_audio else None
+            output_refs = [self._store_blob(db, self._as_bytes(clip)) for clip in output_audio]
+            record = dict(metadata, turn_id=turn_id, recorded_at=recorded_at, input=input_ref, output=output_refs)
+            line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode()
+            segment, offset = self._append(line)
+
+            db.execute(
+                "INSERT INTO turns (turn_id, session_id, recorded_at, segment, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+                (turn_id, metadata.get("session_id", ""), recorded_at, segment, offset, len(line))
+            )
+            refs = ([input_ref] if input_ref else []) + output_refs
+            db.executemany("INSERT INTO turn_blobs (turn_id, hash) VALUES (?, ?)",
+                           [(turn_id, ref["sha256"]) for ref in refs])
+        metrics.increment("turn_recorder.turns")
+
+    def _store_blob(self, db, data):
+        digest = hashlib.sha256(data).hexdigest()
+        ref = {"sha256": digest, "bytes": len(data)}
+        # Claims the hash (another process writing the same clip waits on our transaction)
+        inserted = db.execute(
+            "INSERT OR IGNORE INTO blobs (hash, size, created_at) VALUES (?, ?, ?)", (digest, len(data), time.time())
+        ).rowcount
+        path = self._blob_path(digest)
+        # A tracked hash whose file is gone (removed by another process's retention
+        # as this one re-added it) is written again
+        if not inserted and os.path.exists(path):
+            metrics.increment("turn_recorder.dedup_bytes", len(data))
+            return ref
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so a crash never leaves a truncated blob;
+        # a failed write rolls the row back with the rest of the turn
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        metrics.increment("turn_recorder.blob_bytes", len(data))
+        return ref
+
+    def _append(self, line):
+        """Append a record to the current segment; returns (segment, offset)"""
+        if self._segment is None or self._segment[1].tell() >= self.segment_bytes:
+            self._rotate()
+        name, f = self._segment
+        offset = f.tell()
+        f.write(line)
+        f.flush()
+        return name, offset
+
+    def _rotate(self):
+        if self._segment is not None:
+            self._segment[1].close()
+        # Names sort in time order, which is the order retention drops them in
+        name = f"{int(time.time() * 1000):015d}.jsonl"
+        while os.path.exists(os.path.join(self.log_dir, name)):
+            name = f"{int(name.split('.')[0]) + 1:015d}.jsonl"
+        self._segment = (name, open(os.path.join(self.log_dir, name), "ab"))
+
+    def _apply_retention(self, db):
+        cutoff = time.time() - self.max_age_seconds if self.max_age_seconds else None
+        dropped = 0
+        for segment in sorted(os.listdir(self.log_dir)):
+            newest = db.execute("SELECT MAX(recorded_at) FROM turns WHERE segment = ?", (segment,)).fetchone()[0]
+            if newest is None:
+                newest = int(segment.split(".")[0]) / 1000  # Empty segment: its start time
+            too_old = cutoff is not None and newest < cutoff
+            over_size = self.max_bytes and self._stored_bytes(db) > self.max_bytes
+            if not (too_old or over_size):
+                break
+            if self._segment is not None and segment == self._segment[0]:
+                self._rotate()
+            self._drop_segment(db, segment)
+            dropped += 1
+        if dropped:
+            metrics.increment("turn_recorder.segments_dropped", dropped)
+        if time.monotonic() - self._swept_at >= SWEEP_INTERVAL:
+            self._swept_at = time.monotonic()
+            self._sweep_untracked(db)
+
+    def _sweep_untracked(self, db):
+        """Remove .tmp and blob files with no index row, once they're SWEEP_MIN_AGE old"""
+        tracked = {row[0] for row in db.execute("SELECT hash FROM blobs")}
+        cutoff = time.time() - SWEEP_MIN_AGE
+        removed = 0
+        for prefix in os.scandir(self.blob_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name in tracked or entry.stat().st_mtime > cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            metrics.increment("turn_recorder.untracked_removed", removed)
+
+    def _drop_segment(self, db, segment):
+        with db:
+            db.execute("DELETE FROM turn_blobs WHERE turn_id IN (SELECT turn_id FROM turns WHERE segment = ?)", (segment,))
+            db.execute("DELETE FROM turns WHERE segment = ?", (segment,))
+            orphans = [row[0] for row in db.execute(
+                "SELECT hash FROM blobs WHERE hash NOT IN (SELECT hash FROM turn_blobs)"
+            )]
+            db.executemany("DELETE FROM blobs WHERE hash = ?", [(digest,) for digest in orphans])
+        for path in [os.path.join(self.log_dir, segment)] + [self._blob_path(digest) for digest in orphans]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _stored_bytes(self, db):
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0] + self._log_bytes()
+
+    def _log_bytes(self):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(self.log_dir))
+        except FileNotFoundError:
+            return 0
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    @staticmethod
+    def _as_bytes(clip):
+        return base64.b64decode(clip) if isinstance(clip, str) else clip
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=5)
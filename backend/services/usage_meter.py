@@ -0,0 +1,320 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from services.metrics_service import metrics
+
+USAGE_KINDS = (
+    "whisper_seconds",
+    "prompt_tokens",
+    "completion_tokens",
+    "tts_characters",
+    "tts_seconds",
+    "avatar_seconds"
+)
+
+DEFAULT_BUDGETS = {
+    # Per-session limits; 0 or missing means unlimited
+    "session": {
+        "whisper_seconds": 600,
+        "llm_tokens": 40000,
+        "tts_characters": 20000,
+        "avatar_seconds": 1800
+    },
+    "tenant": {
+        "whisper_seconds": 36000,
+        "llm_tokens": 2000000,
+        "tts_characters": 1000000,
+        "avatar_seconds": 36000
+    }
+}
+
+class BudgetDecision:
+    """How the next request should run given current usage"""
+
+    def __init__(self, model, max_tokens):
+        self.allowed = True
+        self.model = model
+        self.max_tokens = max_tokens
+        self.tts_enabled = True
+        self.tts_cache_only = False  # Serve only already-synthesized audio
+        self.avatar_enabled = True
+        self.reasons = []
+
+    @property
+    def degraded(self):
+        return bool(self.reasons)
+
+    def to_dict(self):
+        return {
+            "allowed": self.allowed,
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "tts_enabled": self.tts_enabled,
+            "tts_cache_only": self.tts_cache_only,
+            "avatar_enabled": self.avatar_enabled,
+            "reasons": list(self.reasons)
+        }
+
+class UsageMeter:
+    """Usage per session and tenant, batched into SQLite and shared through it
+
+    record() only adds to in-memory deltas, which a background thread
+    flushes every flush_interval seconds. Budgets are checked against the
+    totals in SQLite - so usage from other Flask workers, agent job
+    processes and earlier runs counts - plus this process's unflushed
+    deltas. Stored totals are cached per session and tenant (the
+    max_sessions most recently used) and re-read once they're
+    refresh_interval seconds old, so most checks never touch the database.
+    """
+
+    def __init__(self, db_path=None, flush_interval=None, budgets=None, refresh_interval=None, max_sessions=None):
+        self.db_path = db_path or Config.USAGE_DB_PATH
+        self.flush_interval = flush_interval if flush_interval is not None else Config.USAGE_FLUSH_INTERVAL
+        self.refresh_interval = refresh_interval if refresh_interval is not None else Config.USAGE_REFRESH_INTERVAL
+        self.max_sessions = max_sessions or Config.USAGE_CACHE_SESSIONS
+        self.budgets = budgets or load_budgets()
+        self._lock = threading.Lock()
+        # Held while writing or reading the store, so a reload never sees a flush half-applied
+        self._io_lock = threading.Lock()
+        self._sessions = OrderedDict()  # (tenant, session_id) -> [loaded_at, {kind: stored amount}]
+        self._tenants = OrderedDict()   # tenant -> [loaded_at, {kind: stored amount}]
+        self._pending = {}    # (tenant, session_id) -> {kind: amount not yet flushed}
+        self._flushing = {}   # The same, while a flush is writing it
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def start(self):
+        """Create the tables and start the background flusher"""
+        if self._flusher is not None:
+            return
+        db = self._connect()
+        try:
+            db.isolation_level = None
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    tenant TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    amount REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (tenant, session_id, kind)
+                )
+            """)
+            has_totals = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_totals'"
+            ).fetchone()
+            if not has_totals:
+                # Per-tenant sums kept alongside, so a tenant check is one lookup
+                db.execute("""
+                    CREATE TABLE usage_totals (
+                        tenant TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        amount REAL NOT NULL DEFAULT 0,
+                        updated_at REAL NOT NULL,
+                        PRIMARY KEY (tenant, kind)
+                    )
+                """)
+                db.execute("""
+                    INSERT INTO usage_totals (tenant, kind, amount, updated_at)
+                    SELECT tenant, kind, SUM(amount), MAX(updated_at) FROM usage GROUP BY tenant, kind
+                """)
+            db.execute("COMMIT")
+        finally:
+            db.close()
+        self._flusher = threading.Thread(target=self._flush_loop, name="usage-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        self.flush()
+
+    def record(self, session_id, tenant="default", **amounts):
+        """Add usage, e.g. record(sid, tenant, prompt_tokens=120, completion_tokens=40)"""
+        with self._lock:
+            pending = self._pending.setdefault((tenant, session_id), {})
+            for kind, amount in amounts.items():
+                if amount:
+                    pending[kind] = pending.get(kind, 0) + amount
+        for kind, amount in amounts.items():
+            if amount:
+                metrics.increment(f"usage.{kind}", amount)
+
+    def session_usage(self, session_id, tenant="default"):
+        stored = self._stored(self._sessions, (tenant, session_id))
+        with self._lock:
+            usage = dict(stored)
+            for unflushed in (self._flushing, self._pending):
+                _add(usage, unflushed.get((tenant, session_id), {}))
+            return usage
+
+    def tenant_usage(self, tenant="default"):
+        stored = self._stored(self._tenants, tenant)
+        with self._lock:
+            usage = dict(stored)
+            for unflushed in (self._flushing, self._pending):
+                for (owner, _), amounts in unflushed.items():
+                    if owner == tenant:
+                        _add(usage, amounts)
+            return usage
+
+    def check(self, session_id, tenant="default", model=None, max_tokens=None, count=True):
+        """Decide how to degrade the next request; cheap enough to call per request
+
+        Pass count=False for checks that aren't a new request (polls, status
+        pages) so usage.degraded_requests counts each request once.
+        """
+        decision = BudgetDecision(model or Config.OPENAI_MODEL, max_tokens or Config.OPENAI_MAX_TOKENS)
+        scopes = (
+            ("session", self.session_usage(session_id, tenant)),
+            ("tenant", self.tenant_usage(tenant))
+        )
+        for scope, usage in scopes:
+            self._apply_budget(decision, scope, usage, self.budgets.get(scope, {}))
+
+        if decision.degraded and count:
+            metrics.increment("usage.degraded_requests")
+        return decision
+
+    @staticmethod
+    def _apply_budget(decision, scope, usage, budget):
+        def over(kind, used):
+            limit = budget.get(kind)
+            return bool(limit) and used >= limit
+
+        if over("whisper_seconds", usage.get("whisper_seconds", 0)):
+            decision.allowed = False
+            decision.reasons.append(f"{scope}:whisper_seconds")
+
+        llm_tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        if over("llm_tokens", llm_tokens):
+            decision.model = Config.OPENAI_FALLBACK_MODEL
+            decision.max_tokens = min(decision.max_tokens, Config.OPENAI_FALLBACK_MAX_TOKENS)
+            decision.reasons.append(f"{scope}:llm_tokens")
+
+        if over("tts_characters", usage.get("tts_characters", 0)):
+            decision.tts_enabled = False
+            decision.reasons.append(f"{scope}:tts_characters")
+
+        if over("avatar_seconds", usage.get("avatar_seconds", 0)):
+            decision.avatar_enabled = False
+            decision.reasons.append(f"{scope}:avatar_seconds")
+
+    def flush(self):
+        """Write pending deltas to SQLite in one transaction"""
+        with self._io_lock:
+            with self._lock:
+                flushing, self._pending = self._pending, {}
+                self._flushing = flushing
+            if not flushing:
+                return 0
+
+            now = time.time()
+            rows, tenant_totals = [], {}
+            for (tenant, session_id), amounts in flushing.items():
+                _add(tenant_totals.setdefault(tenant, {}), amounts)
+                rows.extend((tenant, session_id, kind, amount, now) for kind, amount in amounts.items())
+            total_rows = [(tenant, kind, amount, now) for tenant, amounts in tenant_totals.items()
+                          for kind, amount in amounts.items()]
+            try:
+                with self._connect() as db:
+                    db.executemany("""
+                        INSERT INTO usage (tenant, session_id, kind, amount, updated_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (tenant, session_id, kind)
+                        DO UPDATE SET amount = amount + excluded.amount, updated_at = excluded.updated_at
+                    """, rows)
+                    db.executemany("""
+                        INSERT INTO usage_totals (tenant, kind, amount, updated_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (tenant, kind)
+                        DO UPDATE SET amount = amount + excluded.amount, updated_at = excluded.updated_at
+                    """, total_rows)
+            except sqlite3.Error as e:
+                print(f"❌ Usage flush failed, will retry: {e}")
+                with self._lock:
+                    for key, amounts in flushing.items():
+                        _add(self._pending.setdefault(key, {}), amounts)
+                    self._flushing = {}
+                return 0
+
+            # The deltas are stored now: move them into the cached totals
+            with self._lock:
+                for key, amounts in flushing.items():
+                    if key in self._sessions:
+                        _add(self._sessions[key][1], amounts)
+                for tenant, amounts in tenant_totals.items():
+                    if tenant in self._tenants:
+                        _add(self._tenants[tenant][1], amounts)
+                self._flushing = {}
+
+        metrics.increment("usage.rows_flushed", len(rows))
+        return len(rows)
+
+    def _stored(self, cache, key):
+        """Stored totals for a session ((tenant, session_id) in _sessions) or tenant, reloaded when stale"""
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+                if time.monotonic() - entry[0] < self.refresh_interval:
+                    return entry[1]
+
+        with self._io_lock:
+            with self._lock:
+                # Another thread may have just reloaded it
+                entry = cache.get(key)
+                if entry is not None and time.monotonic() - entry[0] < self.refresh_interval:
+                    return entry[1]
+            if cache is self._sessions:
+                query = "SELECT kind, amount FROM usage WHERE tenant = ? AND session_id = ?"
+                args = key
+            else:
+                query = "SELECT kind, amount FROM usage_totals WHERE tenant = ?"
+                args = (key,)
+            try:
+                with self._connect() as db:
+                    stored = dict(db.execute(query, args).fetchall())
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not read stored usage, using what's cached: {e}")
+                return entry[1] if entry is not None else {}
+
+            with self._lock:
+                cache[key] = [time.monotonic(), stored]
+                cache.move_to_end(key)
+                while len(cache) > self.max_sessions:
+                    cache.popitem(last=False)
+        metrics.increment("usage.store_reads")
+        return stored
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=5)
+        # WAL so readers in other processes never wait on a flush (and a flush never waits on them)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+def _add(totals, amounts):
+    for kind, amount in amounts.items():
+        totals[kind] = totals.get(kind, 0) + amount
+
+def load_budgets():
+    """DEFAULT_BUDGETS overridden by the USAGE_BUDGETS JSON env var"""
+    budgets = {scope: dict(limits) for scope, limits in DEFAULT_BUDGETS.items()}
+    if Config.USAGE_BUDGETS:
+        try:
+            for scope, limits in json.loads(Config.USAGE_BUDGETS).items():
+                budgets.setdefault(scope, {}).update(limits)
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️ Ignoring invalid USAGE_BUDGETS: {e}")
+    return budgets
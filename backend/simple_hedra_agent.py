@@ -3,13 +3,21 @@ import asyncio
 import os
 from livekit import agents
 from livekit.agents import AgentSession, Agent
-from livekit.plugins import openai, hedra
 from dotenv import load_dotenv
 
+from config import Config
+from services.prompt_registry import prompts
+
 load_dotenv()
 
+def prewarm(proc: agents.JobProcess):
+    """Import plugins in the job process rather than at worker startup"""
+    from livekit.plugins import openai, hedra  # noqa: F401
+
 async def entrypoint(ctx: agents.JobContext):
     """Simple Hedra avatar agent"""
+    from livekit.plugins import openai, hedra
+    
     await ctx.connect()
     
     # Get avatar ID from environment
@@ -34,7 +42,7 @@ async def entrypoint(ctx: agents.JobContext):
     # Create session with OpenAI realtime model
     session = AgentSession(
         stt=openai.STT(),
-        llm=openai.LLM(model="gpt-3.5-turbo"),
+        llm=openai.LLM(model=Config.OPENAI_MODEL),
         tts=openai.TTS(voice="alloy")
     )
     
@@ -42,9 +50,7 @@ async def entrypoint(ctx: agents.JobContext):
     await hedra_avatar.start(session, room=ctx.room)
     
     # Create agent
-    agent = Agent(
-        instructions="You are a helpful AI assistant. Keep responses brief for voice interaction."
-    )
+    agent = Agent(instructions=prompts.get("avatar").instructions)
     
     # Start session
     await session.start(agent=agent, room=ctx.room)
@@ -53,4 +59,4 @@ async def entrypoint(ctx: agents.JobContext):
 
 if __name__ == "__main__":
     from livekit.agents import cli, WorkerOptions
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint)) 
\ No newline at end of file
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)) 
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""audio_duration: MP3 frame headers (CBR, VBR, Xing) and Ogg Opus granule positions
+
+Clips are built byte by byte with known lengths, so no encoder is needed.
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_duration import _FRAMES, audio_duration, mp3_duration, ogg_opus_duration
+
+MPEG1_L3 = 0xFB  # MPEG-1 Layer III, no CRC: 1152 samples per frame
+MPEG2_L3 = 0xF3  # MPEG-2 Layer III, no CRC: 576 samples per frame
+STEREO, MONO = 0x00, 0xC0
+
+def frame(byte1=MPEG1_L3, bitrate_index=9, rate_index=0, padding=0, mode=STEREO):
+    """One frame: header plus a silent payload (9 = 128 kbps for MPEG-1, 64 kbps for MPEG-2)"""
+    byte2 = bitrate_index << 4 | rate_index << 2 | padding << 1
+    length = _FRAMES[byte1 << 8 | byte2][0]
+    return bytes([0xFF, byte1, byte2, mode]) + bytes(length - 4)
+
+def xing(count, byte1=MPEG1_L3, mode=STEREO, tag=b"Xing"):
+    """A first frame carrying a Xing/Info header with the stream's frame count"""
+    info = bytearray(frame(byte1, mode=mode))
+    mono = mode == MONO
+    offset = 4 + ((17 if mono else 32) if byte1 == MPEG1_L3 else (9 if mono else 17))
+    info[offset:offset + 12] = tag + (1).to_bytes(4, "big") + count.to_bytes(4, "big")
+    return bytes(info)
+
+def ogg_page(granule, payload, header_type=0, sequence=0):
+    """One Ogg page (CRC left zero; the parser doesn't check it)"""
+    segments = [255] * (len(payload) // 255) + [len(payload) % 255]
+    return (b"OggS" + bytes([0, header_type]) + granule.to_bytes(8, "little") + (1234).to_bytes(4, "little")
+            + sequence.to_bytes(4, "little") + bytes(4) + bytes([len(segments)]) + bytes(segments) + payload)
+
+def opus_head(pre_skip=312, channels=1):
+    return b"OpusHead" + bytes([1, channels]) + pre_skip.to_bytes(2, "little") + (48000).to_bytes(4, "little") + bytes(3)
+
+def ogg_opus(granules, pre_skip=312):
+    """An Ogg Opus stream whose audio pages end at the given granule positions"""
+    pages = [ogg_page(0, opus_head(pre_skip), header_type=2), ogg_page(0, b"OpusTags" + bytes(8), sequence=1)]
+    for index, granule in enumerate(granules):
+        pages.append(ogg_page(granule, bytes(200), header_type=4 if index == len(granules) - 1 else 0,
+                              sequence=index + 2))
+    return b"".join(pages)
+
+class Mp3DurationTest(unittest.TestCase):
+    def test_cbr(self):
+        self.assertAlmostEqual(mp3_duration(frame() * 100), 100 * 1152 / 44100)
+        self.assertAlmostEqual(mp3_duration(frame(rate_index=1) * 50), 50 * 1152 / 48000)
+
+    def test_mp3_low(self):
+        # ElevenLabs mp3_22050_32: MPEG-2 Layer III, 32 kbps
+        self.assertAlmostEqual(mp3_duration(frame(MPEG2_L3, bitrate_index=4) * 80), 80 * 576 / 22050)
+
+    def test_vbr_counts_every_frame(self):
+        frames = [frame(bitrate_index=index, padding=index % 2) for index in (5, 7, 9, 11, 12, 14, 1) * 20]
+        data = b"".join(frames)
+        self.assertAlmostEqual(mp3_duration(data), len(frames) * 1152 / 44100)
+        # A size / nominal bitrate guess is off for the same clip
+        self.assertGreater(abs(len(data) * 8 / 128000 - len(frames) * 1152 / 44100), 0.1)
+
+    def test_xing_frame_count_wins(self):
+        # Only the first frames arrived, but the Xing header knows the whole stream
+        self.assertAlmostEqual(mp3_duration(xing(1000) + frame() * 10), 1000 * 1152 / 44100)
+        self.assertAlmostEqual(mp3_duration(xing(500, tag=b"Info") + frame() * 10), 500 * 1152 / 44100)
+
+    def test_xing_offsets_by_version_and_channels(self):
+        self.assertAlmostEqual(mp3_duration(xing(300, mode=MONO) + frame(mode=MONO)), 300 * 1152 / 44100)
+        self.assertAlmostEqual(mp3_duration(xing(300, MPEG2_L3) + frame(MPEG2_L3)), 300 * 576 / 22050)
+        self.assertAlmostEqual(mp3_duration(xing(300, MPEG2_L3, MONO) + frame(MPEG2_L3, mode=MONO)),
+                               300 * 576 / 22050)
+
+    def test_xing_without_frame_count_walks_frames(self):
+        info = bytearray(xing(1000))
+        info[36 + 7] = 0  # Flags: no frame count
+        self.assertAlmostEqual(mp3_duration(bytes(info) + frame() * 9), 10 * 1152 / 44100)
+
+    def test_skips_id3_tag(self):
+        tag = b"ID3\x04\x00\x00" + bytes([0, 0, 1, 0]) + b"\xff" * 128  # 128-byte body, full of sync bytes
+        self.assertAlmostEqual(mp3_duration(tag + frame() * 20), 20 * 1152 / 44100)
+
+    def test_resyncs_past_garbage(self):
+        data = b"\x00\xff\x12junk" + frame() * 10 + b"\xff\xfb" + frame() * 10
+        self.assertAlmostEqual(mp3_duration(data), 20 * 1152 / 44100)
+
+    def test_trailing_partial_frame_is_not_counted(self):
+        self.assertAlmostEqual(mp3_duration(frame() * 10 + frame()[:100]), 10 * 1152 / 44100)
+
+    def test_no_frames(self):
+        self.assertIsNone(mp3_duration(b""))
+        self.assertIsNone(mp3_duration(b"not audio at all"))
+        self.assertIsNone(mp3_duration(frame()[:100]))
+
+    def test_accepts_memoryview(self):
+        self.assertAlmostEqual(mp3_duration(memoryview(frame() * 5)), 5 * 1152 / 44100)
+
+class OggOpusDurationTest(unittest.TestCase):
+    def test_last_granule_minus_pre_skip(self):
+        self.assertAlmostEqual(ogg_opus_duration(ogg_opus([960 * 50 + 312])), 1.0)
+        self.assertAlmostEqual(ogg_opus_duration(ogg_opus([48312, 96312, 120312])), 2.5)
+
+    def test_pre_skip_from_header(self):
+        self.assertAlmostEqual(ogg_opus_duration(ogg_opus([48000 + 3840], pre_skip=3840)), 1.0)
+        self.assertAlmostEqual(ogg_opus_duration(ogg_opus([48000], pre_skip=0)), 1.0)
+
+    def test_granule_before_pre_skip_is_zero(self):
+        self.assertEqual(ogg_opus_duration(ogg_opus([100])), 0.0)
+
+    def test_ignores_capture_pattern_in_payload(self):
+        # "OggS" inside packet data isn't a page unless a version 0 header follows
+        data = ogg_opus([48312]) + b"OggS\x07" + bytes(20)
+        self.assertAlmostEqual(ogg_opus_duration(data), 1.0)
+
+    def test_truncated_last_page_uses_the_one_before(self):
+        # A download cut off inside the next page header
+        data = ogg_opus([48312, 96312]) + b"OggS\x00\x04\x01"
+        self.assertAlmostEqual(ogg_opus_duration(data), 2.0)
+
+    def test_not_ogg(self):
+        self.assertIsNone(ogg_opus_duration(b"RIFF....WAVE"))
+
+class AudioDurationTest(unittest.TestCase):
+    def test_dispatch_by_format(self):
+        self.assertAlmostEqual(audio_duration(frame() * 10, "mp3"), 10 * 1152 / 44100)
+        self.assertAlmostEqual(audio_duration(frame(MPEG2_L3, bitrate_index=4) * 10, "mp3_low"), 10 * 576 / 22050)
+        self.assertAlmostEqual(audio_duration(ogg_opus([48312]), "opus"), 1.0)
+        self.assertAlmostEqual(audio_duration(bytes(48000), "pcm"), 1.0)  # 24 kHz, 16-bit mono
+        self.assertAlmostEqual(audio_duration(bytes(44100), "pcm_22050"), 1.0)
+
+    def test_empty(self):
+        self.assertIsNone(audio_duration(b"", "mp3"))
+        self.assertIsNone(audio_duration(None, "opus"))
+
+if __name__ == "__main__":
+    unittest.main()
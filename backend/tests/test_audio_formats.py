@@ -0,0 +1,68 @@
+"""negotiate_format: the audio_format hint, the Accept header and network hints
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_formats import AUDIO_FORMATS, get_format, low_bitrate, negotiate_format
+
+def name(**kwargs):
+    return negotiate_format(**kwargs).name
+
+class NegotiateFormatTest(unittest.TestCase):
+    def test_default_without_hints(self):
+        self.assertEqual(name(), "mp3")
+        self.assertEqual(name(accept_header="*/*"), "mp3")
+        self.assertEqual(name(accept_header="text/event-stream"), "mp3")
+
+    def test_hint_wins_over_everything(self):
+        self.assertEqual(name(hint="pcm_22050", accept_header="audio/ogg", save_data=True), "pcm_22050")
+        self.assertEqual(name(hint="mp3", effective_type="2g"), "mp3")
+
+    def test_unknown_hint_falls_back_to_accept(self):
+        self.assertEqual(name(hint="flac", accept_header="audio/ogg"), "opus")
+        self.assertEqual(name(hint="", accept_header="audio/mpeg"), "mp3")
+
+    def test_accept_quality_order(self):
+        self.assertEqual(name(accept_header="audio/mpeg;q=0.5, audio/ogg;q=0.9"), "opus")
+        self.assertEqual(name(accept_header="audio/ogg;q=0.5, audio/mpeg"), "mp3")
+        # Equal quality keeps the client's order
+        self.assertEqual(name(accept_header="audio/opus, audio/mpeg"), "opus")
+        self.assertEqual(name(accept_header="audio/mp3, audio/ogg"), "mp3")
+
+    def test_accept_skips_unservable_and_refused_types(self):
+        self.assertEqual(name(accept_header="audio/webm, audio/ogg"), "opus")
+        self.assertEqual(name(accept_header="audio/ogg;q=0, audio/mpeg;q=0.1"), "mp3")
+        self.assertEqual(name(accept_header="audio/ogg;q=abc, audio/mpeg;q=0.1"), "mp3")
+        # PCM only when asked for by name
+        self.assertEqual(name(accept_header="audio/L16"), "mp3")
+
+    def test_constrained_networks_get_low_bitrate_mp3(self):
+        self.assertEqual(name(save_data=True), "mp3_low")
+        self.assertEqual(name(effective_type="3g"), "mp3_low")
+        self.assertEqual(name(effective_type="SLOW-2G"), "mp3_low")
+        self.assertEqual(name(effective_type="4g"), "mp3")
+        self.assertEqual(name(accept_header="audio/mpeg", save_data=True), "mp3_low")
+        # Opus is already small
+        self.assertEqual(name(accept_header="audio/ogg", save_data=True), "opus")
+
+    def test_get_format_falls_back_to_default(self):
+        self.assertIs(get_format("opus"), AUDIO_FORMATS["opus"])
+        self.assertIs(get_format("nope"), AUDIO_FORMATS["mp3"])
+        self.assertIs(get_format(None), AUDIO_FORMATS["mp3"])
+
+    def test_low_bitrate_keeps_the_media_type(self):
+        for fmt in AUDIO_FORMATS.values():
+            with self.subTest(fmt=fmt.name):
+                low = low_bitrate(fmt)
+                self.assertEqual(low.mime_type, fmt.mime_type)
+                self.assertLessEqual(low.bitrate_kbps, fmt.bitrate_kbps)
+        self.assertEqual(low_bitrate(AUDIO_FORMATS["mp3"]).name, "mp3_low")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""LiveKitService and the /rooms endpoints against tools/fake_livekit_server.py
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.livekit_service import LiveKitService
+from tools.fake_livekit_server import serve
+
+API_KEY = "devkey"
+API_SECRET = "secret-" + "x" * 32
+ADMIN_TOKEN = "test-admin-token"
+
+class FakeServerTestCase(unittest.TestCase):
+    """A fresh fake server and LiveKitService per test"""
+
+    def setUp(self):
+        self.server, self.store = serve(0)
+        url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.service = LiveKitService(url=url, api_key=API_KEY, api_secret=API_SECRET)
+
+    def tearDown(self):
+        self.service.run(self.service.close())
+        self.service.runner.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def room_names(self):
+        return set(self.store.rooms)
+
+class LiveKitServiceTest(FakeServerTestCase):
+    def test_create_room(self):
+        room = self.service.run(self.service.create_room("room-a", empty_timeout=42))
+        self.assertEqual(room["name"], "room-a")
+        self.assertTrue(room["sid"])
+        self.assertEqual(self.store.rooms["room-a"].empty_timeout, 42)
+
+    def test_create_room_is_idempotent(self):
+        first = self.service.run(self.service.create_room("room-a"))
+        second = self.service.run(self.service.create_room("room-a"))
+        self.assertEqual(first["sid"], second["sid"])
+        self.assertEqual(self.room_names(), {"room-a"})
+
+    def test_create_rooms(self):
+        names = [f"bulk-{i}" for i in range(12)]
+        created = self.service.run(self.service.create_rooms(names, concurrency=4))
+        self.assertEqual([room["name"] for room in created], names)
+        self.assertTrue(all("error" not in room for room in created))
+        self.assertEqual(self.room_names(), set(names))
+
+    def test_list_rooms(self):
+        self.service.run(self.service.create_rooms(["room-a", "room-b"]))
+        rooms = self.service.run(self.service.list_rooms())
+        self.assertEqual({room["name"] for room in rooms}, {"room-a", "room-b"})
+        self.assertTrue(all(room["num_participants"] == 0 for room in rooms))
+
+    def test_list_rooms_is_cached(self):
+        self.service.run(self.service.create_room("room-a"))
+        self.service.run(self.service.list_rooms())
+        self.service.run(self.service.list_rooms())
+        self.assertEqual(self.store.calls["ListRooms"], 1)
+
+        self.service.run(self.service.list_rooms(use_cache=False))
+        self.assertEqual(self.store.calls["ListRooms"], 2)
+
+    def test_list_cache_expires(self):
+        self.service.list_ttl = 0
+        self.service.run(self.service.list_rooms())
+        self.service.run(self.service.list_rooms())
+        self.assertEqual(self.store.calls["ListRooms"], 2)
+
+    def test_changes_invalidate_list_cache(self):
+        self.service.run(self.service.create_room("room-a"))
+        self.service.run(self.service.list_rooms())
+        self.service.run(self.service.create_room("room-b"))
+        rooms = self.service.run(self.service.list_rooms())
+        self.assertEqual({room["name"] for room in rooms}, {"room-a", "room-b"})
+
+        self.service.run(self.service.delete_room("room-a"))
+        rooms = self.service.run(self.service.list_rooms())
+        self.assertEqual({room["name"] for room in rooms}, {"room-b"})
+
+    def test_delete_rooms(self):
+        self.service.run(self.service.create_rooms(["room-a", "room-b", "room-c"]))
+        deleted = self.service.run(self.service.delete_rooms(["room-a", "room-b"]))
+        self.assertEqual(deleted, {"room-a": True, "room-b": True})
+        self.assertEqual(self.room_names(), {"room-c"})
+
+    def test_reconcile_reaps_ended_rooms_only(self):
+        self.service.run(self.service.create_room("alive"))
+        old = (datetime.now() - timedelta(minutes=5)).isoformat()
+        active_rooms = {
+            "alive": {"room_name": "alive", "created_at": old},
+            "gone": {"room_name": "ended", "created_at": old},
+            "fresh": {"room_name": "not-joined-yet", "created_at": datetime.now().isoformat()}
+        }
+        forgotten = []
+
+        reaped = self.service.run(self.service.reconcile(
+            active_rooms,
+            grace_seconds=60,
+            on_reap=lambda session_id, info: forgotten.append(session_id)
+        ))
+        self.assertEqual(reaped, ["gone"])
+        self.assertEqual(forgotten, ["gone"])
+        self.assertEqual(set(active_rooms), {"alive", "fresh"})
+
+    def test_reconcile_ignores_list_cache(self):
+        self.service.run(self.service.create_room("room-a"))
+        self.service.run(self.service.list_rooms())
+        self.store.rooms.clear()  # Ended on the server after the cached listing
+
+        old = (datetime.now() - timedelta(minutes=5)).isoformat()
+        active_rooms = {"s1": {"room_name": "room-a", "created_at": old}}
+        self.assertEqual(self.service.run(self.service.reconcile(active_rooms)), ["s1"])
+
+class RoomEndpointsTest(FakeServerTestCase):
+    def setUp(self):
+        super().setUp()
+        import app as appmod
+
+        self.app = appmod
+        self.addCleanup(setattr, Config, "ADMIN_TOKEN", Config.ADMIN_TOKEN)
+        Config.ADMIN_TOKEN = ADMIN_TOKEN
+        appmod.registry.register("livekit", lambda: self.service)
+        self.addCleanup(appmod.registry.register, "livekit", "services.livekit_service:LiveKitService")
+        self.client = appmod.app.test_client()
+
+    def post(self, path, body, token=ADMIN_TOKEN):
+        return self.client.post(path, json=body, headers={"X-Admin-Token": token})
+
+    def test_require_admin_token(self):
+        self.service.run(self.service.create_room("room-a"))
+        self.assertEqual(self.client.get("/rooms").status_code, 403)
+        self.assertEqual(self.client.get("/rooms", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+        self.assertEqual(self.post("/rooms/bulk-create", {"room_names": ["x"]}, token="").status_code, 403)
+        self.assertEqual(self.post("/rooms/bulk-delete", {"room_names": ["room-a"]}, token="").status_code, 403)
+        self.assertEqual(self.room_names(), {"room-a"})
+
+    def test_disabled_without_admin_token_configured(self):
+        Config.ADMIN_TOKEN = None
+        self.assertEqual(self.client.get("/rooms", headers={"X-Admin-Token": ""}).status_code, 403)
+
+    def test_reject_invalid_room_names(self):
+        for body in ({}, {"room_names": []}, {"room_names": "room-a"}, {"room_names": {"room-a": 1}},
+                     {"room_names": ["room-a", ""]}, {"room_names": ["room-a", 7]}, ["room-a"]):
+            for path in ("/rooms/bulk-create", "/rooms/bulk-delete"):
+                with self.subTest(path=path, body=body):
+                    self.assertEqual(self.post(path, body).status_code, 400)
+        self.assertEqual(self.room_names(), set())
+        self.assertNotIn("CreateRoom", self.store.calls)
+
+    def test_create_list_delete(self):
+        response = self.post("/rooms/bulk-create", {"room_names": ["room-a", "room-b"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({room["name"] for room in response.get_json()["rooms"]}, {"room-a", "room-b"})
+
+        response = self.client.get("/rooms", headers={"X-Admin-Token": ADMIN_TOKEN})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({room["name"] for room in response.get_json()["rooms"]}, {"room-a", "room-b"})
+
+        self.app.active_rooms["s1"] = {"room_name": "room-a", "created_at": datetime.now().isoformat()}
+        self.addCleanup(self.app.active_rooms.pop, "s1", None)
+        response = self.post("/rooms/bulk-delete", {"room_names": ["room-a"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["deleted"], {"room-a": True})
+        self.assertEqual(self.room_names(), {"room-b"})
+        self.assertNotIn("s1", self.app.active_rooms)
+
+    def test_hedra_room_carries_usage_key(self):
+        import json
+        import hedra_agent
+
+        for name in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+            self.addCleanup(setattr, Config, name, getattr(Config, name))
+        Config.LIVEKIT_URL, Config.LIVEKIT_API_KEY, Config.LIVEKIT_API_SECRET = "ws://fake", API_KEY, API_SECRET
+
+        response = self.client.post("/create-hedra-room", json={"session_id": "s1"}, headers={"X-Tenant-ID": "acme"})
+        self.addCleanup(self.app.active_rooms.pop, "s1", None)
+        self.assertEqual(response.status_code, 200)
+        room = self.store.rooms["hedra-room-s1"]
+        self.assertEqual(json.loads(room.metadata), {"session_id": "s1", "tenant": "acme"})
+        self.assertEqual(hedra_agent.usage_key(room), ("s1", "acme"))
+
+        # A room created on join has no metadata
+        room.metadata = ""
+        self.assertEqual(hedra_agent.usage_key(room), ("s1", "default"))
+
+if __name__ == "__main__":
+    unittest.main()
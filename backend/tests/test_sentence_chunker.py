@@ -0,0 +1,90 @@
+"""SentenceChunker: where streamed LLM text is cut into TTS pieces
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.event_stream import SentenceChunker, sse_event
+
+def chunk(tokens, **kwargs):
+    """Every piece the chunker releases for a token stream, flush included"""
+    chunker = SentenceChunker(**kwargs)
+    pieces = []
+    for token in tokens:
+        pieces.extend(chunker.push(token))
+    rest = chunker.flush()
+    if rest:
+        pieces.append(rest)
+    return pieces
+
+def words(text):
+    """Stream text a word at a time, like LLM deltas"""
+    return [word + " " for word in text.split(" ")]
+
+class SentenceChunkerTest(unittest.TestCase):
+    def test_first_piece_goes_out_early(self):
+        chunker = SentenceChunker(min_first_chars=12, min_chars=60)
+        self.assertEqual(chunker.push("Sure thing"), [])
+        self.assertEqual(chunker.push(", happy to help. The"), ["Sure thing, happy to help."])
+
+    def test_later_sentences_are_grouped(self):
+        text = "Hello there, friend. It is sunny. It is warm. It is a good day for a long walk by the river."
+        self.assertEqual(chunk(words(text), min_first_chars=12, min_chars=40), [
+            "Hello there, friend.",
+            "It is sunny. It is warm. It is a good day for a long walk by the river."
+        ])
+
+    def test_short_first_sentence_waits(self):
+        self.assertEqual(chunk(words("Ok. Let me check that for you. Done."), min_first_chars=12, min_chars=200),
+                         ["Ok. Let me check that for you.", "Done."])
+
+    def test_decimals_are_not_sentence_ends(self):
+        tokens = ["The total is 3", ".", "5 dollars and ", "0.25 in tax", ". Anything else? "]
+        self.assertEqual(chunk(tokens, min_first_chars=5, min_chars=5),
+                         ["The total is 3.5 dollars and 0.25 in tax.", "Anything else?"])
+
+    def test_abbreviations_and_initials_are_not_sentence_ends(self):
+        text = "Ask Dr. Smith or Mrs. Jones, e.g. at noon. J. R. R. Tolkien wrote it vs. the film. Done."
+        self.assertEqual(chunk(words(text), min_first_chars=5, min_chars=5), [
+            "Ask Dr. Smith or Mrs. Jones, e.g. at noon.",
+            "J. R. R. Tolkien wrote it vs. the film.",
+            "Done."
+        ])
+
+    def test_other_punctuation_after_abbreviation_still_ends(self):
+        self.assertEqual(chunk(words("Is that Dr? Yes it is."), min_first_chars=3, min_chars=3),
+                         ["Is that Dr?", "Yes it is."])
+
+    def test_closing_quotes_stay_with_their_sentence(self):
+        self.assertEqual(chunk(words('He said "hold on a second." Then he left.'), min_first_chars=5, min_chars=5),
+                         ['He said "hold on a second."', "Then he left."])
+
+    def test_flush_returns_the_unfinished_tail(self):
+        chunker = SentenceChunker(min_first_chars=5, min_chars=5)
+        self.assertEqual(chunker.push("First one done. And then the stream just st"), ["First one done."])
+        self.assertEqual(chunker.flush(), "And then the stream just st")
+        # Flushed text isn't released twice
+        self.assertIsNone(chunker.flush())
+        self.assertEqual(chunker.push("Next. "), ["Next."])
+
+    def test_flush_without_a_sentence_end(self):
+        self.assertEqual(chunk(["no punctuation ", "at all"]), ["no punctuation at all"])
+        self.assertEqual(chunk(["   "]), [])
+        self.assertIsNone(SentenceChunker().flush())
+
+    def test_no_text_is_lost(self):
+        text = "Well. Dr. Who lives at 221 B. Baker St. in London! Really? Yes… it is 2.5 km away. ok"
+        self.assertEqual(" ".join(chunk(words(text), min_first_chars=8, min_chars=20)), text)
+
+class SseEventTest(unittest.TestCase):
+    def test_single_line_json(self):
+        self.assertEqual(sse_event("token", {"text": "héllo\nworld"}),
+                         'event: token\ndata: {"text":"héllo\\nworld"}\n\n')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""SLOController ladder: step-down order, hysteresis and recovery
+
+Latencies are injected with observe() against a fake clock and a
+throwaway database, and each sync() stands in for a background sync.
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.slo_controller import SLOController
+
+TARGETS_MS = {"stt": 1000, "llm": 1000, "tts": 1000, "avatar": 1000}
+SLOW = 2.0
+FAST = 0.1
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class SLOControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.slo = self.controller()
+
+    def tearDown(self):
+        self.slo.stop()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def controller(self):
+        return SLOController(
+            targets_ms=TARGETS_MS,
+            ladder=["short_replies", "fast_model", "cached_audio", "audio_only"],
+            window_seconds=60, hold_seconds=10, recover_seconds=30, min_samples=3,
+            enabled=True, db_path=os.path.join(self.dir, "slo.db"), sync_interval=3600,
+            clock=self.clock
+        )
+
+    def feed(self, at, stage, seconds, count=3, slo=None):
+        """Observe count samples at time at, then sync"""
+        slo = slo or self.slo
+        self.clock.now = 1000.0 + at
+        for _ in range(count):
+            slo.observe(stage, seconds)
+        slo.sync(evaluate=True)
+        return slo.active_steps()
+
+    def test_steps_down_in_ladder_order_for_the_breached_stage(self):
+        self.assertEqual(self.feed(0, "llm", SLOW), ["short_replies"])
+        self.assertEqual(self.feed(10, "llm", SLOW), ["short_replies", "fast_model"])
+        # Nothing left on the ladder relieves the LLM
+        self.assertEqual(self.feed(20, "llm", SLOW), ["short_replies", "fast_model"])
+        # TTS skips the steps already on and the LLM-only one
+        self.assertEqual(self.feed(30, "tts", SLOW), ["short_replies", "fast_model", "cached_audio"])
+        self.assertEqual(self.feed(40, "avatar", SLOW), ["short_replies", "fast_model", "cached_audio", "audio_only"])
+
+    def test_one_step_per_hold(self):
+        self.assertEqual(self.feed(0, "llm", SLOW), ["short_replies"])
+        self.assertEqual(self.feed(5, "llm", SLOW), ["short_replies"])
+        self.assertEqual(self.feed(9.9, "llm", SLOW), ["short_replies"])
+        self.assertEqual(self.feed(10, "llm", SLOW), ["short_replies", "fast_model"])
+
+    def test_change_drops_samples_of_the_relieved_stages(self):
+        self.feed(0, "llm", SLOW)
+        # Two new samples are too few to count, so the old slow ones must be gone
+        self.assertEqual(self.feed(10, "llm", SLOW, count=2), ["short_replies"])
+
+    def test_recovers_most_recent_step_first(self):
+        self.feed(0, "llm", SLOW)
+        self.feed(10, "llm", SLOW)
+        self.assertEqual(self.feed(20, "llm", FAST), ["short_replies", "fast_model"])
+        self.assertEqual(self.feed(49, "llm", FAST), ["short_replies", "fast_model"])
+        self.assertEqual(self.feed(50, "llm", FAST), ["short_replies"])
+        # The recover clock restarts after each step back up
+        self.assertEqual(self.feed(55, "llm", FAST), ["short_replies"])
+        self.assertEqual(self.feed(79, "llm", FAST), ["short_replies"])
+        self.assertEqual(self.feed(80, "llm", FAST), [])
+        changes = [(c["direction"], c["step"]) for c in self.slo.snapshot()["changes"]]
+        self.assertEqual(changes, [("down", "short_replies"), ("down", "fast_model"),
+                                   ("up", "fast_model"), ("up", "short_replies")])
+
+    def test_breach_resets_recovery(self):
+        self.feed(0, "llm", SLOW)
+        self.feed(10, "llm", FAST)
+        self.feed(30, "llm", SLOW, count=30)
+        self.assertEqual(self.feed(41, "llm", FAST), ["short_replies", "fast_model"])
+
+    def test_borderline_latency_does_not_recover(self):
+        self.feed(0, "llm", SLOW)
+        # Under target but over 70% of it: no further step, no recovery either
+        self.assertEqual(self.feed(10, "llm", 0.8), ["short_replies"])
+        self.assertEqual(self.feed(60, "llm", 0.8), ["short_replies"])
+
+    def test_processes_share_one_ladder(self):
+        other = self.controller()
+        try:
+            self.feed(0, "llm", SLOW, count=2)
+            # Neither process has enough samples alone; together they breach
+            self.assertEqual(self.feed(0, "llm", SLOW, count=1, slo=other), ["short_replies"])
+            self.slo.sync()
+            self.assertEqual(self.slo.active_steps(), ["short_replies"])
+        finally:
+            other.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""SpeechRateModel fits shared across processes through SQLite
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.speech_rate import SpeechRateModel, VoiceFit
+
+CLIPS = [(30, 2.2), (60, 4.1), (90, 6.3), (45, 3.0), (120, 8.1), (75, 5.2)]
+
+class SpeechRateTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def model(self):
+        model = SpeechRateModel(db_path=os.path.join(self.dir, "rates.db"), sync_interval=3600)
+        self.addCleanup(model.stop)
+        return model
+
+    def test_processes_merge_instead_of_overwriting(self):
+        first, second = self.model(), self.model()
+        for chars, seconds in CLIPS[:3]:
+            first.observe("voice", chars, seconds)
+        first.sync()
+        for chars, seconds in CLIPS[3:]:
+            second.observe("voice", chars, seconds)
+        second.sync()
+        first.sync()
+
+        # Same as one process seeing the first clips, then the second's
+        expected = VoiceFit()
+        for chars, seconds in CLIPS:
+            expected.add(chars, seconds, 0.99)
+        for model in (first, second):
+            self.assertEqual(model.rate("voice")["samples"], len(CLIPS))
+            self.assertAlmostEqual(model.estimate("x" * 100, "voice"),
+                                   expected.coefficients()[0] + 100 * expected.coefficients()[1])
+
+    def test_new_process_starts_warm(self):
+        first = self.model()
+        for chars, seconds in CLIPS:
+            first.observe("voice", chars, seconds)
+        first.sync()
+
+        later = self.model()
+        later.sync()
+        self.assertTrue(later.rate("voice")["fitted"])
+
+    def test_clips_during_a_sync_are_kept(self):
+        model = self.model()
+        model.observe("voice", 30, 2.0)
+        model.sync()
+        model.observe("voice", 60, 4.0)
+        self.assertEqual(model.rate("voice")["samples"], 2)
+        model.sync()
+        self.assertEqual(model.rate("voice")["samples"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""TurnManager sequencing, and /process-voice always releasing its turn
+
+    cd backend
+    python -m unittest discover tests
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.turn_manager import TurnManager
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TurnManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.turns = TurnManager(follower_timeout=1, idle_ttl=100, sweep_interval=10, clock=self.clock)
+
+    def test_new_upload_supersedes_inflight_turn(self):
+        first, _ = self.turns.begin("s1", "a")
+        second, is_leader = self.turns.begin("s1", "b")
+        self.assertTrue(is_leader)
+        self.assertTrue(first.cancelled)
+        self.assertFalse(second.cancelled)
+        self.assertEqual((first.seq, second.seq), (1, 2))
+        # Other sessions are left alone
+        other, _ = self.turns.begin("s2", "c")
+        self.assertFalse(second.cancelled)
+        self.assertFalse(other.cancelled)
+
+    def test_identical_upload_coalesces_onto_leader(self):
+        leader, _ = self.turns.begin("s1", "a")
+        follower, is_leader = self.turns.begin("s1", "a")
+        self.assertIs(follower, leader)
+        self.assertFalse(is_leader)
+        self.assertFalse(leader.cancelled)
+
+        threading.Timer(0.05, self.turns.finish, args=(leader, {"response": "hi"}, 200)).start()
+        self.assertEqual(self.turns.wait(follower), ({"response": "hi"}, 200))
+
+    def test_follower_times_out(self):
+        leader, _ = self.turns.begin("s1", "a")
+        follower, _ = self.turns.begin("s1", "a")
+        self.assertEqual(self.turns.wait(follower), (None, 504))
+
+    def test_finished_turn_is_not_coalesced(self):
+        first, _ = self.turns.begin("s1", "a")
+        self.turns.finish(first, {}, 200)
+        second, is_leader = self.turns.begin("s1", "a")
+        self.assertTrue(is_leader)
+        self.assertIsNot(second, first)
+
+    def test_commit_keeps_history_in_order(self):
+        history = []
+        first, _ = self.turns.begin("s1", "a")
+        second, _ = self.turns.begin("s1", "b")
+        # The superseded turn can't write, even after the newer one
+        self.assertTrue(self.turns.commit(second, lambda: history.append(2)))
+        self.assertFalse(self.turns.commit(first, lambda: history.append(1)))
+        self.assertFalse(self.turns.commit(second, lambda: history.append(2)))
+        self.turns.finish(second, {}, 200)
+
+        third, _ = self.turns.begin("s1", "c")
+        self.assertTrue(self.turns.commit(third, lambda: history.append(3)))
+        self.assertEqual(history, [2, 3])
+        self.assertTrue(third.committed)
+        self.assertFalse(first.committed)
+
+    def test_cancel_inflight(self):
+        self.assertIsNone(self.turns.cancel_inflight("s1"))
+        turn, _ = self.turns.begin("s1", "a")
+        self.assertIs(self.turns.cancel_inflight("s1"), turn)
+        self.assertTrue(turn.cancelled)
+        self.assertIsNone(self.turns.cancel_inflight("s1"))
+
+    def test_idle_sessions_are_evicted(self):
+        idle, _ = self.turns.begin("idle", "a")
+        self.turns.finish(idle, {}, 200)
+        busy, _ = self.turns.begin("busy", "b")
+
+        self.clock.now = 101
+        self.turns.begin("other", "c")
+        self.assertEqual(set(self.turns._sessions), {"busy", "other"})
+        # A session that comes back starts from scratch
+        turn, _ = self.turns.begin("idle", "a")
+        self.assertEqual(turn.seq, 1)
+        self.assertFalse(busy.cancelled)
+
+    def test_sweep_is_rate_limited(self):
+        idle, _ = self.turns.begin("idle", "a")
+        self.turns.finish(idle, {}, 200)
+        self.clock.now = 95
+        self.turns.begin("other", "b")  # Sweeps; idle for 95s only
+        self.clock.now = 101
+        self.turns.begin("other", "c")  # Too soon after the last sweep
+        self.assertIn("idle", self.turns._sessions)
+        self.clock.now = 105
+        self.turns.begin("other", "d")
+        self.assertNotIn("idle", self.turns._sessions)
+
+class ProcessVoiceTurnTest(unittest.TestCase):
+    """A failure between starting the turn and running it still releases the turn"""
+
+    def setUp(self):
+        import app as appmod
+        from services.usage_meter import UsageMeter
+
+        self.app = appmod
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        meter = UsageMeter(db_path=os.path.join(self.dir, "usage.db"))
+        appmod.registry.register("usage", lambda: meter)
+        self.addCleanup(appmod.registry.register, "usage", appmod.start_usage_meter)
+        self.addCleanup(setattr, appmod.slo, "enabled", appmod.slo.enabled)
+        appmod.slo.enabled = False
+        self.client = appmod.app.test_client()
+
+    def post(self, audio=b"RIFF-turn"):
+        return self.client.post("/process-voice", data={"audio": (io.BytesIO(audio), "turn.wav"), "session_id": "pv-1"})
+
+    def test_setup_failure_finishes_turn(self):
+        self.addCleanup(setattr, self.app.turn_manager, "follower_timeout", self.app.turn_manager.follower_timeout)
+        self.app.turn_manager.follower_timeout = 1
+        with mock.patch.object(self.app.slow_requests, "begin", side_effect=RuntimeError("trace failed")):
+            self.assertEqual(self.post().status_code, 500)
+            # Left in flight, the turn would take this duplicate as a follower (504 after the timeout)
+            self.assertEqual(self.post().status_code, 500)
+        self.assertIsNone(self.app.turn_manager.cancel_inflight("pv-1"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""TurnRecorder blob storage: dedup across recorders and sweeping untracked files
+
+    cd backend
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import turn_recorder
+from services.turn_recorder import TurnRecorder
+
+CLIP = b"ID3" + bytes(2048)
+
+class TurnRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def recorder(self):
+        recorder = TurnRecorder(directory=self.dir, max_bytes=0, max_age_seconds=0)
+        recorder.start()
+        self.addCleanup(recorder.stop)
+        return recorder
+
+    def record(self, recorder, session_id, *clips):
+        self.assertTrue(recorder.record({"session_id": session_id}, input_audio=clips[0], output_audio=clips[1:]))
+        recorder.flush()
+
+    def test_recorders_sharing_a_store_dedup(self):
+        first, second = self.recorder(), self.recorder()
+        self.record(first, "s1", CLIP, CLIP)
+        self.record(second, "s2", CLIP, b"other clip")
+        stats = first.stats()
+        self.assertEqual((stats["turns"], stats["blobs"]), (2, 2))
+        for turn_id, _, _ in first.find():
+            for ref in [first.read_turn(turn_id)["input"]] + first.read_turn(turn_id)["output"]:
+                self.assertEqual(len(first.read_blob(ref["sha256"])), ref["bytes"])
+
+    def test_missing_blob_file_is_written_again(self):
+        recorder = self.recorder()
+        self.record(recorder, "s1", CLIP)
+        digest = recorder.read_turn(recorder.find()[0][0])["input"]["sha256"]
+        os.remove(recorder._blob_path(digest))
+        self.record(recorder, "s1", CLIP)
+        self.assertEqual(recorder.read_blob(digest), CLIP)
+
+    def test_sweep_removes_old_untracked_files_only(self):
+        recorder = self.recorder()
+        self.record(recorder, "s1", CLIP)
+        digest = recorder.read_turn(recorder.find()[0][0])["input"]["sha256"]
+        prefix = os.path.join(recorder.blob_dir, "ab")
+        os.makedirs(prefix, exist_ok=True)
+        orphan, partial, fresh = (os.path.join(prefix, name) for name in ("ab" + "0" * 62, "ab" + "1" * 62 + ".tmp",
+                                                                         "ab" + "2" * 62))
+        tracked = recorder._blob_path(digest)
+        for path in (orphan, partial, fresh):
+            with open(path, "wb") as f:
+                f.write(b"leftover")
+        old = time.time() - turn_recorder.SWEEP_MIN_AGE - 60
+        for path in (orphan, partial, tracked):
+            os.utime(path, (old, old))
+
+        with recorder._connect() as db:
+            recorder._sweep_untracked(db)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(partial))
+        # Too new to be a leftover: a write may still be in progress
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.exists(tracked))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+"""Local stand-in for the LiveKit RoomService API
+
+Implements the Twirp endpoints LiveKitService uses (CreateRoom, ListRooms,
+DeleteRoom) in memory, speaking protobuf like the real server (JSON is
+accepted too, for curl). Point the backend at it with:
+
+    python tools/fake_livekit_server.py --port 7880
+    LIVEKIT_URL=http://127.0.0.1:7880 LIVEKIT_API_KEY=devkey LIVEKIT_API_SECRET=secret python app.py
+
+`--smoke` starts the server on a free port, drives LiveKitService against it
+(create, bulk create, list, delete, reconcile) and exits non-zero on failure.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.protobuf import json_format
+from livekit.protocol import models as proto_models
+from livekit.protocol import room as proto_room
+
+PREFIX = "/twirp/livekit.RoomService/"
+
+class FakeRoomStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rooms = {}
+        self.calls = {}
+
+    def create(self, request):
+        with self.lock:
+            room = self.rooms.get(request.name)
+            if room is None:
+                room = proto_models.Room(
+                    sid=f"RM_{len(self.rooms) + 1:06d}",
+                    name=request.name,
+                    empty_timeout=request.empty_timeout,
+                    max_participants=request.max_participants,
+                    metadata=request.metadata,
+                    creation_time=int(time.time())
+                )
+                self.rooms[request.name] = room
+            return room
+
+    def list(self, request):
+        with self.lock:
+            names = set(request.names)
+            rooms = [room for name, room in self.rooms.items() if not names or name in names]
+            return proto_room.ListRoomsResponse(rooms=rooms)
+
+    def delete(self, request):
+        with self.lock:
+            self.rooms.pop(request.room, None)
+            return proto_room.DeleteRoomResponse()
+
+def make_handler(store):
+    methods = {
+        "CreateRoom": (proto_room.CreateRoomRequest, store.create),
+        "ListRooms": (proto_room.ListRoomsRequest, store.list),
+        "DeleteRoom": (proto_room.DeleteRoomRequest, store.delete)
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling is exercised
+
+        def do_POST(self):
+            method = self.path[len(PREFIX):] if self.path.startswith(PREFIX) else None
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            if method not in methods:
+                return self._reply(404, b'{"code":"bad_route"}', "application/json")
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._reply(401, b'{"code":"unauthenticated"}', "application/json")
+
+            with store.lock:
+                store.calls[method] = store.calls.get(method, 0) + 1
+
+            request_type, handle = methods[method]
+            is_json = self.headers.get("Content-Type", "").startswith("application/json")
+            request = request_type()
+            if is_json:
+                json_format.Parse(body or b"{}", request)
+            else:
+                request.ParseFromString(body)
+
+            response = handle(request)
+            if is_json:
+                self._reply(200, json_format.MessageToJson(response).encode(), "application/json")
+            else:
+                self._reply(200, response.SerializeToString(), "application/protobuf")
+
+        def _reply(self, status, payload, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(port, store=None):
+    store = store or FakeRoomStore()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store))
+    thread = threading.Thread(target=server.serve_forever, name="fake-livekit", daemon=True)
+    thread.start()
+    return server, store
+
+def smoke():
+    """Exercise LiveKitService end to end against the fake server"""
+    from datetime import datetime, timedelta
+    from services.livekit_service import LiveKitService
+
+    server, store = serve(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    service = LiveKitService(url=url, api_key="devkey", api_secret="secret-" + "x" * 32)
+    try:
+        room = service.run(service.create_room("smoke-room"))
+        assert room["name"] == "smoke-room", room
+
+        created = service.run(service.create_rooms([f"bulk-{i}" for i in range(5)]))
+        assert all("error" not in r for r in created), created
+
+        names = {r["name"] for r in service.run(service.list_rooms())}
+        assert names == {"smoke-room"} | {f"bulk-{i}" for i in range(5)}, names
+
+        service.run(service.list_rooms())
+        assert store.calls["ListRooms"] == 1, "second listing should come from the TTL cache"
+
+        deleted = service.run(service.delete_rooms(["bulk-0", "bulk-1"]))
+        assert all(deleted.values()), deleted
+
+        old = (datetime.now() - timedelta(minutes=5)).isoformat()
+        active_rooms = {
+            "alive": {"room_name": "smoke-room", "created_at": old},
+            "gone": {"room_name": "bulk-0", "created_at": old},
+            "fresh": {"room_name": "not-joined-yet", "created_at": datetime.now().isoformat()}
+        }
+        reaped = service.run(service.reconcile(active_rooms))
+        assert reaped == ["gone"], reaped
+        assert set(active_rooms) == {"alive", "fresh"}, active_rooms
+
+        print(f"✅ Smoke test passed ({store.calls})")
+        return 0
+    finally:
+        service.run(service.close())
+        service.runner.stop()
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=7880)
+    parser.add_argument("--smoke", action="store_true", help="run the LiveKitService smoke test and exit")
+    args = parser.parse_args()
+
+    if args.smoke:
+        sys.exit(smoke())
+
+    server, _ = serve(args.port)
+    print(f"🧪 Fake LiveKit RoomService listening on http://127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
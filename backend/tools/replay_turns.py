@@ -0,0 +1,128 @@
+"""Replay turns kept by the turn recorder (services/turn_recorder.py) through /process-voice
+
+Each recorded upload is posted again to a running server, in the order it
+was recorded, under a fresh session per original session so conversation
+history builds up the same way. Requests carry X-Replay-Of so the replayed
+turns can be told apart in the recorder. Prints the recorded and replayed
+latency side by side with whether the transcript and reply changed.
+
+    cd backend
+    python tools/replay_turns.py --list
+    python tools/replay_turns.py --session abc123
+    python tools/replay_turns.py --since 2h --limit 20 --url http://localhost:5001
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.turn_recorder import TurnRecorder
+
+def parse_since(value):
+    """'90m', '2h', '3d' ago, or an ISO timestamp, as a Unix time"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def list_turns(recorder, rows):
+    print(f"{'recorded':<19} {'turn':<16} {'session':<20} {'status':>6} {'ms':>7} {'in KB':>6} {'clips':>5}  transcript")
+    for turn_id, session_id, recorded_at in rows:
+        turn = recorder.read_turn(turn_id)
+        if turn is None:
+            continue
+        print(
+            f"{datetime.fromtimestamp(recorded_at):%Y-%m-%d %H:%M:%S} {turn_id:<16} {session_id[:20]:<20} "
+            f"{turn['status']:>6} {turn['timeline_ms'].get('finished', 0):>7.0f} "
+            f"{(turn['input'] or {}).get('bytes', 0) / 1024:>6.1f} {len(turn['output']):>5}  "
+            f"{(turn.get('transcript') or '')[:50]}"
+        )
+
+    stats = recorder.stats()
+    stored = stats["blob_bytes"] + stats["log_bytes"]
+    saved = stats["referenced_bytes"] - stats["blob_bytes"]
+    print(f"\n📼 {stats['turns']} turns, {stats['blobs']} distinct clips, {stored / 1024 / 1024:.1f} MB on disk "
+          f"({saved / 1024 / 1024:.1f} MB saved by dedup)")
+
+def replay(recorder, rows, args):
+    run = uuid.uuid4().hex[:6]
+    recorded_ms, replayed_ms = [], []
+    print(f"{'turn':<16} {'status':>6} {'recorded ms':>12} {'replay ms':>10} {'transcript':>10} {'reply sim':>9}")
+
+    for turn_id, session_id, _ in rows:
+        turn = recorder.read_turn(turn_id)
+        if turn is None or not turn["input"]:
+            continue
+        audio = recorder.read_blob(turn["input"]["sha256"])
+
+        started = time.perf_counter()
+        response = requests.post(
+            f"{args.url}/process-voice",
+            files={"audio": (turn.get("filename") or "recording.wav", audio)},
+            data={"session_id": f"replay-{run}-{session_id}", "audio_format": turn["audio_format"]},
+            headers={"X-Replay-Of": turn_id, "X-Tenant-ID": args.tenant},
+            timeout=120
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result = response.json() if response.headers.get("Content-Type", "").startswith("application/json") else {}
+
+        same_transcript = (result.get("transcript") or "").strip() == (turn.get("transcript") or "").strip()
+        similarity = difflib.SequenceMatcher(None, result.get("response") or "", turn.get("response") or "").ratio()
+        original_ms = turn["timeline_ms"].get("finished", 0)
+        if response.ok:
+            recorded_ms.append(original_ms)
+            replayed_ms.append(elapsed_ms)
+        print(
+            f"{turn_id:<16} {response.status_code:>6} {original_ms:>12.0f} {elapsed_ms:>10.0f} "
+            f"{'same' if same_transcript else 'changed':>10} {similarity:>9.0%}"
+        )
+
+    if replayed_ms:
+        print(f"\n⏱️ p50 {percentile(recorded_ms, 50):.0f} -> {percentile(replayed_ms, 50):.0f} ms, "
+              f"p95 {percentile(recorded_ms, 95):.0f} -> {percentile(replayed_ms, 95):.0f} ms "
+              f"over {len(replayed_ms)} turns")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=Config.TURN_RECORDER_DIR, help="recorder directory")
+    parser.add_argument("--list", action="store_true", help="list recorded turns instead of replaying")
+    parser.add_argument("--session", help="only this session's turns")
+    parser.add_argument("--turn", action="append", dest="turns", help="only this turn id (repeatable)")
+    parser.add_argument("--since", type=parse_since, help="e.g. 30m, 2h, 1d or an ISO timestamp")
+    parser.add_argument("--limit", type=int, help="most recent N turns")
+    parser.add_argument("--include-replays", action="store_true", help="also replay turns that were replays")
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--tenant", default="replay", help="X-Tenant-ID for replayed requests (usage budgets)")
+    args = parser.parse_args()
+
+    recorder = TurnRecorder(directory=args.dir)
+    if not os.path.exists(recorder.index_path):
+        sys.exit(f"❌ No recordings in {args.dir} (set TURN_RECORDER_ENABLED=true on the server)")
+
+    rows = recorder.find(session_id=args.session, since=args.since, turn_ids=args.turns, limit=args.limit)
+    if not args.include_replays:
+        rows = [row for row in rows if not (recorder.read_turn(row[0]) or {}).get("replay_of")]
+    if not rows:
+        sys.exit("No matching turns")
+
+    if args.list:
+        list_turns(recorder, rows)
+    else:
+        replay(recorder, rows, args)
+
+if __name__ == "__main__":
+    main()
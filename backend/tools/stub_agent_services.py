@@ -0,0 +1,283 @@
+"""Deterministic local stand-ins for the agent's AI services and room audio
+
+Used by benchmarks/agent_load_benchmark.py to drive a real AgentSession
+without a LiveKit server or any network calls:
+
+- StubSTT: streaming STT that endpoints on signal energy and emits a canned
+  transcript, so turn detection works like a real STT ("stt" mode)
+- StubLLM: streams a canned reply after a fixed time-to-first-token
+- StubTTS: returns silence sized to the text after a fixed time-to-first-byte
+- ReplayAudioInput: plays a participant's recorded utterances in real time
+  on a schedule, with silence in between (the participant's mic track)
+- PlayoutAudioOutput: consumes agent audio at real-time speed and timestamps
+  the first frame of every reply (the participant's speaker)
+"""
+import asyncio
+import time
+import uuid
+import wave
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import llm, stt, tts, DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice.io import AudioInput, AudioOutput
+
+from services.speech_rate import DEFAULT_CHARS_PER_SECOND
+
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 22050
+FRAME_MS = 20
+
+def tone(seconds, sample_rate=INPUT_SAMPLE_RATE, frequency=220.0, amplitude=0.3):
+    """A synthetic 'utterance': a plain tone is enough for an energy endpointer"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (np.sin(2 * np.pi * frequency * t) * amplitude * 32767).astype(np.int16)
+
+def load_wav(path):
+    """16-bit mono PCM samples and sample rate from a WAV recording"""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono PCM")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16), wav.getframerate()
+
+def _frame(samples, sample_rate):
+    return rtc.AudioFrame(
+        data=samples.tobytes(),
+        sample_rate=sample_rate,
+        num_channels=1,
+        samples_per_channel=len(samples)
+    )
+
+class ReplayAudioInput(AudioInput):
+    """A participant's microphone: utterances at scheduled offsets, silence otherwise
+
+    schedule is a list of seconds (from start()) at which each utterance
+    begins. on_end_of_speech(turn_index, t) fires when the last voiced frame
+    has been delivered, which is when the user 'stopped talking'.
+    """
+
+    def __init__(self, utterance, sample_rate, schedule, on_end_of_speech=None):
+        super().__init__(label="ReplayAudioInput")
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * FRAME_MS // 1000
+        self.utterance = utterance
+        self.schedule = list(schedule)
+        self.on_end_of_speech = on_end_of_speech
+        self._silence = np.zeros(self.frame_samples, dtype=np.int16)
+        self._started_at = None
+        self._sent = 0
+        self._turn = 0
+        self._offset = None  # sample offset into the current utterance
+        self.closed = False
+
+    def start(self):
+        self._started_at = time.perf_counter()
+
+    def close(self):
+        self.closed = True
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        if self._started_at is None:
+            self.start()
+
+        # Real-time pacing: frame n is due at n * FRAME_MS
+        due = self._started_at + self._sent * FRAME_MS / 1000
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._sent += 1
+
+        elapsed = self._sent * FRAME_MS / 1000
+        if self._offset is None and self._turn < len(self.schedule) and elapsed >= self.schedule[self._turn]:
+            self._offset = 0
+
+        if self._offset is None:
+            return _frame(self._silence, self.sample_rate)
+
+        chunk = self.utterance[self._offset:self._offset + self.frame_samples]
+        self._offset += self.frame_samples
+        if self._offset >= len(self.utterance):
+            self._offset = None
+            if self.on_end_of_speech:
+                self.on_end_of_speech(self._turn, time.perf_counter())
+            self._turn += 1
+        if len(chunk) < self.frame_samples:
+            chunk = np.concatenate([chunk, self._silence[:self.frame_samples - len(chunk)]])
+        return _frame(chunk, self.sample_rate)
+
+class PlayoutAudioOutput(AudioOutput):
+    """A participant's speaker: plays agent audio in real time and reports the first frame of each reply"""
+
+    def __init__(self, on_first_frame=None):
+        super().__init__(label="PlayoutAudioOutput", next_in_chain=None, sample_rate=None)
+        self.on_first_frame = on_first_frame
+        self._segment_started = None
+        self._segment_seconds = 0.0
+        self._finish_task = None
+
+    async def capture_frame(self, frame):
+        await super().capture_frame(frame)
+        if self._segment_started is None:
+            self._segment_started = time.perf_counter()
+            self._segment_seconds = 0.0
+            if self.on_first_frame:
+                self.on_first_frame(self._segment_started)
+        self._segment_seconds += frame.duration
+
+        # Backpressure like a real track: don't run more than a frame ahead of playout
+        ahead = self._segment_started + self._segment_seconds - time.perf_counter()
+        if ahead > frame.duration:
+            await asyncio.sleep(ahead - frame.duration)
+
+    def flush(self):
+        super().flush()
+        if self._segment_started is None:
+            return
+        remaining = self._segment_started + self._segment_seconds - time.perf_counter()
+        self._finish_task = asyncio.create_task(self._finish(max(0.0, remaining), self._segment_seconds))
+        self._segment_started = None
+
+    async def _finish(self, delay, position):
+        await asyncio.sleep(delay)
+        self.on_playback_finished(playback_position=position, interrupted=False)
+
+    def clear_buffer(self):
+        if self._finish_task is not None and not self._finish_task.done():
+            self._finish_task.cancel()
+            self.on_playback_finished(playback_position=0.0, interrupted=True)
+        elif self._segment_started is not None:
+            played = time.perf_counter() - self._segment_started
+            self._segment_started = None
+            super().flush()
+            self.on_playback_finished(playback_position=played, interrupted=True)
+        self._finish_task = None
+
+class StubSTT(stt.STT):
+    """Streaming STT that detects end of speech from frame energy
+
+    After endpoint_seconds of silence following speech it emits a final
+    transcript and END_OF_SPEECH, which is what a real streaming STT does.
+    """
+
+    def __init__(self, transcript="What's the weather like today?", endpoint_seconds=0.3, threshold=500):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=False))
+        self.transcript = transcript
+        self.endpoint_seconds = endpoint_seconds
+        self.threshold = threshold
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language="en", text=self.transcript)]
+        )
+
+    def stream(self, *, language=None, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        return StubRecognizeStream(stt=self, conn_options=conn_options)
+
+class StubRecognizeStream(stt.RecognizeStream):
+    async def _run(self):
+        speaking = False
+        silence = 0.0
+        voiced = 0.0
+        async for frame in self._input_ch:
+            if isinstance(frame, self._FlushSentinel):
+                continue
+            samples = np.frombuffer(frame.data, dtype=np.int16)
+            energy = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if len(samples) else 0.0
+
+            if energy >= self._stt.threshold:
+                if not speaking:
+                    speaking = True
+                    voiced = 0.0
+                    self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.START_OF_SPEECH))
+                silence = 0.0
+                voiced += frame.duration
+                continue
+
+            if not speaking:
+                continue
+            silence += frame.duration
+            if silence < self._stt.endpoint_seconds:
+                continue
+
+            speaking = False
+            request_id = uuid.uuid4().hex
+            self._event_ch.send_nowait(stt.SpeechEvent(
+                type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                request_id=request_id,
+                alternatives=[stt.SpeechData(language="en", text=self._stt.transcript)]
+            ))
+            self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.END_OF_SPEECH))
+            self._event_ch.send_nowait(stt.SpeechEvent(
+                type=stt.SpeechEventType.RECOGNITION_USAGE,
+                request_id=request_id,
+                recognition_usage=stt.RecognitionUsage(audio_duration=voiced + silence)
+            ))
+
+class StubLLM(llm.LLM):
+    """Streams a canned reply after ttft seconds, then one word every inter_token seconds"""
+
+    def __init__(self, ttft=0.4, inter_token=0.02,
+                 reply="It's sunny and mild today, a good afternoon for a walk. Anything else I can help with?"):
+        super().__init__()
+        self.ttft = ttft
+        self.inter_token = inter_token
+        self.reply = reply
+
+    @property
+    def model(self):
+        return "stub"
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        return StubLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+class StubLLMStream(llm.LLMStream):
+    async def _run(self):
+        request_id = uuid.uuid4().hex
+        words = self._llm.reply.split()
+        await asyncio.sleep(self._llm.ttft)
+        for index, word in enumerate(words):
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=word if index == 0 else " " + word)
+            ))
+            await asyncio.sleep(self._llm.inter_token)
+        self._event_ch.send_nowait(llm.ChatChunk(
+            id=request_id,
+            usage=llm.CompletionUsage(
+                completion_tokens=len(words),
+                prompt_tokens=200,
+                total_tokens=200 + len(words)
+            )
+        ))
+
+class StubTTS(tts.TTS):
+    """Silence sized to the text (at the speech-rate estimate) after ttfb seconds"""
+
+    def __init__(self, ttfb=0.2, sample_rate=OUTPUT_SAMPLE_RATE):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=sample_rate,
+            num_channels=1
+        )
+        self.ttfb = ttfb
+
+    def synthesize(self, text, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        return StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+class StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter):
+        output_emitter.initialize(
+            request_id=uuid.uuid4().hex,
+            sample_rate=self._tts.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm"
+        )
+        await asyncio.sleep(self._tts.ttfb)
+        samples = int(len(self.input_text) / DEFAULT_CHARS_PER_SECOND * self._tts.sample_rate)
+        # Low-level noise rather than digital silence so it isn't trimmed anywhere
+        output_emitter.push((np.random.default_rng(0).integers(-64, 64, samples, dtype=np.int16)).tobytes())
+        output_emitter.flush()
+
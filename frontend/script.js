@@ -8,10 +8,18 @@ class VoiceAvatarApp {
         this.avatarConnected = false;
         this.liveKitReady = false;
         this.liveKitInitialized = false; // Track if LiveKit has been initialized
+        this.currentAudio = null; // Response audio currently playing
+        this.playback = null; // Queued response audio chunks and how much has been heard
+        this.pendingRequest = null; // AbortController for the in-flight /process-voice
+        this.fillerClips = []; // Pre-synthesized "let me think" clips
+        this.fillerThresholdMs = null;
+        this.fillerAudio = null;
+        this.fillerTimer = null;
        
         this.initializeElements();
         this.setupEventListeners();
         this.checkMicrophonePermission();
+        this.loadFillerClips();
         
         // Initialize LiveKit immediately, don't wait for user gesture
         if (window.LiveKitReady && typeof LiveKit !== 'undefined') {
@@ -56,6 +64,9 @@ class VoiceAvatarApp {
     }
     
     async handleMicrophonePress() {
+        // Barge-in: talking over the assistant stops it straight away
+        this.interruptResponse();
+        
         // Only initialize LiveKit once, not on every microphone press
         if (!this.liveKitInitialized && !this.liveKitReady) {
             await this.initializeLiveKitOnUserGesture();
@@ -400,16 +411,42 @@ class VoiceAvatarApp {
             const formData = new FormData();
             formData.append('audio', audioBlob, 'recording.wav');
             formData.append('session_id', this.sessionId);
+            formData.append('audio_format', this.chooseAudioFormat());
+            if (navigator.connection && navigator.connection.effectiveType) {
+                formData.append('effective_type', navigator.connection.effectiveType);
+            }
             
+            this.pendingRequest = new AbortController();
+            this.scheduleFiller();
             const response = await fetch('http://localhost:5001/process-voice', {
                 method: 'POST',
-                body: formData
+                headers: { 'Accept': 'text/event-stream' },
+                body: formData,
+                signal: this.pendingRequest.signal
             });
             
+            // Streamed replies keep the request open (and interruptible) until done
+            const streamed = (response.headers.get('Content-Type') || '').includes('text/event-stream');
+            if (!streamed) {
+                this.pendingRequest = null;
+                await this.stopFiller();
+            }
+            
+            if (response.status === 409) {
+                // A newer recording for this session replaced this one
+                console.log('⏹️ Request superseded by a newer recording');
+                return;
+            }
+            
             if (!response.ok) {
                 throw new Error(`Server error: ${response.status}`);
             }
             
+            if (streamed) {
+                await this.readResponseStream(response);
+                return;
+            }
+            
             const data = await response.json();
             
             console.log('📥 Response received:', data);
@@ -420,66 +457,308 @@ class VoiceAvatarApp {
             
             // If avatar is connected, the agent will automatically speak
             // Otherwise, use audio fallback
+            const chunks = data.audio_chunks || (data.audio ? [data.audio] : []);
             if (this.avatarConnected) {
-                this.updateStatus('🎬 Avatar speaking...');
-                this.setSpeaking(true);
-                
-                // Estimate speaking duration and reset indicator
-                const estimatedDuration = Math.max(data.response.split(' ').length * 0.6, 2); // minimum 2 seconds
-                setTimeout(() => {
-                    this.setSpeaking(false);
-                    this.updateStatus('✅ Ready to listen');
-                }, estimatedDuration * 1000);
-            } else if (data.audio) {
-                await this.playAudioResponse(data.audio);
+                this.showAvatarSpeaking(data.response, data.speech_seconds);
+            } else if (chunks.length > 0) {
+                const mimeType = data.audio_format ? data.audio_format.mime_type : 'audio/mpeg';
+                const seconds = data.audio_seconds || [];
+                this.startPlayback();
+                chunks.forEach((chunk, i) => this.queueAudio(chunk, mimeType, chunks.length === 1 ? data.response : '', seconds[i]));
+                this.playback.finished = true;
             } else {
                 this.updateStatus('✅ Ready to listen');
             }
             
         } catch (error) {
+            this.stopFiller();
+            if (error.name === 'AbortError') {
+                console.log('✋ Request abandoned after interrupt');
+                return;
+            }
             console.error('❌ Error processing recording:', error);
             this.addMessage('Sorry, I had trouble processing that. Please try again.', 'bot');
             this.updateStatus('❌ Error - Try again');
         }
     }
     
-    async playAudioResponse(audioBase64) {
+    chooseAudioFormat() {
+        // Smallest MP3 on slow or metered links, Opus where the browser can play it
+        const connection = navigator.connection || {};
+        if (connection.saveData || ['slow-2g', '2g', '3g'].includes(connection.effectiveType)) {
+            return 'mp3_low';
+        }
+        
+        const probe = document.createElement('audio');
+        if (probe.canPlayType('audio/ogg; codecs=opus')) {
+            return 'opus';
+        }
+        return 'mp3';
+    }
+    
+    async readResponseStream(response) {
+        // Server-sent events: transcript, token..., audio..., then done or error
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let botText = null;
+        let reply = '';
+        
+        this.startPlayback();
+        const playback = this.playback;
+        const request = this.pendingRequest;
+        
+        const handleEvent = (event, data) => {
+            if (event === 'transcript') {
+                this.addMessage(data.text, 'user');
+                botText = document.createElement('span');
+                this.addMessage('', 'bot').appendChild(botText);
+                this.updateStatus('💭 Thinking...');
+            } else if (event === 'token') {
+                reply += data;
+                botText.textContent = reply;
+                this.conversation.scrollTop = this.conversation.scrollHeight;
+            } else if (event === 'audio') {
+                if (this.avatarConnected || playback !== this.playback) return;
+                this.stopFiller(0);
+                this.queueAudio(data.audio, data.mime_type, data.text, data.seconds);
+            } else if (event === 'done') {
+                console.log(`📥 Response streamed: ${data.audio_chunks} audio chunks`);
+                this.stopFiller();
+                playback.finished = true;
+                if (this.avatarConnected) {
+                    this.showAvatarSpeaking(reply, data.speech_seconds);
+                } else if (!this.currentAudio && playback.queue.length === 0) {
+                    this.updateStatus('✅ Ready to listen');
+                }
+            } else if (event === 'error') {
+                this.stopFiller(0);
+                if (data.status === 409) {
+                    console.log('⏹️ Request superseded by a newer recording');
+                    return;
+                }
+                throw new Error(data.error || `Server error: ${data.status}`);
+            }
+        };
+        
         try {
-            this.setSpeaking(true);
-            this.updateStatus('🔊 Playing audio response...');
-            
-            const audioData = atob(audioBase64);
-            const audioArray = new Uint8Array(audioData.length);
-            for (let i = 0; i < audioData.length; i++) {
-                audioArray[i] = audioData.charCodeAt(i);
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    
+                    let event = 'message';
+                    let data = '';
+                    block.split('\n').forEach(line => {
+                        if (line.startsWith('event: ')) event = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                    });
+                    handleEvent(event, JSON.parse(data));
+                }
             }
-            
-            const audioBlob = new Blob([audioArray], { type: 'audio/mpeg' });
-            const audioUrl = URL.createObjectURL(audioBlob);
-            
-            const audio = new Audio(audioUrl);
-            
-            audio.onended = () => {
-                this.setSpeaking(false);
-                URL.revokeObjectURL(audioUrl);
+        } finally {
+            if (this.pendingRequest === request) {
+                this.pendingRequest = null;
+            }
+        }
+    }
+    
+    showAvatarSpeaking(text, speechSeconds) {
+        this.updateStatus('🎬 Avatar speaking...');
+        this.setSpeaking(true);
+        
+        // The server sends the reply's length (measured or from the voice's speech rate)
+        const estimatedDuration = Math.max(speechSeconds || text.split(' ').length * 0.4, 2); // minimum 2 seconds
+        setTimeout(() => {
+            this.setSpeaking(false);
+            this.updateStatus('✅ Ready to listen');
+        }, estimatedDuration * 1000);
+    }
+    
+    startPlayback() {
+        this.playback = { queue: [], playedSeconds: 0, queuedSeconds: 0, finished: false };
+    }
+    
+    queueAudio(audioBase64, mimeType = 'audio/mpeg', text = '', seconds = null) {
+        // Chunks play back to back in the order they arrive; seconds is the
+        // length the server parsed from the audio, known before it loads
+        const url = URL.createObjectURL(this.base64ToBlob(audioBase64, mimeType));
+        this.playback.queue.push({ url, text, seconds: seconds || 0 });
+        this.playback.queuedSeconds += seconds || 0;
+        if (!this.currentAudio) {
+            this.playNextChunk();
+        }
+    }
+    
+    playNextChunk() {
+        const playback = this.playback;
+        if (!playback) return;
+        const chunk = playback.queue.shift();
+        if (!chunk) {
+            this.setSpeaking(false);
+            if (playback.finished) {
                 this.updateStatus('✅ Ready to listen');
-            };
-            
-            audio.onerror = () => {
-                this.setSpeaking(false);
-                URL.revokeObjectURL(audioUrl);
-                this.updateStatus('❌ Audio playback failed');
-            };
-            
-            await audio.play();
-            
-        } catch (error) {
+            }
+            return;
+        }
+        playback.queuedSeconds -= chunk.seconds;
+        
+        const audio = new Audio(chunk.url);
+        audio.seconds = chunk.seconds;
+        audio.releaseUrl = () => URL.revokeObjectURL(chunk.url);
+        this.currentAudio = audio;
+        this.setSpeaking(true);
+        this.updateStatus('🔊 Playing audio response...');
+        
+        audio.onended = () => {
+            playback.playedSeconds += isFinite(audio.duration) ? audio.duration : chunk.seconds;
+            audio.releaseUrl();
+            this.currentAudio = null;
+            this.playNextChunk();
+        };
+        
+        audio.onerror = () => {
+            console.error('❌ Audio playback failed');
+            audio.releaseUrl();
+            this.currentAudio = null;
+            this.playNextChunk();
+        };
+        
+        audio.play().catch(error => {
             console.error('❌ Error playing audio:', error);
             this.setSpeaking(false);
             this.updateStatus('❌ Audio playback error');
+        });
+    }
+    
+    async loadFillerClips() {
+        try {
+            const format = this.chooseAudioFormat();
+            const response = await fetch(`http://localhost:5001/filler-clips?format=${format}`);
+            if (!response.ok) return;
+            
+            const data = await response.json();
+            if (!data.enabled || data.clips.length === 0) return;
+            
+            this.fillerThresholdMs = data.threshold_ms;
+            this.fillerClips = data.clips.map(clip => ({
+                text: clip.text,
+                url: URL.createObjectURL(this.base64ToBlob(clip.audio, data.audio_format.mime_type))
+            }));
+            console.log(`💬 Loaded ${this.fillerClips.length} filler clips`);
+        } catch (error) {
+            console.log('💬 Filler clips unavailable:', error.message);
         }
     }
     
+    scheduleFiller() {
+        // Only speak up if the reply is slow; most turns never hear a filler
+        if (this.fillerClips.length === 0 || this.avatarConnected) return;
+        
+        this.fillerTimer = setTimeout(() => {
+            this.fillerTimer = null;
+            const clip = this.fillerClips[Math.floor(Math.random() * this.fillerClips.length)];
+            this.fillerAudio = new Audio(clip.url);
+            this.fillerAudio.play().catch(() => {});
+            console.log(`💬 Filler: "${clip.text}"`);
+        }, this.fillerThresholdMs);
+    }
+    
+    stopFiller(fadeMs = 80) {
+        if (this.fillerTimer) {
+            clearTimeout(this.fillerTimer);
+            this.fillerTimer = null;
+        }
+        
+        const filler = this.fillerAudio;
+        this.fillerAudio = null;
+        if (!filler || filler.paused) return Promise.resolve();
+        if (fadeMs <= 0) {
+            filler.pause();
+            return Promise.resolve();
+        }
+        
+        // Short volume ramp so the cut-off doesn't click
+        return new Promise(resolve => {
+            const steps = Math.max(Math.round(fadeMs / 10), 1);
+            let step = 0;
+            const ramp = setInterval(() => {
+                step++;
+                filler.volume = Math.max(1 - step / steps, 0);
+                if (step >= steps) {
+                    clearInterval(ramp);
+                    filler.pause();
+                    resolve();
+                }
+            }, 10);
+        });
+    }
+    
+    base64ToBlob(audioBase64, mimeType) {
+        const audioData = atob(audioBase64);
+        const audioArray = new Uint8Array(audioData.length);
+        for (let i = 0; i < audioData.length; i++) {
+            audioArray[i] = audioData.charCodeAt(i);
+        }
+        return new Blob([audioArray], { type: mimeType });
+    }
+    
+    interruptResponse() {
+        const audio = this.currentAudio;
+        const request = this.pendingRequest;
+        const playback = this.playback;
+        if (!audio && !request) return;
+        
+        const pressedAt = performance.now();
+        let playedSeconds = playback ? playback.playedSeconds : 0;
+        let audioSeconds = playedSeconds;
+        
+        // Silence first, bookkeeping after
+        this.stopFiller(0);
+        if (audio) {
+            audio.pause();
+            playedSeconds += audio.currentTime;
+            audioSeconds += (isFinite(audio.duration) ? audio.duration : audio.seconds) + playback.queuedSeconds;
+            audio.releaseUrl();
+            this.currentAudio = null;
+            this.setSpeaking(false);
+        }
+        if (playback) {
+            playback.queue.forEach(chunk => URL.revokeObjectURL(chunk.url));
+            playback.queue = [];
+            playback.queuedSeconds = 0;
+            this.playback = null;
+        }
+        if (request) {
+            request.abort();
+            this.pendingRequest = null;
+        }
+        // Press to local silence only; the server's cancel is timed below
+        const localStopMs = performance.now() - pressedAt;
+        
+        console.log(`✋ Interrupted after ${playedSeconds.toFixed(1)}s of ${audioSeconds.toFixed(1)}s`);
+        
+        // Let the server stop any in-flight work and trim history to what was heard
+        fetch('http://localhost:5001/interrupt', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                session_id: this.sessionId,
+                played_seconds: playedSeconds,
+                audio_seconds: audioSeconds,
+                local_stop_ms: localStopMs
+            })
+        }).then(() => {
+            const roundTripMs = performance.now() - pressedAt;
+            console.log(`⏱️ Interrupt: silent locally in ${localStopMs.toFixed(1)}ms, server cancelled in ${roundTripMs.toFixed(0)}ms`);
+        }).catch(error => console.error('❌ Interrupt request failed:', error));
+    }
+    
     async disconnectAvatar() {
         try {
             if (this.liveKitRoom) {
@@ -515,6 +794,7 @@ class VoiceAvatarApp {
         
         this.conversation.appendChild(messageDiv);
         this.conversation.scrollTop = this.conversation.scrollHeight;
+        return messageDiv;
     }
     
     updateUI(recording) {